@@ -9,7 +9,15 @@ class Analytics:
     Gestor de logging y análisis de rendimiento
     """
 
-    def __init__(self, config, logger, position_manager, signal_detector, get_balance_callback):
+    TRADES_CSV_HEADER = [
+        'timestamp', 'action', 'side', 'price', 'quantity', 'rsi',
+        'ema_fast', 'ema_slow', 'ema_trend', 'trend_direction',
+        'stop_loss', 'take_profit', 'reason', 'pnl_pct', 'pnl_usdt',
+        'balance_before', 'balance_after', 'trade_duration_hours',
+        'signal_confirmed', 'confirmation_time_hours', 'pullback_type'
+    ]
+
+    def __init__(self, config, logger, position_manager, signal_detector, get_balance_callback, clock=None):
         """
         Args:
             config: Configuración del bot
@@ -17,12 +25,14 @@ class Analytics:
             position_manager: Instancia de PositionManager
             signal_detector: Instancia de SignalDetector
             get_balance_callback: Función callback para obtener balance
+            clock: Reloj en segundos (inyectable para simulaciones; por defecto la hora actual)
         """
         self.config = config
         self.logger = logger
         self.position_manager = position_manager
         self.signal_detector = signal_detector
         self.get_balance_callback = get_balance_callback
+        self.clock = clock
 
         # Archivos CSV
         self.trades_csv = None
@@ -60,15 +70,7 @@ class Analytics:
 
         # Headers para trades
         if not os.path.exists(self.trades_csv):
-            with open(self.trades_csv, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    'timestamp', 'action', 'side', 'price', 'quantity', 'rsi',
-                    'ema_fast', 'ema_slow', 'ema_trend', 'trend_direction',
-                    'stop_loss', 'take_profit', 'reason', 'pnl_pct', 'pnl_usdt',
-                    'balance_before', 'balance_after', 'trade_duration_hours',
-                    'signal_confirmed', 'confirmation_time_hours', 'pullback_type'
-                ])
+            self.init_trades_file(self.trades_csv)
 
         # Headers para datos de mercado
         if not os.path.exists(self.market_csv):
@@ -80,6 +82,15 @@ class Analytics:
                     'position_side', 'unrealized_pnl_pct', 'pending_signal'
                 ])
 
+    def init_trades_file(self, path):
+        """Crea (o reinicia) el CSV de trades en `path` con la cabecera estándar"""
+        self.trades_csv = path
+        with open(path, 'w', newline='') as f:
+            csv.writer(f).writerow(self.TRADES_CSV_HEADER)
+
+    def _now(self):
+        return datetime.fromtimestamp(self.clock()) if self.clock is not None else datetime.now()
+
     def log_market_data(self, timestamp, price, rsi, volume, ema_fast, ema_slow,
                         ema_trend, trend_direction, signal, in_position,
                         position_side, unrealized_pnl_pct, pending_signal):
@@ -101,43 +112,52 @@ class Analytics:
     def log_trade(self, action, side=None, price=None, quantity=None, rsi=None,
                   ema_fast=None, ema_slow=None, ema_trend=None, trend_direction=None,
                   reason=None, pnl_pct=None, duration_hours=None, confirmation_time=None):
-        """Registra trades con datos de EMAs"""
-        timestamp = datetime.now()
+        """
+        Registra trades con datos de EMAs
+
+        Returns:
+            Fila del trade en el orden de TRADES_CSV_HEADER
+        """
+        timestamp = self._now()
         balance = self.get_balance_callback()
 
-        try:
-            with open(self.trades_csv, 'a', newline='') as f:
-                writer = csv.writer(f)
+        if action == 'OPEN':
+            pullback_type = "Unknown"
+            # Note: _last_pullback_type would need to be tracked if needed
+            position = self.position_manager.position
 
-                if action == 'OPEN':
-                    pullback_type = "Unknown"
-                    # Note: _last_pullback_type would need to be tracked if needed
-                    position = self.position_manager.position
-
-                    writer.writerow([
-                        timestamp.isoformat(), action, side, price, quantity, rsi,
-                        ema_fast or 0, ema_slow or 0, ema_trend or 0, trend_direction or '',
-                        position['stop_loss'] if position else '',
-                        position['take_profit'] if position else '',
-                        reason or '', '', '', balance, '', '',
-                        "YES" if confirmation_time else "NO",
-                        confirmation_time or 0, pullback_type
-                    ])
-                else:  # CLOSE
-                    pnl_usdt = (pnl_pct / 100) * balance if pnl_pct else 0
-                    writer.writerow([
-                        timestamp.isoformat(), action, side, price, quantity, rsi,
-                        ema_fast or 0, ema_slow or 0, ema_trend or 0, trend_direction or '',
-                        '', '', reason or '', pnl_pct or 0, pnl_usdt,
-                        '', balance, duration_hours or 0, '', '', ''
-                    ])
-        except Exception as e:
-            self.logger.error(f"Error guardando trade: {e}")
+            row = [
+                timestamp.isoformat(), action, side, price, quantity, rsi,
+                ema_fast or 0, ema_slow or 0, ema_trend or 0, trend_direction or '',
+                position['stop_loss'] if position else '',
+                position['take_profit'] if position else '',
+                reason or '', '', '', balance, '', '',
+                "YES" if confirmation_time else "NO",
+                confirmation_time or 0, pullback_type
+            ]
+        else:  # CLOSE
+            pnl_usdt = (pnl_pct / 100) * balance if pnl_pct else 0
+            row = [
+                timestamp.isoformat(), action, side, price, quantity, rsi,
+                ema_fast or 0, ema_slow or 0, ema_trend or 0, trend_direction or '',
+                '', '', reason or '', pnl_pct or 0, pnl_usdt,
+                '', balance, duration_hours or 0, '', '', ''
+            ]
+
+        # Sin archivo (p. ej. backtests de barrido) solo se actualizan las métricas
+        if self.trades_csv:
+            try:
+                with open(self.trades_csv, 'a', newline='') as f:
+                    csv.writer(f).writerow(row)
+            except Exception as e:
+                self.logger.error(f"Error guardando trade: {e}")
 
         # Actualizar métricas
         if action == 'CLOSE' and pnl_pct is not None:
             self.update_performance_metrics(pnl_pct)
 
+        return row
+
     def update_performance_metrics(self, pnl_pct):
         """Actualiza métricas de rendimiento"""
         if not self.performance_metrics:
@@ -152,7 +172,7 @@ class Analytics:
         else:
             self.performance_metrics['losing_trades'] += 1
             self.performance_metrics['consecutive_losses'] += 1
-            self.performance_metrics['last_loss_time'] = time.time()
+            self.performance_metrics['last_loss_time'] = self.clock() if self.clock is not None else time.time()
 
         if self.performance_metrics['consecutive_losses'] > self.performance_metrics['max_consecutive_losses']:
             self.performance_metrics['max_consecutive_losses'] = self.performance_metrics['consecutive_losses']
@@ -214,7 +234,7 @@ class Analytics:
         if self.position_manager.in_position:
             position = self.position_manager.position
             pos_type = "RECUPERADA" if position.get('recovered') else "ACTIVA"
-            duration = (datetime.now() - position['entry_time']).total_seconds() / 3600
+            duration = (self._now() - position['entry_time']).total_seconds() / 3600
             self.logger.info(f"📍 Posición {pos_type}: {position['side'].upper()} ({duration:.1f}h)")
             self.logger.info(f"🎯 Breakeven movido: {'SÍ' if position.get('breakeven_moved') else 'NO'}")
         elif self.signal_detector.pending_long_signal:
@@ -0,0 +1,205 @@
+import asyncio
+import threading
+
+import ccxt.async_support as ccxt_async
+
+from market_cache import MarketMetadataCache
+
+
+class SyncExchangeFacade:
+    """
+    Vista síncrona de un exchange ccxt asíncrono.
+
+    Los métodos corrutina (fetch_ohlcv, fetch_balance, create_market_order...)
+    se ejecutan en el event loop del AsyncExchangeClient y bloquean solo al
+    hilo que llama, así que los módulos existentes funcionan sin cambios y
+    varios hilos (p. ej. el escáner) comparten la misma sesión HTTP. Los
+    atributos (markets, rateLimit...) se leen directamente.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client.async_exchange, name)
+        if not asyncio.iscoroutinefunction(attribute):
+            return attribute
+
+        def blocking_call(*args, **kwargs):
+            return self._client.call(name, *args, **kwargs)
+
+        blocking_call.__name__ = name
+        return blocking_call
+
+    def fetch_cycle_data(self, symbol, timeframe, since=None, limit=None, ticker=True, balance=True):
+        """Velas, ticker y balance en paralelo (ver AsyncExchangeClient.fetch_cycle_data)"""
+        return self._client.fetch_cycle_data(symbol, timeframe, since=since, limit=limit,
+                                             ticker=ticker, balance=balance)
+
+
+class AsyncExchangeClient:
+    """
+    Cliente de exchange sobre ccxt.async_support con una única sesión compartida.
+
+    Un hilo de fondo mantiene el event loop donde vive el exchange asíncrono
+    (y su sesión aiohttp). Las llamadas se pueden lanzar en paralelo con
+    gather()/submit() o usarse de forma bloqueante mediante la fachada
+    síncrona `exchange`, compatible con ExchangeClient.
+    """
+
+    def __init__(self, api_key, api_secret, config, logger, exchange=None):
+        """
+        Args:
+            api_key: API key de Binance
+            api_secret: API secret de Binance
+            config: Configuración del bot
+            logger: Logger para registrar información
+            exchange: Exchange asíncrono ya creado (tests); por defecto ccxt binance
+        """
+        self.config = config
+        self.logger = logger
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='exchange-loop', daemon=True)
+        self._thread.start()
+        self._closed = False
+
+        if exchange is None:
+            exchange = self._run(self._create_exchange(api_key, api_secret))
+        self.async_exchange = exchange
+
+        # Fachada síncrona con la misma interfaz que ExchangeClient.exchange
+        self.exchange = SyncExchangeFacade(self)
+
+        self.market_cache = MarketMetadataCache(config.markets_cache_file, config.markets_cache_ttl, logger)
+
+    async def _create_exchange(self, api_key, api_secret):
+        # La sesión aiohttp debe crearse dentro del loop que la usará
+        return ccxt_async.binance({
+            'apiKey': api_key,
+            'secret': api_secret,
+            'sandbox': self.config.testnet,
+            'enableRateLimit': True,
+            'options': {
+                'adjustForTimeDifference': True,
+            }
+        })
+
+    def _run(self, coroutine, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Lanza una llamada del exchange sin esperar.
+
+        Returns:
+            concurrent.futures.Future con el resultado
+        """
+        if self._closed:
+            raise RuntimeError("AsyncExchangeClient cerrado")
+        coroutine = getattr(self.async_exchange, method)(*args, **kwargs)
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def call(self, method, *args, **kwargs):
+        """Ejecuta una llamada del exchange y espera su resultado"""
+        return self.submit(method, *args, **kwargs).result()
+
+    def gather(self, *calls, return_exceptions=False):
+        """
+        Ejecuta varias llamadas en paralelo sobre la misma sesión.
+
+        Args:
+            calls: Tuplas (método, args) o (método, args, kwargs)
+            return_exceptions: Devolver las excepciones en lugar de propagar la primera
+
+        Returns:
+            Lista de resultados en el orden de `calls`
+        """
+        async def run_all():
+            coroutines = [getattr(self.async_exchange, call[0])(*call[1], **(call[2] if len(call) > 2 else {}))
+                          for call in calls]
+            return await asyncio.gather(*coroutines, return_exceptions=return_exceptions)
+
+        return self._run(run_all())
+
+    def fetch_cycle_data(self, symbol, timeframe, since=None, limit=None, ticker=True, balance=True):
+        """
+        Velas, ticker y balance de un ciclo en paralelo.
+
+        Args:
+            ticker: Incluir fetch_ticker
+            balance: Incluir fetch_balance (p. ej. solo si la caché de balance expiró)
+
+        Returns:
+            dict con 'ohlcv', 'ticker' y 'balance'. Ticker y balance son None si
+            no se pidieron o fallaron (el fallo se registra y el llamador usa
+            su alternativa); solo un fallo de las velas se propaga
+        """
+        calls = [('fetch_ohlcv', (symbol, timeframe), {'since': since, 'limit': limit})]
+        if ticker:
+            calls.append(('fetch_ticker', (symbol,)))
+        if balance:
+            calls.append(('fetch_balance', ()))
+        results = iter(self.gather(*calls, return_exceptions=True))
+        ohlcv = next(results)
+        if isinstance(ohlcv, BaseException):
+            raise ohlcv
+        return {
+            'ohlcv': ohlcv,
+            'ticker': self._optional_result('fetch_ticker', next(results)) if ticker else None,
+            'balance': self._optional_result('fetch_balance', next(results)) if balance else None
+        }
+
+    def _optional_result(self, method, result):
+        """Resultado secundario del ciclo: None (con aviso) si la llamada falló"""
+        if isinstance(result, BaseException):
+            self.logger.warning(f"⚠️ {method} falló en el ciclo paralelo: {result}")
+            return None
+        return result
+
+    def load_markets(self):
+        """Carga los mercados desde la caché en disco o, si no es válida, desde Binance"""
+        return self.market_cache.prime(self.async_exchange, lambda: self.call('load_markets', True),
+                                       load_time_difference=lambda: self.call('load_time_difference'),
+                                       set_markets=self._set_markets)
+
+    def _set_markets(self, markets, currencies=None):
+        """Instala los mercados desde el hilo del loop (el exchange asíncrono solo se toca allí)"""
+        async def install():
+            self.async_exchange.set_markets(markets, currencies)
+
+        self._run(install())
+
+    def verify_connection(self):
+        """Verifica la conexión con Binance (mercados desde caché antes de la primera llamada)"""
+        try:
+            # Con markets vacío, fetch_balance de ccxt descargaría el listado completo en el loop
+            self.load_markets()
+            balance = self.call('fetch_balance')
+
+            if self.config.symbol not in self.async_exchange.markets:
+                available_symbols = [s for s in self.async_exchange.markets.keys() if 'BTC' in s and 'USDT' in s]
+                self.logger.warning(f"Símbolo {self.config.symbol} no encontrado. Disponibles: {available_symbols[:5]}")
+
+            self.logger.info(f"✅ Conexión exitosa con Binance {'Testnet' if self.config.testnet else 'Mainnet'} (async)")
+
+            usdt_balance = balance.get('USDT', {}).get('free', 0)
+            self.logger.info(f"💰 Balance USDT disponible: ${usdt_balance:.2f}")
+
+        except Exception as e:
+            self.logger.error(f"❌ Error de conexión: {e}")
+            raise
+
+    def close(self, timeout=10):
+        """Cierra la sesión HTTP y detiene el event loop"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._run(self.async_exchange.close(), timeout)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Error cerrando sesión del exchange: {e}")
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            self._loop.close()
@@ -0,0 +1,341 @@
+"""
+Backtest por eventos sobre el historial local de velas.
+
+Reproduce vela a vela la lógica del bot con los módulos reales
+(MarketAnalyzer.determine_trend_direction, SignalDetector, RiskManager,
+PositionManager y Analytics) contra FakeBinanceExchange y un reloj
+simulado, así que el backtest no puede divergir de la lógica en vivo.
+
+Uso:
+    python backtest.py --start 2023-01-01
+    python backtest.py --csv historial.csv --param rsi_oversold=35 --param stop_loss_pct=2.5
+"""
+import argparse
+import copy
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from analytics import Analytics
+from config import BotConfig
+from fake_exchange import FakeBinanceExchange
+from indicators import TechnicalIndicators
+from market_analyzer import MarketAnalyzer
+from market_stream import read_candles_csv
+from position_manager import PositionManager
+from risk_manager import RiskManager
+from signal_detector import SignalDetector
+
+# Los módulos registran cada señal, stop y orden; en backtest solo interesan los errores
+_LOGGER = logging.getLogger('backtest')
+_LOGGER.setLevel(logging.ERROR)
+
+CANDLE_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+
+def candle_arrays(candles):
+    """
+    Normaliza velas a columnas NumPy.
+
+    Args:
+        candles: Lista de [timestamp, open, high, low, close, volume] o dict de
+            columnas (CandleStore.load_arrays)
+
+    Returns:
+        dict {columna: np.ndarray} (timestamp int64, resto float64)
+    """
+    if isinstance(candles, dict):
+        return {name: np.asarray(candles[name], dtype=np.int64 if name == 'timestamp' else np.float64)
+                for name in CANDLE_COLUMNS}
+    rows = np.asarray([row[:6] for row in candles], dtype=np.float64).reshape(-1, 6)
+    arrays = {name: rows[:, i].copy() for i, name in enumerate(CANDLE_COLUMNS)}
+    arrays['timestamp'] = arrays['timestamp'].astype(np.int64)
+    return arrays
+
+
+def compute_indicator_arrays(closes, config, indicators=None):
+    """
+    EMAs y RSI de toda la serie en una pasada vectorizada.
+
+    Cada posición i coincide con lo que el estado incremental del bot
+    devuelve al evaluar la vela i (EMAs desde la primera vela, RSI 50 sin
+    ventana completa). Los parámetros de _PARAM_BOUNDS no afectan a estos
+    arrays, así que se pueden compartir entre backtests.
+
+    Returns:
+        dict con 'ema_fast', 'ema_slow', 'ema_trend' y 'rsi'
+    """
+    indicators = indicators or TechnicalIndicators(engine='numpy')
+    bank = indicators.ema_bank(closes, [config.ema_fast_period, config.ema_slow_period, config.ema_trend_period])
+    rsi = indicators.rsi_series(closes, config.rsi_period, config.rsi_smoothing)
+    return {
+        'ema_fast': bank[0],
+        'ema_slow': bank[1],
+        'ema_trend': bank[2],
+        'rsi': np.where(np.isnan(rsi), 50.0, rsi)
+    }
+
+
+def summarize(equity, trades, initial_balance):
+    """
+    Métricas agregadas de un backtest.
+
+    Args:
+        equity: Curva de capital (np.ndarray)
+        trades: Trades cerrados (dicts con 'pnl_pct')
+        initial_balance: Capital inicial
+
+    Returns:
+        dict con total_trades, win_rate, total_pnl_pct, return_pct,
+        max_drawdown_pct y final_equity
+    """
+    pnls = [float(trade['pnl_pct']) for trade in trades]
+    final_equity = float(equity[-1]) if len(equity) else float(initial_balance)
+    if len(equity):
+        peaks = np.maximum.accumulate(equity)
+        max_drawdown = float(np.max((peaks - equity) / peaks) * 100)
+    else:
+        max_drawdown = 0.0
+    return {
+        'total_trades': len(pnls),
+        'win_rate': sum(1 for pnl in pnls if pnl > 0) / len(pnls) * 100 if pnls else 0.0,
+        'total_pnl_pct': sum(pnls),
+        'return_pct': (final_equity / initial_balance - 1) * 100,
+        'max_drawdown_pct': max_drawdown,
+        'final_equity': final_equity
+    }
+
+
+def new_performance_metrics():
+    """Métricas de rendimiento con las mismas claves que el bot"""
+    return {
+        'total_trades': 0, 'winning_trades': 0, 'losing_trades': 0, 'total_pnl': 0,
+        'max_drawdown': 0, 'consecutive_losses': 0, 'max_consecutive_losses': 0,
+        'signals_detected': 0, 'signals_confirmed': 0, 'signals_expired': 0,
+        'recoveries_performed': 0, 'trend_filters_applied': 0, 'ema_confirmations': 0,
+        'pullback_entries': 0, 'last_loss_time': 0
+    }
+
+
+class BacktestEngine:
+    """
+    Backtest exacto vela a vela con los módulos del bot.
+
+    Cada vela se evalúa en su cierre, en el mismo orden que
+    BinanceRSIEMABot.analyze_and_trade: salidas de la posición abierta,
+    confirmación de la señal pendiente y detección de señales nuevas
+    (respetando min_time_between_signals y el circuit breaker). Las órdenes
+    se ejecutan en FakeBinanceExchange (comisión, deslizamiento, cortos con
+    saldo negativo) y el reloj de todos los módulos es el de la vela.
+
+    Los indicadores se precalculan con compute_indicator_arrays(), de modo
+    que el bucle por vela solo ejecuta la lógica de decisión.
+    """
+
+    def __init__(self, candles, config=None, params=None, initial_balance=10000.0, fee_rate=0.001,
+                 slippage_pct=0.0, warmup=None, indicator_arrays=None, logger=None):
+        """
+        Args:
+            candles: Velas (lista de filas o dict de columnas) ordenadas
+            config: BotConfig base (se copia; por defecto BotConfig())
+            params: Sobrescrituras de parámetros {nombre: valor} (ej. de _PARAM_BOUNDS)
+            initial_balance: Capital inicial en la moneda de cotización
+            fee_rate: Comisión por operación
+            slippage_pct: Deslizamiento por orden en %
+            warmup: Velas de historial antes de la primera evaluación
+                (por defecto MarketAnalyzer.history_limit(), como el bot)
+            indicator_arrays: Resultado de compute_indicator_arrays() a reutilizar
+            logger: Logger de los módulos (por defecto solo errores)
+        """
+        self.config = copy.copy(config or BotConfig())
+        for name, value in (params or {}).items():
+            setattr(self.config, name, value)
+        self.logger = logger or _LOGGER
+
+        self.arrays = candle_arrays(candles)
+        self.indicator_arrays = indicator_arrays or compute_indicator_arrays(self.arrays['close'], self.config)
+        self.initial_balance = initial_balance
+        self.fee_rate = fee_rate
+        self.slippage_pct = slippage_pct
+        self.warmup = warmup or max(self.config.ema_trend_period + 50, 100)
+        self.exchange = None  # FakeBinanceExchange de la última ejecución (órdenes y balances)
+
+    def _rows(self):
+        arrays = self.arrays
+        return np.column_stack([arrays[name].astype(np.float64) for name in CANDLE_COLUMNS]).tolist()
+
+    def run(self, trades_file=None, close_at_end=True):
+        """
+        Ejecuta el backtest.
+
+        Args:
+            trades_file: CSV de trades con el esquema de Analytics.log_trade (None = no escribir)
+            close_at_end: Cerrar la posición abierta al final de la serie
+
+        Returns:
+            dict con 'trades' (filas de Analytics como dicts), 'equity' y
+            'timestamps' por vela evaluada, 'metrics' (performance_metrics),
+            'summary' (summarize()) y 'candles_per_second'
+        """
+        config = self.config
+        logger = self.logger
+        quote = config.symbol.split('/')[1]
+
+        exchange = FakeBinanceExchange(
+            self._rows(), config.symbol, config.timeframe, balance={quote: self.initial_balance},
+            warmup=self.warmup, fee_rate=self.fee_rate, slippage_pct=self.slippage_pct, allow_short=True
+        )
+        self.exchange = exchange
+        clock = exchange.clock
+        metrics = new_performance_metrics()
+        trades = []
+
+        analyzer = MarketAnalyzer(exchange, config, TechnicalIndicators(logger), logger, clock=clock)
+        detector = SignalDetector(config, logger, analyzer, metrics, clock=clock)
+        position_manager = PositionManager(exchange, config, logger, clock=clock)
+        risk_manager = RiskManager(config, logger, position_manager, position_manager.close_position)
+        analytics = Analytics(config, logger, position_manager, detector,
+                              get_balance_callback=position_manager.get_account_balance, clock=clock)
+        analytics.set_performance_metrics(metrics)
+        if trades_file:
+            analytics.init_trades_file(trades_file)
+
+        def record_trade(*args, **kwargs):
+            row = analytics.log_trade(*args, **kwargs)
+            if row[1] == 'CLOSE':
+                trades.append(dict(zip(Analytics.TRADES_CSV_HEADER, row)))
+
+        position_manager.log_trade_callback = record_trade
+
+        closes = self.arrays['close'].tolist()
+        ema_fast = self.indicator_arrays['ema_fast'].tolist()
+        ema_slow = self.indicator_arrays['ema_slow'].tolist()
+        ema_trend = self.indicator_arrays['ema_trend'].tolist()
+        rsis = self.indicator_arrays['rsi'].tolist()
+
+        start = exchange.cursor
+        count = len(closes)
+        equity = np.empty(count - start)
+        balances = exchange.balances
+        base = exchange.base
+        last_signal_time = 0
+        min_gap = config.min_time_between_signals
+        determine_trend = analyzer.determine_trend_direction
+
+        started = time.perf_counter()
+        for i in range(start, count):
+            exchange.cursor = i
+            price = closes[i]
+            rsi = rsis[i]
+            fast, slow, trend_ema = ema_fast[i], ema_slow[i], ema_trend[i]
+            trend = determine_trend(price, fast, slow, trend_ema)
+
+            # El bot actualiza last_rsi al registrar los datos de mercado, antes de decidir
+            detector.update_last_rsi(rsi)
+
+            if position_manager.in_position:
+                market_data = {'price': price, 'rsi': rsi, 'ema_fast': fast, 'ema_slow': slow,
+                               'ema_trend': trend_ema, 'trend_direction': trend}
+                risk_manager.check_exit_conditions_swing(price, rsi, market_data)
+
+            if not position_manager.in_position:
+                now = clock()
+                confirmed, signal_type = detector.check_swing_confirmation(price, rsi, trend)
+                if confirmed:
+                    hours = 0
+                    if detector.signal_trigger_time:
+                        hours = (datetime.fromtimestamp(now) - detector.signal_trigger_time).total_seconds() / 3600
+                    open_position = (position_manager.open_long_position if signal_type == 'long'
+                                     else position_manager.open_short_position)
+                    if open_position(price, rsi, fast, slow, trend_ema, trend, hours):
+                        last_signal_time = now
+                elif not (detector.pending_long_signal or detector.pending_short_signal):
+                    if (not risk_manager.is_circuit_breaker_active(metrics, trend, rsi, now=now)
+                            and now - last_signal_time >= min_gap):
+                        detector.detect_swing_signal(price, rsi, fast, slow, trend_ema, trend, False)
+
+            equity[i - start] = balances[quote] + balances[base] * price
+
+        if close_at_end and position_manager.in_position:
+            last = count - 1
+            position_manager.close_position("Fin del backtest", rsis[last], closes[last], {
+                'ema_fast': ema_fast[last], 'ema_slow': ema_slow[last], 'ema_trend': ema_trend[last],
+                'trend_direction': determine_trend(closes[last], ema_fast[last], ema_slow[last], ema_trend[last])
+            })
+            equity[-1] = balances[quote] + balances[base] * closes[last]
+        elapsed = time.perf_counter() - started
+
+        return {
+            'trades': trades,
+            'equity': equity,
+            'timestamps': self.arrays['timestamp'][start:],
+            'metrics': metrics,
+            'summary': summarize(equity, trades, self.initial_balance),
+            'candles_per_second': (count - start) / elapsed if elapsed > 0 else float('inf')
+        }
+
+
+def _parse_date(value):
+    """'YYYY-MM-DD' (UTC) a timestamp en ms"""
+    return int(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _parse_param(text):
+    name, value = text.split('=', 1)
+    return name, float(value)
+
+
+def main():
+    from candle_store import CandleStore
+
+    parser = argparse.ArgumentParser(description="Backtest por eventos con la lógica del bot")
+    parser.add_argument('--csv', help="CSV timestamp,open,high,low,close,volume (por defecto el almacén de velas)")
+    parser.add_argument('--symbol', default=None, help="Por defecto config.symbol")
+    parser.add_argument('--timeframe', default=None, help="Por defecto config.timeframe")
+    parser.add_argument('--start', default=None, help="Fecha inicial YYYY-MM-DD (UTC)")
+    parser.add_argument('--end', default=None, help="Fecha final YYYY-MM-DD (UTC)")
+    parser.add_argument('--balance', type=float, default=10000.0)
+    parser.add_argument('--fee', type=float, default=0.001)
+    parser.add_argument('--param', action='append', type=_parse_param, default=[],
+                        help="Sobrescribe un parámetro de config (nombre=valor), repetible")
+    parser.add_argument('--trades-out', default=None, help="CSV de trades (por defecto logs/backtest_trades_*.csv)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    config = BotConfig()
+    config.symbol = args.symbol or config.symbol
+    config.timeframe = args.timeframe or config.timeframe
+
+    if args.csv:
+        candles = read_candles_csv(args.csv)
+    else:
+        store = CandleStore(config.candle_store_file)
+        candles = store.load_arrays(config.symbol, config.timeframe,
+                                    _parse_date(args.start) if args.start else None,
+                                    _parse_date(args.end) if args.end else None)
+        store.close()
+    if len(candles['timestamp'] if isinstance(candles, dict) else candles) == 0:
+        print("❌ Sin velas para el rango indicado (descárgalas con history_downloader.py)")
+        return
+
+    trades_file = args.trades_out or os.path.join(
+        config.logs_dir, f'backtest_trades_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    )
+    engine = BacktestEngine(candles, config, params=dict(args.param), initial_balance=args.balance, fee_rate=args.fee)
+    result = engine.run(trades_file=trades_file)
+    summary = result['summary']
+
+    print(f"\n📊 Backtest {config.symbol} {config.timeframe}: {len(result['equity'])} velas "
+          f"({result['candles_per_second']:,.0f} velas/s)")
+    print(f"🔢 Trades: {summary['total_trades']} | 🎯 Win rate: {summary['win_rate']:.1f}% | "
+          f"💰 PnL acumulado: {summary['total_pnl_pct']:.2f}%")
+    print(f"📈 Retorno: {summary['return_pct']:.2f}% | 📉 Max drawdown: {summary['max_drawdown_pct']:.2f}% | "
+          f"💵 Capital final: {summary['final_equity']:.2f}")
+    print(f"🧾 Trades guardados en {trades_file}")
+
+
+if __name__ == "__main__":
+    main()
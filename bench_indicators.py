@@ -0,0 +1,56 @@
+"""
+Micro-benchmark de latencia por llamada de los motores de indicadores.
+
+Uso:
+    python bench_indicators.py
+    python bench_indicators.py --sizes 250 1000 --repeat 2000
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from config import BotConfig
+from indicators import ENGINES, TechnicalIndicators
+
+
+def synthetic_prices(size, seed=42):
+    """Paseo aleatorio alrededor de 60k (orden de magnitud de BTC/USDT)"""
+    rng = np.random.default_rng(seed)
+    return 60000 + np.cumsum(rng.normal(0, 300, size))
+
+
+def bench_engine(engine, prices, config, repeat):
+    """Devuelve {operación: microsegundos por llamada} para un motor"""
+    indicators = TechnicalIndicators(engine=engine)
+    periods = [config.ema_fast_period, config.ema_slow_period, config.ema_trend_period]
+    cases = {
+        'calculate_ema': lambda: indicators.calculate_ema(prices, config.ema_fast_period),
+        'calculate_rsi (sma)': lambda: indicators.calculate_rsi(prices, config.rsi_period),
+        'calculate_rsi (wilder)': lambda: indicators.calculate_rsi(prices, config.rsi_period, 'wilder'),
+        'EMA 21/50/200 (3 llamadas)': lambda: [indicators.calculate_ema(prices, p) for p in periods],
+        'ema_bank 21/50/200': lambda: indicators.ema_bank(prices, periods),
+    }
+    return {name: timeit.timeit(fn, number=repeat) / repeat * 1e6 for name, fn in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de motores de indicadores")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[250, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    config = BotConfig()
+    for size in args.sizes:
+        prices = synthetic_prices(size)
+        results = {engine: bench_engine(engine, prices, config, args.repeat) for engine in ENGINES}
+
+        print(f"\n📊 {size} velas ({args.repeat} repeticiones)")
+        print(f"{'operación':<30}" + ''.join(f"{engine + ' (µs)':>14}" for engine in ENGINES) + f"{'speedup':>10}")
+        for name in results[ENGINES[0]]:
+            row = [results[engine][name] for engine in ENGINES]
+            print(f"{name:<30}" + ''.join(f"{value:>14.1f}" for value in row) + f"{row[0] / row[-1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
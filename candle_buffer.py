@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class CandleBuffer:
+    """
+    Buffer circular de velas OHLCV con columnas NumPy preasignadas.
+
+    Cada vela se escribe dos veces (posición i e i + capacity) para que las
+    últimas `len(buffer)` velas formen siempre un tramo contiguo: las
+    propiedades de columna devuelven vistas sin copia aptas para los
+    indicadores. La memoria es fija sin importar cuánto tiempo corra el bot.
+    """
+
+    __slots__ = ('capacity', '_timestamps', '_values', '_head', '_size')
+
+    # Filas de self._values
+    OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+
+    def __init__(self, capacity):
+        """
+        Args:
+            capacity: Número máximo de velas retenidas
+        """
+        if capacity <= 0:
+            raise ValueError("La capacidad del buffer debe ser positiva")
+        self.capacity = capacity
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((5, 2 * capacity), dtype=np.float64)
+        self._head = 0  # Próxima posición de escritura en [0, capacity)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        """Descarta todas las velas (sin liberar memoria)"""
+        self._head = 0
+        self._size = 0
+
+    @property
+    def last_timestamp(self):
+        """Timestamp (ms) de la vela más reciente o None si está vacío"""
+        if self._size == 0:
+            return None
+        return int(self._timestamps[self._head + self.capacity - 1])
+
+    def _write(self, index, row):
+        timestamp, open_, high, low, close, volume = row[:6]
+        for position in (index, index + self.capacity):
+            self._timestamps[position] = timestamp
+            values = self._values[:, position]
+            values[0] = open_
+            values[1] = high
+            values[2] = low
+            values[3] = close
+            values[4] = volume or 0.0
+
+    def append(self, row):
+        """Añade una vela nueva [timestamp, open, high, low, close, volume]"""
+        self._write(self._head, row)
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def upsert(self, rows):
+        """
+        Incorpora velas ordenadas por tiempo (formato ccxt fetch_ohlcv).
+
+        La vela con el mismo timestamp que la última se sobrescribe (vela en
+        formación actualizada); las posteriores se añaden. Las anteriores a la
+        última ya están cerradas y se ignoran, así que el coste depende solo
+        de las velas nuevas.
+
+        Returns:
+            Número de velas nuevas añadidas
+        """
+        last = self.last_timestamp
+        start = len(rows)
+        if last is None:
+            start = max(0, len(rows) - self.capacity)
+        else:
+            while start > 0 and rows[start - 1][0] >= last:
+                start -= 1
+
+        added = 0
+        for row in rows[start:]:
+            if last is not None and row[0] == last:
+                self._write((self._head - 1) % self.capacity, row)
+            else:
+                self.append(row)
+                added += 1
+        return added
+
+    def _window(self):
+        end = self._head + self.capacity
+        return slice(end - self._size, end)
+
+    @property
+    def timestamps(self):
+        """Vista int64 de timestamps (ms), de la más antigua a la más reciente"""
+        return self._timestamps[self._window()]
+
+    @property
+    def open(self):
+        return self._values[self.OPEN, self._window()]
+
+    @property
+    def high(self):
+        return self._values[self.HIGH, self._window()]
+
+    @property
+    def low(self):
+        return self._values[self.LOW, self._window()]
+
+    @property
+    def close(self):
+        return self._values[self.CLOSE, self._window()]
+
+    @property
+    def volume(self):
+        return self._values[self.VOLUME, self._window()]
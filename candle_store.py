@@ -0,0 +1,161 @@
+import sqlite3
+import threading
+
+import numpy as np
+
+from resampler import timeframe_to_ms
+
+
+class CandleStore:
+    """
+    Almacén local de velas OHLCV en SQLite (una tabla para todos los símbolos).
+
+    Es la fuente de historial compartida por el bot en vivo, los backtests y
+    analytics: las velas descargadas una vez se reutilizan entre ejecuciones.
+    Las escrituras son upserts por (symbol, timeframe, timestamp), así que la
+    vela en formación se sobrescribe al cerrar. La conexión se comparte entre
+    hilos protegida por un lock.
+    """
+
+    def __init__(self, path, logger=None):
+        """
+        Args:
+            path: Fichero SQLite (ej. data_dir/candles.db) o ':memory:'
+            logger: Logger opcional para registrar backfills
+        """
+        self.path = path
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # Sin fsync por commit: en WAL solo un corte de luz perdería las últimas velas (re-descargables)
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS candles ("
+                " symbol TEXT NOT NULL, timeframe TEXT NOT NULL, timestamp INTEGER NOT NULL,"
+                " open REAL, high REAL, low REAL, close REAL, volume REAL,"
+                " PRIMARY KEY (symbol, timeframe, timestamp)) WITHOUT ROWID"
+            )
+
+    def close(self):
+        """Cierra la conexión SQLite"""
+        with self._lock:
+            self._conn.close()
+
+    def upsert(self, symbol, timeframe, rows):
+        """
+        Inserta o reemplaza velas [timestamp, open, high, low, close, volume].
+
+        Returns:
+            Número de filas escritas
+        """
+        data = [(symbol, timeframe, int(row[0]), row[1], row[2], row[3], row[4], row[5] or 0.0)
+                for row in rows]
+        if not data:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", data
+            )
+        return len(data)
+
+    def load(self, symbol, timeframe, since=None, until=None, limit=None):
+        """
+        Velas almacenadas en formato ccxt, de la más antigua a la más reciente.
+
+        Args:
+            since: Timestamp mínimo (ms, incluido)
+            until: Timestamp máximo (ms, incluido)
+            limit: Si se indica, solo las `limit` más recientes del rango
+        """
+        query = "SELECT timestamp, open, high, low, close, volume FROM candles WHERE symbol = ? AND timeframe = ?"
+        params = [symbol, timeframe]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(since))
+        if until is not None:
+            query += " AND timestamp <= ?"
+            params.append(int(until))
+        if limit is not None:
+            query = f"SELECT * FROM ({query} ORDER BY timestamp DESC LIMIT ?) ORDER BY timestamp"
+            params.append(int(limit))
+        else:
+            query += " ORDER BY timestamp"
+
+        with self._lock:
+            return [list(row) for row in self._conn.execute(query, params)]
+
+    def load_arrays(self, symbol, timeframe, since=None, until=None, limit=None):
+        """
+        Igual que load() pero en columnas NumPy (timestamp int64, resto float64).
+
+        Returns:
+            dict con 'timestamp', 'open', 'high', 'low', 'close', 'volume'
+        """
+        rows = self.load(symbol, timeframe, since, until, limit)
+        table = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+        arrays = {name: table[:, i].copy() for i, name in enumerate(('timestamp', 'open', 'high', 'low', 'close', 'volume'))}
+        arrays['timestamp'] = arrays['timestamp'].astype(np.int64)
+        return arrays
+
+    def count(self, symbol, timeframe):
+        """Número de velas almacenadas"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM candles WHERE symbol = ? AND timeframe = ?", (symbol, timeframe)
+            ).fetchone()[0]
+
+    def last_timestamp(self, symbol, timeframe):
+        """Timestamp de la vela más reciente o None"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MAX(timestamp) FROM candles WHERE symbol = ? AND timeframe = ?", (symbol, timeframe)
+            ).fetchone()[0]
+
+    def find_gaps(self, symbol, timeframe, start, end):
+        """
+        Rangos sin velas dentro de [start, end].
+
+        Returns:
+            Lista de (desde, hasta) en ms, ambos incluidos y alineados al timeframe
+        """
+        step = timeframe_to_ms(timeframe)
+        start = int(start) - int(start) % step
+        end = int(end) - int(end) % step
+        with self._lock:
+            stored = np.fromiter(
+                (row[0] for row in self._conn.execute(
+                    "SELECT timestamp FROM candles WHERE symbol = ? AND timeframe = ?"
+                    " AND timestamp >= ? AND timestamp <= ? ORDER BY timestamp",
+                    (symbol, timeframe, start, end))),
+                dtype=np.int64
+            )
+
+        # Centinelas a un paso de los extremos para detectar huecos inicial y final
+        bounds = np.concatenate(([start - step], stored, [end + step]))
+        holes = np.nonzero(np.diff(bounds) > step)[0]
+        return [(int(bounds[i] + step), int(bounds[i + 1] - step)) for i in holes]
+
+    def backfill(self, exchange, symbol, timeframe, start, end, page_limit=1000):
+        """
+        Descarga con fetch_ohlcv paginado los huecos de [start, end].
+
+        Returns:
+            Número de velas escritas
+        """
+        step = timeframe_to_ms(timeframe)
+        written = 0
+        for gap_start, gap_end in self.find_gaps(symbol, timeframe, start, end):
+            cursor = gap_start
+            while cursor <= gap_end:
+                rows = exchange.fetch_ohlcv(symbol, timeframe, since=cursor, limit=page_limit)
+                rows = [row for row in rows if cursor <= row[0] <= gap_end]
+                if not rows:
+                    break  # El exchange no tiene velas en este tramo (p. ej. mantenimiento)
+                written += self.upsert(symbol, timeframe, rows)
+                cursor = int(rows[-1][0]) + step
+
+        if written and self.logger:
+            self.logger.info(f"📥 Backfill {symbol} {timeframe}: {written} velas descargadas")
+        return written
@@ -16,9 +16,20 @@ class BotConfig:
         self.testnet = testnet
         self.symbol = 'BTC/USDT'
         self.timeframe = '4h'  # Timeframe para swing trading
+        self.higher_timeframes = []  # Ej. ['12h', '1d']: se construyen localmente desde timeframe
+        self.scan_symbols = []  # Pares adicionales a escanear (solo señales, sin operar), ej. ['ETH/USDT', 'SOL/USDT']
+        self.scanner_workers = 8  # Hilos del escáner multi-símbolo
+        self.incremental_sync = True  # Pedir solo velas desde la última conocida (no el historial completo)
+        self.check_interval = 1800  # Segundos entre evaluaciones completas dentro de una vela (None = solo cierres)
+        self.candle_settle_seconds = 5  # Margen tras el cierre de vela para que el exchange la publique
+        self.summary_interval = 14400  # Resumen de performance cada 4h (alineado a velas)
+        self.save_state_interval = 3600  # Guardado de estado cada hora
+        self.market_data_source = 'polling'  # 'polling' (REST cada check_interval) o 'websocket' (eventos en vivo)
+        self.async_exchange = False  # Cliente ccxt asíncrono (sesión compartida, llamadas concurrentes)
 
         # Configuración RSI (optimizado para 4h timeframe)
         self.rsi_period = 14
+        self.rsi_smoothing = 'sma'  # 'sma' (medias simples) o 'wilder' (RMA, actualizable vela a vela)
         self.rsi_oversold = 40  # Aumentado de 35 - más señales en 4h
         self.rsi_overbought = 65  # Reducido de 75 - más señales en 4h
         self.rsi_neutral_low = 45  # RSI mínimo para confirmar señal long
@@ -28,6 +39,17 @@ class BotConfig:
         self.ema_fast_period = 21
         self.ema_slow_period = 50
         self.ema_trend_period = 200  # EMA para filtro de tendencia principal
+        self.indicator_cache_size = 256  # Entradas LRU de indicadores sobre velas cerradas
+        self.indicator_engine = 'numpy'  # 'numpy' (buffers float64, sin pandas) o 'pandas'
+
+        # Indicadores de volatilidad y régimen (se añaden a market_data)
+        self.atr_period = 14
+        self.bb_period = 20
+        self.bb_std = 2.0
+        self.macd_fast_period = 12
+        self.macd_slow_period = 26
+        self.macd_signal_period = 9
+        self.adx_period = 14
 
         # Gestión de riesgo mejorada (optimizado para 4h timeframe)
         self.leverage = 1
@@ -76,4 +98,10 @@ class BotConfig:
         os.makedirs(self.data_dir, exist_ok=True)
 
         self.state_file = os.path.join(self.data_dir, 'bot_state.json')
+        self.candle_store_file = os.path.join(self.data_dir, 'candles.db')  # Historial local de velas (SQLite)
+        # Metadatos de load_markets: un fichero por entorno (testnet y mainnet tienen símbolos y precisiones distintos)
+        self.markets_cache_file = os.path.join(self.data_dir, f'markets_cache_{"testnet" if self.testnet else "mainnet"}.json')
+        self.markets_cache_ttl = 86400  # Segundos antes de refrescar los mercados en segundo plano
+        self.balance_cache_ttl = 30  # Segundos que se reutiliza fetch_balance (se invalida al operar)
+        self.request_weight_limit = 6000  # Peso de peticiones por minuto (límite de Binance spot)
         self.recovery_file = os.path.join(self.logs_dir, f'recovery_log_{datetime.now().strftime("%Y%m%d")}.txt')
@@ -1,37 +1,54 @@
 import ccxt
 
+from market_cache import MarketMetadataCache
+
 
 class ExchangeClient:
     """
     Cliente de exchange - Gestiona la conexión con Binance via CCXT
     """
 
-    def __init__(self, api_key, api_secret, config, logger):
+    def __init__(self, api_key, api_secret, config, logger, exchange=None):
         """
         Args:
             api_key: API key de Binance
             api_secret: API secret de Binance
             config: Configuración del bot
             logger: Logger para registrar información
+            exchange: Exchange ya creado (p. ej. FakeBinanceExchange); por defecto ccxt binance
         """
         self.config = config
         self.logger = logger
 
+        if exchange is not None:
+            self.exchange = exchange
+        else:
+            self.exchange = self._create_exchange(api_key, api_secret)
+
+        # Metadatos de mercados persistidos en data_dir (evita load_markets en cada arranque)
+        self.market_cache = MarketMetadataCache(config.markets_cache_file, config.markets_cache_ttl, logger)
+
+    def _create_exchange(self, api_key, api_secret):
         # Configurar exchange con CCXT
-        self.exchange = ccxt.binance({
+        return ccxt.binance({
             'apiKey': api_key,
             'secret': api_secret,
-            'sandbox': config.testnet,
+            'sandbox': self.config.testnet,
             'enableRateLimit': True,
             'options': {
                 'adjustForTimeDifference': True,
             }
         })
 
+    def load_markets(self):
+        """Carga los mercados desde la caché en disco o, si no es válida, desde Binance"""
+        return self.market_cache.prime(self.exchange, lambda: self.exchange.load_markets(True),
+                                       load_time_difference=lambda: self.exchange.load_time_difference())
+
     def verify_connection(self):
         """Verifica la conexión con Binance"""
         try:
-            self.exchange.load_markets()
+            self.load_markets()
 
             if self.config.symbol not in self.exchange.markets:
                 available_symbols = [s for s in self.exchange.markets.keys() if 'BTC' in s and 'USDT' in s]
@@ -46,3 +63,9 @@ class ExchangeClient:
         except Exception as e:
             self.logger.error(f"❌ Error de conexión: {e}")
             raise
+
+    def close(self):
+        """Cierra la sesión HTTP del exchange"""
+        session = getattr(self.exchange, 'session', None)
+        if session is not None:
+            session.close()
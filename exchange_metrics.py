@@ -0,0 +1,326 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Peso aproximado por endpoint según la documentación de la API spot de Binance
+# (klines depende del limit; el resto es fijo para un símbolo)
+ENDPOINT_WEIGHTS = {
+    'fetch_ticker': 2,
+    'fetch_balance': 20,
+    'fetch_positions': 5,
+    'load_markets': 20,
+    'create_market_order': 1,
+    'create_order': 1,
+    'cancel_order': 1,
+}
+
+# Límites superiores (ms) de los buckets del histograma de latencia
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+PRIORITIES = ('critical', 'normal', 'low')
+
+
+def request_weight(method, args, kwargs):
+    """Peso estimado de una llamada ccxt"""
+    if method == 'fetch_ohlcv':
+        limit = kwargs.get('limit') or (args[3] if len(args) > 3 else None) or 500
+        if limit < 100:
+            return 1
+        if limit < 500:
+            return 2
+        if limit <= 1000:
+            return 5
+        return 10
+    if method == 'fetch_cycle_data':
+        weight = request_weight('fetch_ohlcv', args, kwargs)
+        if kwargs.get('ticker', True):
+            weight += ENDPOINT_WEIGHTS['fetch_ticker']
+        if kwargs.get('balance', True):
+            weight += ENDPOINT_WEIGHTS['fetch_balance']
+        return weight
+    return ENDPOINT_WEIGHTS.get(method, 1)
+
+
+class ExchangeMetrics:
+    """Contadores, errores, peso y latencias por endpoint (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.started_at = time.time()
+
+    def record(self, method, latency_ms, weight, error=None):
+        """Registra una llamada completada (o fallida)"""
+        with self._lock:
+            stats = self.endpoints.get(method)
+            if stats is None:
+                stats = {'calls': 0, 'errors': 0, 'weight': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                         'histogram': [0] * len(LATENCY_BUCKETS_MS), 'last_error': None}
+                self.endpoints[method] = stats
+            stats['calls'] += 1
+            stats['weight'] += weight
+            stats['total_ms'] += latency_ms
+            stats['max_ms'] = max(stats['max_ms'], latency_ms)
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if latency_ms <= bound:
+                    stats['histogram'][i] += 1
+                    break
+            if error is not None:
+                stats['errors'] += 1
+                stats['last_error'] = f"{type(error).__name__}: {error}"
+
+    def snapshot(self):
+        """
+        Copia de las métricas.
+
+        Returns:
+            dict con 'endpoints' ({método: calls, errors, error_rate, weight,
+            avg_ms, max_ms, histogram, last_error}) y totales
+        """
+        with self._lock:
+            endpoints = {}
+            for method, stats in self.endpoints.items():
+                endpoint = dict(stats)
+                endpoint['histogram'] = dict(zip([str(b) for b in LATENCY_BUCKETS_MS], stats['histogram']))
+                endpoint['avg_ms'] = stats['total_ms'] / stats['calls'] if stats['calls'] else 0.0
+                endpoint['error_rate'] = stats['errors'] / stats['calls'] * 100 if stats['calls'] else 0.0
+                del endpoint['total_ms']
+                endpoints[method] = endpoint
+
+        calls = sum(e['calls'] for e in endpoints.values())
+        return {
+            'endpoints': endpoints,
+            'total_calls': calls,
+            'total_errors': sum(e['errors'] for e in endpoints.values()),
+            'total_weight': sum(e['weight'] for e in endpoints.values()),
+            'uptime_seconds': time.time() - self.started_at
+        }
+
+
+class RequestBudget:
+    """
+    Presupuesto de peso de peticiones en ventana deslizante (Binance: 6000/min).
+
+    Cada prioridad puede consumir hasta una fracción del límite: las
+    peticiones 'low' (resúmenes, escáner) esperan en cuanto se usa la mitad
+    del presupuesto, las 'normal' al 80% y las 'critical' (órdenes, stops)
+    solo si se alcanzaría el límite. Así las tareas secundarias ceden antes
+    de que una orden pueda recibir un 429. El peso que informa el servidor
+    (x-mbx-used-weight-1m) corrige la estimación local.
+    """
+
+    SHARES = {'critical': 1.0, 'normal': 0.8, 'low': 0.5}
+
+    def __init__(self, weight_limit=6000, window_seconds=60, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            weight_limit: Peso máximo por ventana
+            window_seconds: Duración de la ventana
+            clock: Reloj monótono (inyectable para tests)
+            sleep: Función de espera (inyectable para tests)
+        """
+        self.weight_limit = weight_limit
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._entries = deque()  # (instante, peso)
+        self._used = 0
+        self._server_used = 0
+        self._server_time = None
+        self.deferrals = {priority: 0 for priority in PRIORITIES}
+        self.deferred_seconds = 0.0
+
+    def _expire(self, now):
+        while self._entries and now - self._entries[0][0] >= self.window_seconds:
+            self._used -= self._entries.popleft()[1]
+        if self._server_time is not None and now - self._server_time >= self.window_seconds:
+            self._server_used = 0
+            self._server_time = None
+
+    def used_weight(self):
+        """Peso consumido en la ventana actual (máximo entre estimación local y servidor)"""
+        with self._lock:
+            self._expire(self.clock())
+            return max(self._used, self._server_used)
+
+    def _delay(self, now, weight, priority):
+        """Segundos hasta que `weight` cabe en la cuota de la prioridad (0 = ya cabe). Requiere el lock"""
+        self._expire(now)
+        allowed = self.weight_limit * self.SHARES[priority]
+        if max(self._used, self._server_used) + weight <= allowed or (not self._entries and not self._server_used):
+            return 0.0
+        oldest = self._entries[0][0] if self._entries else self._server_time
+        return max(oldest + self.window_seconds - now, 0.01)
+
+    def _reserve(self, now, weight):
+        self._entries.append((now, weight))
+        self._used += weight
+
+    def acquire(self, weight, priority='normal'):
+        """
+        Reserva `weight` esperando si la prioridad no tiene margen.
+
+        Returns:
+            Segundos esperados
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                delay = self._delay(now, weight, priority)
+                if not delay:
+                    self._reserve(now, weight)
+                    if waited:
+                        self.deferrals[priority] += 1
+                        self.deferred_seconds += waited
+                    return waited
+            self.sleep(delay)
+            waited += delay
+
+    def try_acquire(self, weight, priority='low'):
+        """
+        Reserva `weight` solo si la prioridad tiene margen ahora, sin esperar.
+
+        Returns:
+            True si se reservó; False si hay que aplazar la petición
+        """
+        with self._lock:
+            now = self.clock()
+            if self._delay(now, weight, priority):
+                self.deferrals[priority] += 1
+                return False
+            self._reserve(now, weight)
+            return True
+
+    def retry_after(self, weight, priority='low'):
+        """Segundos hasta que `weight` cabría en la cuota de la prioridad (0 = ya cabe)"""
+        with self._lock:
+            return self._delay(self.clock(), weight, priority)
+
+    def observe_server_weight(self, used_weight):
+        """Actualiza con el peso usado que reporta Binance en las cabeceras"""
+        with self._lock:
+            self._server_used = int(used_weight)
+            self._server_time = self.clock()
+
+    def stats(self):
+        """Peso usado, límite y aplazamientos por prioridad"""
+        return {
+            'used_weight': self.used_weight(),
+            'weight_limit': self.weight_limit,
+            'deferrals': dict(self.deferrals),
+            'deferred_seconds': self.deferred_seconds
+        }
+
+
+class BudgetDeferred(Exception):
+    """Petición de baja prioridad aplazada por falta de presupuesto de peso"""
+
+    def __init__(self, method, retry_after):
+        super().__init__(f"{method} aplazada {retry_after:.1f}s por presupuesto de peso")
+        self.method = method
+        self.retry_after = retry_after
+
+
+class InstrumentedExchange:
+    """
+    Envoltorio de un exchange ccxt que mide y presupuesta cada petición.
+
+    Expone la misma interfaz (los módulos no cambian). Las llamadas de red
+    pasan por RequestBudget según la prioridad activa en el hilo (ver
+    priority()); las órdenes son siempre 'critical'. Las peticiones 'low'
+    no esperan nunca: sin margen lanzan BudgetDeferred para que la tarea se
+    reprograme en lugar de bloquear el loop principal. Latencia, peso y
+    errores se registran en ExchangeMetrics.
+    """
+
+    CRITICAL_METHODS = ('create_market_order', 'create_order', 'cancel_order')
+    NON_BLOCKING_PRIORITIES = ('low',)
+
+    def __init__(self, exchange, metrics=None, budget=None, default_priority='normal'):
+        """
+        Args:
+            exchange: Exchange ccxt (o fachada síncrona) a instrumentar
+            metrics: ExchangeMetrics (se crea uno si no se indica)
+            budget: RequestBudget opcional
+            default_priority: Prioridad fuera de un contexto priority()
+        """
+        if default_priority not in PRIORITIES:
+            raise ValueError(f"Prioridad desconocida: {default_priority}")
+        self._exchange = exchange
+        self.metrics = metrics or ExchangeMetrics()
+        self.budget = budget
+        self.default_priority = default_priority
+        self._local = threading.local()
+
+    def with_priority(self, level):
+        """
+        Vista del mismo exchange con otra prioridad por defecto.
+
+        Comparte métricas y presupuesto; útil para módulos que lanzan
+        peticiones desde sus propios hilos (p. ej. el escáner).
+        """
+        return InstrumentedExchange(self._exchange, self.metrics, self.budget, default_priority=level)
+
+    def current_priority(self):
+        """Prioridad activa en el hilo actual"""
+        return getattr(self._local, 'priority', self.default_priority)
+
+    @contextmanager
+    def priority(self, level):
+        """Contexto que fija la prioridad de las peticiones del hilo actual"""
+        if level not in PRIORITIES:
+            raise ValueError(f"Prioridad desconocida: {level}")
+        previous = self.current_priority()
+        self._local.priority = level
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def _is_request(self, name):
+        return name.startswith(('fetch_', 'create_', 'cancel_', 'load_markets'))
+
+    def __getattr__(self, name):
+        attribute = getattr(self._exchange, name)
+        if not callable(attribute) or not self._is_request(name):
+            return attribute
+
+        def instrumented_call(*args, **kwargs):
+            weight = request_weight(name, args, kwargs)
+            if self.budget is not None:
+                level = 'critical' if name in self.CRITICAL_METHODS else self.current_priority()
+                if level in self.NON_BLOCKING_PRIORITIES:
+                    if not self.budget.try_acquire(weight, level):
+                        raise BudgetDeferred(name, self.budget.retry_after(weight, level))
+                else:
+                    self.budget.acquire(weight, level)
+
+            start = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as e:
+                self.metrics.record(name, (time.perf_counter() - start) * 1000, weight, error=e)
+                raise
+            self.metrics.record(name, (time.perf_counter() - start) * 1000, weight)
+            self._observe_headers()
+            return result
+
+        instrumented_call.__name__ = name
+        return instrumented_call
+
+    def _observe_headers(self):
+        if self.budget is None:
+            return
+        headers = getattr(self._exchange, 'last_response_headers', None)
+        if not isinstance(headers, dict):
+            return
+        for key, value in headers.items():
+            if key.lower() == 'x-mbx-used-weight-1m':
+                try:
+                    self.budget.observe_server_weight(value)
+                except (TypeError, ValueError):
+                    pass
+                return
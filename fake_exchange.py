@@ -0,0 +1,325 @@
+import random
+import time
+
+import ccxt
+import numpy as np
+
+from market_stream import read_candles_csv
+from resampler import timeframe_to_ms
+
+
+def synthetic_candles(count, timeframe='4h', start_price=30000.0, drift=0.0, volatility=0.02,
+                      seed=None, start=None):
+    """
+    Velas sintéticas de un paseo aleatorio geométrico.
+
+    Args:
+        count: Número de velas
+        timeframe: Timeframe de las velas
+        start_price: Precio de apertura de la primera vela
+        drift: Rentabilidad media por vela
+        volatility: Desviación típica de la rentabilidad por vela
+        seed: Semilla para reproducibilidad
+        start: Timestamp (ms) de la primera vela; por defecto la serie termina ahora
+
+    Returns:
+        Lista de [timestamp, open, high, low, close, volume]
+    """
+    rng = np.random.default_rng(seed)
+    step = timeframe_to_ms(timeframe)
+    if start is None:
+        start = (int(time.time() * 1000) // step - count + 1) * step
+
+    closes = start_price * np.exp(np.cumsum(rng.normal(drift, volatility, count)))
+    opens = np.concatenate(([start_price], closes[:-1]))
+    wicks = np.abs(rng.normal(0, volatility / 2, (2, count)))
+    highs = np.maximum(opens, closes) * (1 + wicks[0])
+    lows = np.minimum(opens, closes) * (1 - wicks[1])
+    volumes = rng.uniform(50, 500, count)
+
+    return [[start + i * step, float(opens[i]), float(highs[i]), float(lows[i]), float(closes[i]), float(volumes[i])]
+            for i in range(count)]
+
+
+class FakeBinanceExchange:
+    """
+    Exchange Binance simulado en proceso (sin red) con la interfaz ccxt que usa el bot.
+
+    Reproduce una serie de velas (grabada o sintética) con un cursor: la vela
+    del cursor es la vela en formación y el reloj simulado está justo antes
+    de su cierre. advance() mueve el cursor. Las órdenes de mercado se
+    ejecutan al cierre actual con deslizamiento, comisión (en la moneda de
+    cotización) y fill parcial configurables, y actualizan el balance. Se
+    puede añadir latencia por llamada y errores de límite de peticiones o de
+    red, aleatorios (con semilla) o encolados con inject_error().
+    """
+
+    rateLimit = 50
+
+    def __init__(self, candles, symbol='BTC/USDT', timeframe='4h', balance=None, warmup=300,
+                 fee_rate=0.001, slippage_pct=0.0, fill_ratio=1.0, latency=0.0,
+                 rate_limit_rate=0.0, network_error_rate=0.0, seed=None, sleep=time.sleep, allow_short=False):
+        """
+        Args:
+            candles: Velas [timestamp, open, high, low, close, volume] ordenadas
+            symbol: Símbolo simulado (ej. 'BTC/USDT')
+            timeframe: Timeframe de las velas
+            balance: Balance inicial {moneda: cantidad} (por defecto 10000 en cotización)
+            warmup: Velas visibles al empezar (historial para las EMAs)
+            fee_rate: Comisión por operación (0.001 = 0.1%)
+            slippage_pct: Deslizamiento en % contra el lado de la orden
+            fill_ratio: Fracción ejecutada de cada orden de mercado (0-1]
+            latency: Segundos por llamada, o tupla (mín, máx) para latencia aleatoria
+            rate_limit_rate: Probabilidad de ccxt.RateLimitExceeded por llamada
+            network_error_rate: Probabilidad de ccxt.NetworkError por llamada
+            seed: Semilla del generador de latencias y errores
+            sleep: Función de espera para la latencia (inyectable)
+            allow_short: Permitir vender sin tenencia (saldo base negativo, como en margen)
+        """
+        if not candles:
+            raise ValueError("Se necesita al menos una vela")
+        self.rows = [list(row[:6]) for row in candles]
+        self.timestamps = np.array([row[0] for row in self.rows], dtype=np.int64)
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.step = timeframe_to_ms(timeframe)
+        self.base, self.quote = symbol.split('/')
+
+        self.fee_rate = fee_rate
+        self.slippage_pct = slippage_pct
+        self.fill_ratio = fill_ratio
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.network_error_rate = network_error_rate
+        self.random = random.Random(seed)
+        self.sleep = sleep
+        self.allow_short = allow_short
+
+        self.balances = {self.base: 0.0, self.quote: 10000.0}
+        if balance:
+            self.balances.update({currency: float(amount) for currency, amount in balance.items()})
+
+        self.cursor = min(max(warmup, 1), len(self.rows)) - 1
+        self.markets = None
+        self.currencies = None
+        self.orders = []
+        self.calls = {}
+        self.pending_errors = []
+        self.injected_errors = 0  # Errores de red/429 simulados (no rechazos de órdenes)
+        self.last_response_headers = {}
+
+    @classmethod
+    def synthetic(cls, count, symbol='BTC/USDT', timeframe='4h', seed=None, path_kwargs=None, **kwargs):
+        """Exchange sobre velas de synthetic_candles()"""
+        candles = synthetic_candles(count, timeframe, seed=seed, **(path_kwargs or {}))
+        return cls(candles, symbol, timeframe, seed=seed, **kwargs)
+
+    @classmethod
+    def from_store(cls, store, symbol, timeframe, since=None, until=None, **kwargs):
+        """Exchange sobre el historial de un CandleStore"""
+        return cls(store.load(symbol, timeframe, since, until), symbol, timeframe, **kwargs)
+
+    @classmethod
+    def from_csv(cls, path, symbol, timeframe, **kwargs):
+        """Exchange sobre un CSV con columnas timestamp,open,high,low,close,volume"""
+        return cls(read_candles_csv(path), symbol, timeframe, **kwargs)
+
+    # --- Reloj y recorrido -------------------------------------------------
+
+    @property
+    def current_candle(self):
+        return self.rows[self.cursor]
+
+    @property
+    def exhausted(self):
+        """True si el cursor está en la última vela"""
+        return self.cursor >= len(self.rows) - 1
+
+    def milliseconds(self):
+        """Reloj simulado en ms (1 ms antes del cierre de la vela en formación)"""
+        return int(self.rows[self.cursor][0]) + self.step - 1
+
+    def clock(self):
+        """Reloj simulado en segundos (para inyectar en el bot/analizador)"""
+        return self.milliseconds() / 1000.0
+
+    def advance(self, steps=1):
+        """
+        Avanza el cursor `steps` velas.
+
+        Returns:
+            False si ya no quedan velas
+        """
+        if self.exhausted:
+            return False
+        self.cursor = min(self.cursor + steps, len(self.rows) - 1)
+        return True
+
+    # --- Simulación de red -------------------------------------------------
+
+    def inject_error(self, error):
+        """Encola una excepción que lanzará la próxima llamada"""
+        self.pending_errors.append(error)
+
+    def _request(self, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+        if self.latency:
+            delay = self.random.uniform(*self.latency) if isinstance(self.latency, tuple) else self.latency
+            self.sleep(delay)
+
+        if self.pending_errors:
+            self.injected_errors += 1
+            raise self.pending_errors.pop(0)
+        if self.rate_limit_rate and self.random.random() < self.rate_limit_rate:
+            self.injected_errors += 1
+            raise ccxt.RateLimitExceeded(f"binance 429 Too Many Requests ({method}, simulado)")
+        if self.network_error_rate and self.random.random() < self.network_error_rate:
+            self.injected_errors += 1
+            raise ccxt.NetworkError(f"binance {method} timeout (simulado)")
+
+    def _check_symbol(self, symbol):
+        if symbol != self.symbol:
+            raise ccxt.BadSymbol(f"binance does not have market symbol {symbol}")
+
+    # --- API ccxt ----------------------------------------------------------
+
+    def load_markets(self, reload=False):
+        self._request('load_markets')
+        if self.markets is None or reload:
+            self.set_markets({
+                self.symbol: {
+                    'id': self.symbol.replace('/', ''),
+                    'symbol': self.symbol,
+                    'base': self.base,
+                    'quote': self.quote,
+                    'type': 'spot',
+                    'spot': True,
+                    'active': True,
+                    'precision': {'amount': 5, 'price': 2},
+                    'limits': {'amount': {'min': 0.00001}, 'cost': {'min': 5.0}}
+                }
+            }, {
+                code: {'id': code, 'code': code, 'precision': 8} for code in (self.base, self.quote)
+            })
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = markets
+        self.currencies = currencies
+
+    def set_sandbox_mode(self, enabled):
+        pass
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        """Velas visibles hasta el cursor (la última en formación), como Binance"""
+        self._request('fetch_ohlcv')
+        self._check_symbol(symbol)
+        if timeframe != self.timeframe:
+            raise ccxt.BadRequest(f"Timeframe {timeframe} no simulado (solo {self.timeframe})")
+
+        limit = limit or 500
+        end = self.cursor + 1
+        if since is not None:
+            start = int(np.searchsorted(self.timestamps[:end], since, side='left'))
+            end = min(end, start + limit)
+        else:
+            start = max(0, end - limit)
+        return [list(row) for row in self.rows[start:end]]
+
+    def fetch_ticker(self, symbol, params=None):
+        self._request('fetch_ticker')
+        self._check_symbol(symbol)
+        timestamp, open_, high, low, close, volume = self.current_candle
+        return {
+            'symbol': symbol,
+            'timestamp': self.milliseconds(),
+            'open': open_, 'high': high, 'low': low, 'close': close, 'last': close,
+            'bid': close, 'ask': close,
+            'baseVolume': volume, 'quoteVolume': volume * close
+        }
+
+    def fetch_balance(self, params=None):
+        self._request('fetch_balance')
+        balance = {'free': {}, 'used': {}, 'total': {}}
+        for currency, amount in self.balances.items():
+            balance[currency] = {'free': amount, 'used': 0.0, 'total': amount}
+            balance['free'][currency] = amount
+            balance['used'][currency] = 0.0
+            balance['total'][currency] = amount
+        return balance
+
+    def fetch_positions(self, symbols=None, params=None):
+        """La tenencia del activo base se expone como posición (long, o short con allow_short)"""
+        self._request('fetch_positions')
+        size = self.balances.get(self.base, 0.0)
+        if abs(size) < 1e-12 or (symbols and self.symbol not in symbols):
+            return []
+        side = 'long' if size > 0 else 'short'
+        return [{'symbol': self.symbol, 'side': side, 'size': abs(size), 'contracts': abs(size),
+                 'entryPrice': self._average_entry('buy' if side == 'long' else 'sell')}]
+
+    def equity(self):
+        """Valor de la cuenta en la moneda de cotización al cierre actual"""
+        return self.balances[self.quote] + self.balances[self.base] * self.current_candle[4]
+
+    def _average_entry(self, side):
+        orders = [order for order in self.orders if order['side'] == side]
+        filled = sum(order['filled'] for order in orders)
+        return sum(order['cost'] for order in orders) / filled if filled else 0.0
+
+    def create_market_order(self, symbol, side, amount, price=None, params=None):
+        self._request('create_market_order')
+        self._check_symbol(symbol)
+        if side not in ('buy', 'sell'):
+            raise ccxt.InvalidOrder(f"Lado de orden inválido: {side}")
+        if amount <= 0:
+            raise ccxt.InvalidOrder(f"Cantidad inválida: {amount}")
+
+        last = self.current_candle[4]
+        fill_price = last * (1 + self.slippage_pct / 100) if side == 'buy' else last * (1 - self.slippage_pct / 100)
+        filled = amount * self.fill_ratio
+        cost = filled * fill_price
+        fee = cost * self.fee_rate
+
+        if side == 'buy':
+            if self.balances[self.quote] < cost + fee:
+                raise ccxt.InsufficientFunds(
+                    f"binance Account has insufficient balance ({self.balances[self.quote]:.2f} {self.quote})"
+                )
+            self.balances[self.quote] -= cost + fee
+            self.balances[self.base] += filled
+        else:
+            if not self.allow_short and self.balances[self.base] < filled - 1e-12:
+                raise ccxt.InsufficientFunds(
+                    f"binance Account has insufficient balance ({self.balances[self.base]:.8f} {self.base})"
+                )
+            self.balances[self.base] -= filled
+            self.balances[self.quote] += cost - fee
+
+        order = {
+            'id': str(len(self.orders) + 1),
+            'symbol': symbol,
+            'type': 'market',
+            'side': side,
+            'amount': amount,
+            'filled': filled,
+            'remaining': amount - filled,
+            'price': fill_price,
+            'average': fill_price,
+            'cost': cost,
+            'fee': {'cost': fee, 'currency': self.quote},
+            'status': 'closed' if filled >= amount else 'expired',
+            'timestamp': self.milliseconds()
+        }
+        self.orders.append(order)
+        return order
+
+    def amount_to_precision(self, symbol, amount):
+        return f"{amount:.5f}"
+
+    def price_to_precision(self, symbol, price):
+        return f"{price:.2f}"
+
+    def close(self):
+        pass
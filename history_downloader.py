@@ -0,0 +1,224 @@
+"""
+Descarga paralela de historial OHLCV al almacén local de velas.
+
+Uso:
+    python history_downloader.py --timeframes 4h 1h 15m --start 2021-01-01
+    python history_downloader.py --symbol ETH/USDT --timeframes 1h --start 2023-01-01 --end 2024-01-01 --workers 8
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import ccxt
+
+from candle_store import CandleStore
+from resampler import timeframe_to_ms
+
+
+class _RequestPacer:
+    """Espacia las peticiones de todos los hilos para no superar `rate` por segundo"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class HistoryDownloader:
+    """
+    Descarga un rango de fechas en tramos concurrentes y lo guarda en CandleStore.
+
+    El rango se divide en tramos de `chunk_candles` velas que se piden en
+    paralelo; un pacer compartido mantiene el ritmo total dentro del límite
+    del exchange (rateLimit de ccxt). Cada tramo completado se anota en un
+    checkpoint JSON, de modo que una descarga interrumpida se reanuda sin
+    repetir tramos. Los tramos que incluyen la vela en formación no se anotan.
+    """
+
+    def __init__(self, exchange, store, logger, max_workers=4, chunk_candles=1000,
+                 checkpoint_file=None, requests_per_second=None, max_retries=3):
+        """
+        Args:
+            exchange: Instancia ccxt (o compatible) con fetch_ohlcv
+            store: CandleStore destino
+            logger: Logger para registrar información
+            max_workers: Peticiones simultáneas
+            chunk_candles: Velas por tramo (y por petición)
+            checkpoint_file: JSON con los tramos completados (None = sin reanudación)
+            requests_per_second: Presupuesto de peticiones; por defecto 1000 / exchange.rateLimit
+            max_retries: Reintentos por tramo ante errores de red o de rate limit
+        """
+        self.exchange = exchange
+        self.store = store
+        self.logger = logger
+        self.max_workers = max_workers
+        self.chunk_candles = chunk_candles
+        self.checkpoint_file = checkpoint_file
+        self.max_retries = max_retries
+
+        if requests_per_second is None:
+            rate_limit_ms = getattr(exchange, 'rateLimit', 0) or 0
+            requests_per_second = 1000.0 / rate_limit_ms if rate_limit_ms else None
+        self.pacer = _RequestPacer(requests_per_second)
+
+        self._checkpoint_lock = threading.Lock()
+        self.checkpoint = self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return {}
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Checkpoint de descarga ilegible, se empieza de cero: {e}")
+            return {}
+
+    def _mark_done(self, key, chunk_start):
+        with self._checkpoint_lock:
+            self.checkpoint.setdefault(key, []).append(chunk_start)
+            if not self.checkpoint_file:
+                return
+            tmp_file = self.checkpoint_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(self.checkpoint, f)
+            os.replace(tmp_file, self.checkpoint_file)
+
+    def plan_chunks(self, timeframe, start, end):
+        """
+        Divide [start, end] en tramos alineados al timeframe.
+
+        Returns:
+            Lista de (desde, hasta) en ms, ambos incluidos
+        """
+        step = timeframe_to_ms(timeframe)
+        start = int(start) - int(start) % step
+        end = int(end) - int(end) % step
+        span = self.chunk_candles * step
+        return [(since, min(since + span - step, end)) for since in range(start, end + 1, span)]
+
+    def _fetch_chunk(self, symbol, timeframe, since, until):
+        """Descarga un tramo (paginando si el exchange devuelve menos velas) y lo guarda"""
+        step = timeframe_to_ms(timeframe)
+        cursor = since
+        written = 0
+        while cursor <= until:
+            limit = min(self.chunk_candles, (until - cursor) // step + 1)
+            rows = self._fetch_with_retry(symbol, timeframe, cursor, limit)
+            rows = [row for row in rows if cursor <= row[0] <= until]
+            if not rows:
+                break
+            written += self.store.upsert(symbol, timeframe, rows)
+            cursor = int(rows[-1][0]) + step
+        return written
+
+    def _fetch_with_retry(self, symbol, timeframe, since, limit):
+        for attempt in range(self.max_retries + 1):
+            self.pacer.wait()
+            try:
+                return self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+            except (ccxt.NetworkError, ccxt.RateLimitExceeded) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = 2 ** attempt
+                self.logger.warning(f"⚠️ Reintentando tramo {symbol} {timeframe} @ {since} en {delay}s: {e}")
+                time.sleep(delay)
+
+    def download(self, symbol, timeframe, start, end=None):
+        """
+        Descarga [start, end] (ms; end por defecto ahora) de un símbolo/timeframe.
+
+        Returns:
+            dict con chunks (total), skipped (ya completados), failed y candles (escritas)
+        """
+        now = int(time.time() * 1000)
+        end = now if end is None else min(int(end), now)
+        step = timeframe_to_ms(timeframe)
+        key = f"{symbol}|{timeframe}"
+        done = set(self.checkpoint.get(key, []))
+
+        chunks = self.plan_chunks(timeframe, start, end)
+        pending = [chunk for chunk in chunks if chunk[0] not in done]
+        summary = {'chunks': len(chunks), 'skipped': len(chunks) - len(pending), 'failed': 0, 'candles': 0}
+        self.logger.info(f"📥 {symbol} {timeframe}: {len(pending)}/{len(chunks)} tramos pendientes")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_chunk, symbol, timeframe, since, until): (since, until)
+                for since, until in pending
+            }
+            for future in as_completed(futures):
+                since, until = futures[future]
+                try:
+                    summary['candles'] += future.result()
+                    # El tramo con la vela en formación se volverá a pedir en la próxima ejecución
+                    if until + step <= now:
+                        self._mark_done(key, since)
+                except Exception as e:
+                    summary['failed'] += 1
+                    self.logger.error(f"Error descargando tramo {symbol} {timeframe} @ {since}: {e}")
+
+        self.logger.info(
+            f"✅ {symbol} {timeframe}: {summary['candles']} velas, "
+            f"{summary['skipped']} tramos reanudados, {summary['failed']} fallidos"
+        )
+        return summary
+
+
+def _parse_date(value):
+    """'YYYY-MM-DD' (UTC) a timestamp en ms"""
+    return int(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def main():
+    from dotenv import load_dotenv
+
+    from config import BotConfig
+    from exchange_client import ExchangeClient
+
+    parser = argparse.ArgumentParser(description="Descarga historial OHLCV al almacén local de velas")
+    parser.add_argument('--symbol', default=None, help="Por defecto config.symbol")
+    parser.add_argument('--timeframes', nargs='+', default=None, help="Por defecto config.timeframe")
+    parser.add_argument('--start', required=True, help="Fecha inicial YYYY-MM-DD (UTC)")
+    parser.add_argument('--end', default=None, help="Fecha final YYYY-MM-DD (UTC), por defecto ahora")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk', type=int, default=1000, help="Velas por tramo")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    logger = logging.getLogger('history_downloader')
+
+    config = BotConfig(testnet=os.getenv('USE_TESTNET', 'true').lower() == 'true')
+    client = ExchangeClient(os.getenv('BINANCE_API_KEY'), os.getenv('BINANCE_API_SECRET'), config, logger)
+    store = CandleStore(config.candle_store_file, logger)
+    downloader = HistoryDownloader(
+        client.exchange, store, logger,
+        max_workers=args.workers,
+        chunk_candles=args.chunk,
+        checkpoint_file=os.path.join(config.data_dir, 'download_checkpoint.json')
+    )
+
+    symbol = args.symbol or config.symbol
+    start = _parse_date(args.start)
+    end = _parse_date(args.end) if args.end else None
+    for timeframe in args.timeframes or [config.timeframe]:
+        downloader.download(symbol, timeframe, start, end)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
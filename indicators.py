@@ -1,51 +1,923 @@
+import math
+from collections import OrderedDict, deque
+
 import pandas as pd
 import numpy as np
 
 
 class TechnicalIndicators:
     """
-    Calculadora de indicadores técnicos (RSI, EMA)
+    Calculadora de indicadores técnicos (RSI, EMA, ATR, Bollinger, MACD, ADX)
     """
 
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, cache_size=256, engine='pandas'):
         """
         Args:
             logger: Logger opcional para registrar errores
+            cache_size: Entradas máximas de la caché de velas cerradas
+            engine: Backend de cálculo: 'pandas' o 'numpy' (sin objetos pandas)
         """
+        if engine not in ENGINES:
+            raise ValueError(f"Motor de indicadores desconocido: {engine} (válidos: {', '.join(ENGINES)})")
         self.logger = logger
+        self.engine = engine
+        self.cache = IndicatorCache(cache_size)
 
     def calculate_ema(self, prices, period):
         """Calcula EMA (Exponential Moving Average)"""
         try:
-            if isinstance(prices, (list, np.ndarray)):
-                prices = pd.Series(prices)
-
-            return prices.ewm(span=period, adjust=False).mean().iloc[-1]
+            return self.ema_series(prices, period)[-1]
 
         except Exception as e:
             if self.logger:
                 self.logger.error(f"Error calculando EMA: {e}")
             return 0
 
-    def calculate_rsi(self, prices, period=14):
-        """Calcula el RSI"""
+    def calculate_rsi(self, prices, period=14, method='sma'):
+        """Calcula el RSI ('sma': medias simples, 'wilder': suavizado RMA)"""
         try:
-            if isinstance(prices, (list, np.ndarray)):
-                prices = pd.Series(prices)
+            rsi = self.rsi_series(prices, period, method)[-1]
+            return rsi if not np.isnan(rsi) else 50
 
-            delta = prices.diff()
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Error calculando RSI: {e}")
+            return 50
 
-            avg_gain = gain.rolling(window=period).mean()
-            avg_loss = loss.rolling(window=period).mean()
+    def ema_series(self, prices, period):
+        """
+        Serie completa de la EMA en una sola pasada vectorizada.
+
+        Returns:
+            np.ndarray float64 con un valor por vela (el último es calculate_ema)
+        """
+        prices = _as_float_array(prices)
+        if self.engine == 'numpy':
+            return _ema_bank_kernel(prices, [period])[0]
+        # ignore_na: las velas sin precio válido se omiten, igual que el kernel NumPy
+        prices = np.where(np.isfinite(prices), prices, np.nan)
+        return pd.Series(prices).ewm(span=period, adjust=False, ignore_na=True).mean().to_numpy()
+
+    def rsi_series(self, prices, period=14, method='sma'):
+        """
+        Serie completa del RSI en una sola pasada vectorizada.
+
+        Args:
+            prices: Serie de precios
+            period: Período del RSI
+            method: 'sma' (medias simples) o 'wilder' (suavizado RMA de Wilder)
 
+        Returns:
+            np.ndarray float64 con un valor por vela; NaN mientras no hay ventana
+            completa o sin movimiento (calculate_rsi lo traduce a 50). Las
+            velas con precio no finito se omiten y conservan el valor anterior
+        """
+        _check_rsi_method(method)
+        prices = _as_float_array(prices)
+        finite = np.isfinite(prices)
+        if not finite.all():
+            return _expand_skipped(self.rsi_series(prices[finite], period, method), finite)
+
+        # La primera vela no tiene diff: cuenta como ganancia/pérdida 0
+        delta = np.diff(prices, prepend=np.nan)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+
+        if method == 'wilder':
+            avg_gain = _wilder_average(gain, period, self.engine)
+            avg_loss = _wilder_average(loss, period, self.engine)
+        elif self.engine == 'numpy':
+            avg_gain = _rolling_mean(gain, period)
+            avg_loss = _rolling_mean(loss, period)
+        else:
+            avg_gain = pd.Series(gain).rolling(window=period).mean().to_numpy()
+            avg_loss = pd.Series(loss).rolling(window=period).mean().to_numpy()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
             rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
+            return 100 - (100 / (1 + rs))
 
-            return rsi.iloc[-1] if not pd.isna(rsi.iloc[-1]) else 50
+    def ema_bank(self, prices, periods, out=None):
+        """
+        Calcula varias EMAs sobre la misma serie en una sola pasada.
 
-        except Exception as e:
-            if self.logger:
-                self.logger.error(f"Error calculando RSI: {e}")
+        Args:
+            prices: Serie de precios
+            periods: Lista de períodos (ej. [ema_fast_period, ema_slow_period, ema_trend_period])
+            out: Array (len(periods), len(prices)) opcional a reutilizar
+
+        Returns:
+            np.ndarray 2-D con una fila por período
+        """
+        return _ema_bank_kernel(_as_float_array(prices), periods, out)
+
+    def indicator_suite(self, high, low, close, atr_period=14, bb_period=20, bb_std=2.0,
+                        macd_fast=12, macd_slow=26, macd_signal=9, adx_period=14):
+        """
+        Calcula ATR, ancho de Bollinger, MACD y ADX en una sola pasada OHLC.
+
+        El rango verdadero y las variaciones de máximos/mínimos se calculan una
+        vez y se comparten entre ATR y ADX; las EMAs del MACD salen del banco.
+
+        Returns:
+            dict de arrays float64 (NaN durante el calentamiento): 'atr',
+            'bb_width' (% del precio), 'macd', 'macd_signal', 'macd_hist',
+            'adx', 'plus_di', 'minus_di'
+        """
+        high = _as_float_array(high)
+        low = _as_float_array(low)
+        close = _as_float_array(close)
+        n = len(close)
+
+        # Rango verdadero y movimiento direccional (compartidos por ATR y ADX)
+        tr = np.empty(n)
+        plus_dm = np.zeros(n)
+        minus_dm = np.zeros(n)
+        if n:
+            prev_close = close[:-1]
+            tr[0] = high[0] - low[0]
+            tr[1:] = np.maximum.reduce([high[1:] - low[1:], np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)])
+            up = high[1:] - high[:-1]
+            down = low[:-1] - low[1:]
+            plus_dm[1:] = np.where((up > down) & (up > 0), up, 0.0)
+            minus_dm[1:] = np.where((down > up) & (down > 0), down, 0.0)
+
+        atr = _wilder_average(tr, atr_period, self.engine)
+        tr_smooth = atr if adx_period == atr_period else _wilder_average(tr, adx_period, self.engine)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            plus_di = 100 * _wilder_average(plus_dm, adx_period, self.engine) / tr_smooth
+            minus_di = 100 * _wilder_average(minus_dm, adx_period, self.engine) / tr_smooth
+            plus_di[tr_smooth == 0] = 0.0
+            minus_di[tr_smooth == 0] = 0.0
+            di_sum = plus_di + minus_di
+            dx = np.where(di_sum > 0, 100 * np.abs(plus_di - minus_di) / di_sum, 0.0)
+        dx[np.isnan(tr_smooth)] = np.nan
+        adx = _wilder_average(dx, adx_period, self.engine, start=adx_period)
+
+        # Bandas de Bollinger (desviación poblacional), ancho en % de la media
+        bb_width = np.full(n, np.nan)
+        if n >= bb_period:
+            windows = np.lib.stride_tricks.sliding_window_view(close, bb_period)
+            middle = windows.mean(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                bb_width[bb_period - 1:] = 2 * bb_std * windows.std(axis=1) / middle * 100
+
+        # MACD: ambas EMAs en el mismo recorrido del banco
+        emas = _ema_bank_kernel(close, [macd_fast, macd_slow])
+        macd = emas[0] - emas[1]
+        signal = _ema_bank_kernel(macd, [macd_signal])[0]
+
+        return {
+            'atr': atr,
+            'bb_width': bb_width,
+            'macd': macd,
+            'macd_signal': signal,
+            'macd_hist': macd - signal,
+            'adx': adx,
+            'plus_di': plus_di,
+            'minus_di': minus_di
+        }
+
+    def create_state(self, ema_periods, rsi_period=14, rsi_method='sma', suite_params=None):
+        """Crea un estado incremental de indicadores (EMAs + RSI + suite OHLC opcional)"""
+        return IndicatorState(ema_periods, rsi_period, rsi_method, suite_params)
+
+
+def _as_float_array(prices):
+    """Convierte listas, arrays o pd.Series a un array float64 contiguo"""
+    if isinstance(prices, pd.Series):
+        prices = prices.to_numpy()
+    return np.ascontiguousarray(prices, dtype=np.float64)
+
+
+RSI_METHODS = ('sma', 'wilder')
+ENGINES = ('pandas', 'numpy')
+
+
+def _check_rsi_method(method):
+    if method not in RSI_METHODS:
+        raise ValueError(f"Método RSI desconocido: {method} (válidos: {', '.join(RSI_METHODS)})")
+
+
+def _expand_skipped(values, finite):
+    """
+    Lleva a la serie original valores calculados solo sobre los precios finitos.
+
+    Cada vela omitida conserva el último valor calculado (NaN antes del primer
+    precio válido), igual que pandas ewm(ignore_na=True).
+    """
+    index = np.cumsum(finite) - 1
+    out = np.full(values.shape[:-1] + (len(finite),), np.nan)
+    valid = index >= 0
+    out[..., valid] = values[..., index[valid]]
+    return out
+
+
+def _rolling_mean(values, period):
+    """Media móvil simple en NumPy (NaN hasta completar la primera ventana)"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        out[period - 1:] = np.lib.stride_tricks.sliding_window_view(values, period).mean(axis=1)
+    return out
+
+
+def _wilder_average(values, period, engine='pandas', start=1):
+    """
+    Media de Wilder (RMA): semilla = media simple de las primeras `period`
+    variaciones reales, luego avg = (avg * (period - 1) + valor) / period.
+    Los valores anteriores a `start` se ignoran (por defecto values[0], la
+    primera vela sin variación).
+    """
+    out = np.full(len(values), np.nan)
+    first = start + period - 1
+    if len(values) <= first:
+        return out
+    seed = values[start:first + 1].mean()
+    rest = np.concatenate(([seed], values[first + 1:]))
+    if engine == 'numpy':
+        # RMA = EMA con alpha 1/period, es decir span 2*period - 1
+        out[first:] = _ema_bank_kernel(rest, [2 * period - 1])[0]
+    else:
+        out[first:] = pd.Series(rest).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    return out
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    """RSI a partir de medias de ganancia/pérdida (50 si no hay movimiento)"""
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 50
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+# Máximo factor de crecimiento d^-k dentro de un bloque del kernel EMA.
+# Acota el error relativo a ~1e4 * eps (≈2e-12) frente a la recursión directa.
+_EMA_BLOCK_GROWTH = 1e4
+
+
+def _ema_bank_kernel(prices, periods, out=None):
+    """
+    EMA (adjust=False) de varios períodos en un único recorrido por bloques.
+
+    Dentro de cada bloque de B velas la recursión y[t] = d*y[t-1] + a*x[t] se
+    resuelve en forma cerrada con sumas acumuladas ponderadas por d^-k, para
+    todos los bloques y períodos a la vez; después solo queda propagar el
+    arrastre entre bloques (una recursión escalar de n/B pasos). El tamaño de
+    bloque se elige para que d^-B no supere _EMA_BLOCK_GROWTH en el período
+    más rápido.
+    """
+    n = len(prices)
+    alphas = 2.0 / (np.asarray(periods, dtype=np.float64) + 1)
+    decays = 1.0 - alphas
+
+    if out is None:
+        out = np.empty((len(alphas), n), dtype=np.float64)
+    if n == 0:
+        return out
+
+    # Un NaN contaminaría todo lo posterior: las velas no finitas se omiten
+    finite = np.isfinite(prices)
+    if not finite.all():
+        out[:] = _expand_skipped(_ema_bank_kernel(prices[finite], periods), finite)
+        return out
+
+    # Período 1 (alpha=1): la EMA es el propio precio
+    direct = decays <= 0
+    out[direct] = prices
+    rows = np.flatnonzero(~direct)
+    if len(rows) == 0:
+        return out
+
+    a = alphas[rows]
+    d = decays[rows]
+    block = int(np.log(_EMA_BLOCK_GROWTH) / -np.log(d.min()))
+    block = max(1, min(n, block))
+    blocks = -(-n // block)
+
+    padded = np.zeros(blocks * block)
+    padded[:n] = prices
+    x = padded.reshape(blocks, block)
+
+    pw = d[:, None] ** np.arange(block)  # d^k
+    # Solución de cada bloque con arrastre cero: a * d^k * sum_{m<=k} d^-m * x[m]
+    local = np.cumsum((1.0 / pw)[:, None, :] * x, axis=2)
+    local *= (a[:, None] * pw)[:, None, :]
+
+    # Arrastre de entrada a cada bloque: c[k+1] = local[k, -1] + d^B * c[k];
+    # c[0] = x[0] reproduce y[0] = x[0]
+    carries = np.empty((len(rows), blocks))
+    for row, (decay, ends) in enumerate(zip((d ** block).tolist(), local[:, :, -1].tolist())):
+        carry = float(prices[0])
+        for k, end in enumerate(ends):
+            carries[row, k] = carry
+            carry = end + decay * carry
+
+    local += (pw * d[:, None])[:, None, :] * carries[:, :, None]
+    out[rows] = local.reshape(len(rows), -1)[:, :n]
+    return out
+
+
+def _slots_to_dict(obj):
+    """Serializa un estado con __slots__ a tipos JSON (deques como listas)"""
+    data = {}
+    for name in obj.__slots__:
+        value = getattr(obj, name)
+        data[name] = list(value) if isinstance(value, deque) else value
+    return data
+
+
+def _clone_slots(obj, memo=None):
+    """Copia profunda rápida de un estado con __slots__ (números, tuplas y deques)"""
+    clone = object.__new__(type(obj))
+    for name in obj.__slots__:
+        value = getattr(obj, name)
+        if isinstance(value, deque):
+            value = deque(value, maxlen=value.maxlen)
+        setattr(clone, name, value)
+    return clone
+
+
+def _slots_from_dict(obj, data):
+    """Restaura en `obj` los campos serializados con _slots_to_dict"""
+    for name in obj.__slots__:
+        if name not in data:
+            continue
+        current = getattr(obj, name)
+        if isinstance(current, deque):
+            current.clear()
+            current.extend(data[name])
+        else:
+            setattr(obj, name, data[name])
+    return obj
+
+
+class EMAState:
+    """
+    Estado incremental de una EMA, equivalente a ewm(span=period, adjust=False).
+
+    Guarda solo el último valor de la EMA sobre velas cerradas, así que
+    incorporar una vela nueva cuesta O(1) en lugar de recalcular el historial.
+    """
+
+    __slots__ = ('period', 'alpha', 'value')
+    __deepcopy__ = _clone_slots
+
+    def __init__(self, period, value=None):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.value = value
+
+    def update(self, price):
+        """Incorpora el cierre de una vela cerrada (los precios no finitos se omiten)"""
+        if math.isfinite(price):
+            self.value = self.peek(price)
+        return self.value
+
+    def peek(self, price):
+        """Evalúa la EMA con una vela en formación sin modificar el estado"""
+        price = float(price)
+        if self.value is None:
+            return price
+        if not math.isfinite(price):
+            return self.value
+        return (1 - self.alpha) * self.value + self.alpha * price
+
+
+class RSIState:
+    """
+    Estado incremental del RSI con medias simples (igual que calculate_rsi).
+
+    Mantiene la ventana de ganancias/pérdidas de las últimas `period` velas
+    cerradas y sus sumas acumuladas para actualizar en O(1).
+    """
+
+    __slots__ = ('period', 'last_close', 'gains', 'losses', 'sum_gain', 'sum_loss', '_updates')
+    __deepcopy__ = _clone_slots
+
+    def __init__(self, period=14):
+        self.period = period
+        self.last_close = None
+        self.gains = deque(maxlen=period)
+        self.losses = deque(maxlen=period)
+        self.sum_gain = 0.0
+        self.sum_loss = 0.0
+        self._updates = 0
+
+    def _delta(self, close):
+        # La primera vela no tiene diff: calculate_rsi la cuenta como ganancia/pérdida 0
+        if self.last_close is None:
+            return 0.0, 0.0
+        delta = close - self.last_close
+        return (delta, 0.0) if delta > 0 else (0.0, -delta if delta < 0 else 0.0)
+
+    def update(self, close):
+        """Incorpora el cierre de una vela cerrada (los precios no finitos se omiten)"""
+        close = float(close)
+        if not math.isfinite(close):
+            return self.value()
+        gain, loss = self._delta(close)
+
+        if len(self.gains) == self.period:
+            self.sum_gain -= self.gains[0]
+            self.sum_loss -= self.losses[0]
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.sum_gain += gain
+        self.sum_loss += loss
+        self.last_close = close
+
+        # Re-sumar la ventana una vez por ciclo completo evita acumular error de redondeo
+        self._updates += 1
+        if self._updates % self.period == 0:
+            self.sum_gain = sum(self.gains)
+            self.sum_loss = sum(self.losses)
+
+        return self.value()
+
+    def peek(self, close):
+        """Evalúa el RSI con una vela en formación sin modificar el estado"""
+        close = float(close)
+        if not math.isfinite(close):
+            return self.value()
+        gain, loss = self._delta(close)
+        size = len(self.gains)
+
+        if size + 1 < self.period:
             return 50
+        sum_gain = self.sum_gain + gain
+        sum_loss = self.sum_loss + loss
+        if size == self.period:
+            sum_gain -= self.gains[0]
+            sum_loss -= self.losses[0]
+        return self._rsi(sum_gain, sum_loss)
+
+    def value(self):
+        """RSI sobre las velas cerradas (50 si aún no hay ventana completa)"""
+        if len(self.gains) < self.period:
+            return 50
+        return self._rsi(self.sum_gain, self.sum_loss)
+
+    @property
+    def is_warm(self):
+        """True cuando la ventana de velas cerradas está completa"""
+        return len(self.gains) >= self.period
+
+    @property
+    def warmup_remaining(self):
+        """Velas cerradas que faltan para completar la ventana"""
+        return max(0, self.period - len(self.gains))
+
+    def _rsi(self, sum_gain, sum_loss):
+        return _rsi_from_averages(max(sum_gain, 0.0) / self.period, max(sum_loss, 0.0) / self.period)
+
+
+class WilderRSIState:
+    """
+    Estado incremental del RSI de Wilder (suavizado RMA).
+
+    Durante el calentamiento acumula las primeras `period` variaciones; después
+    solo guarda las medias suavizadas de ganancia y pérdida, así que cada vela
+    nueva (o tick de la vela en formación) se evalúa en O(1) sin historial.
+    """
+
+    __slots__ = ('period', 'last_close', 'avg_gain', 'avg_loss', 'deltas_seen')
+    __deepcopy__ = _clone_slots
+
+    def __init__(self, period=14):
+        self.period = period
+        self.last_close = None
+        self.avg_gain = 0.0  # Suma acumulada durante el calentamiento, media después
+        self.avg_loss = 0.0
+        self.deltas_seen = 0
+
+    def _advance(self, close):
+        delta = close - self.last_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        seen = self.deltas_seen + 1
+        if seen < self.period:
+            return self.avg_gain + gain, self.avg_loss + loss, seen
+        if seen == self.period:
+            return (self.avg_gain + gain) / self.period, (self.avg_loss + loss) / self.period, seen
+        return ((self.avg_gain * (self.period - 1) + gain) / self.period,
+                (self.avg_loss * (self.period - 1) + loss) / self.period, seen)
+
+    def update(self, close):
+        """Incorpora el cierre de una vela cerrada (los precios no finitos se omiten)"""
+        close = float(close)
+        if not math.isfinite(close):
+            return self.value()
+        if self.last_close is not None:
+            self.avg_gain, self.avg_loss, self.deltas_seen = self._advance(close)
+        self.last_close = close
+        return self.value()
+
+    def peek(self, close):
+        """Evalúa el RSI con una vela en formación sin modificar el estado"""
+        if self.last_close is None or not math.isfinite(close):
+            return self.value()
+        avg_gain, avg_loss, seen = self._advance(float(close))
+        if seen < self.period:
+            return 50
+        return _rsi_from_averages(avg_gain, avg_loss)
+
+    def value(self):
+        """RSI sobre las velas cerradas (50 durante el calentamiento)"""
+        if not self.is_warm:
+            return 50
+        return _rsi_from_averages(self.avg_gain, self.avg_loss)
+
+    @property
+    def is_warm(self):
+        """True cuando ya hay `period` variaciones suavizadas"""
+        return self.deltas_seen >= self.period
+
+    @property
+    def warmup_remaining(self):
+        """Velas cerradas que faltan para terminar el calentamiento"""
+        return max(0, self.period - self.deltas_seen)
+
+
+class WilderAverage:
+    """Media de Wilder incremental: media simple de `period` valores y luego RMA"""
+
+    __slots__ = ('period', 'value', 'count')
+    __deepcopy__ = _clone_slots
+
+    def __init__(self, period):
+        self.period = period
+        self.value = 0.0  # Suma acumulada durante el calentamiento, media después
+        self.count = 0
+
+    def _advance(self, x):
+        count = self.count + 1
+        if count < self.period:
+            return self.value + x, count
+        if count == self.period:
+            return (self.value + x) / self.period, count
+        return (self.value * (self.period - 1) + x) / self.period, count
+
+    def update(self, x):
+        """Incorpora un valor; devuelve la media o None durante el calentamiento"""
+        self.value, self.count = self._advance(x)
+        return self.current()
+
+    def peek(self, x):
+        """Media con un valor provisional, sin modificar el estado"""
+        value, count = self._advance(x)
+        return value if count >= self.period else None
+
+    def current(self):
+        return self.value if self.count >= self.period else None
+
+
+def _directional_index(plus_avg, minus_avg, tr_avg):
+    """+DI, -DI y DX a partir de medias suavizadas (None si falta calentamiento)"""
+    if plus_avg is None or minus_avg is None or tr_avg is None:
+        return None, None, None
+    if tr_avg == 0:
+        return 0.0, 0.0, 0.0
+    plus_di = 100 * plus_avg / tr_avg
+    minus_di = 100 * minus_avg / tr_avg
+    di_sum = plus_di + minus_di
+    dx = 100 * abs(plus_di - minus_di) / di_sum if di_sum > 0 else 0.0
+    return plus_di, minus_di, dx
+
+
+class IndicatorSuiteState:
+    """
+    Estado incremental de ATR, ancho de Bollinger, MACD y ADX.
+
+    Cada vela cerrada se procesa una sola vez en update(): el rango verdadero
+    y el movimiento direccional se calculan una vez y alimentan ATR y ADX.
+    ATR, MACD y ADX se actualizan en O(1); Bollinger recalcula su ventana fija.
+    """
+
+    def __init__(self, atr_period=14, bb_period=20, bb_std=2.0,
+                 macd_fast=12, macd_slow=26, macd_signal=9, adx_period=14):
+        self.bb_std = bb_std
+        self.atr = WilderAverage(atr_period)
+        self.adx_tr = WilderAverage(adx_period)
+        self.plus_dm = WilderAverage(adx_period)
+        self.minus_dm = WilderAverage(adx_period)
+        self.adx = WilderAverage(adx_period)
+        self.macd_fast = EMAState(macd_fast)
+        self.macd_slow = EMAState(macd_slow)
+        self.macd_signal = EMAState(macd_signal)
+        self.bb_window = deque(maxlen=bb_period)
+        self.prev = None  # (high, low, close) de la última vela cerrada
+
+    _AVERAGES = ('atr', 'adx_tr', 'plus_dm', 'minus_dm', 'adx', 'macd_fast', 'macd_slow', 'macd_signal')
+
+    def __deepcopy__(self, memo=None):
+        # copy.deepcopy genérico es el coste dominante de la caché de indicadores
+        clone = object.__new__(IndicatorSuiteState)
+        clone.bb_std = self.bb_std
+        for name in self._AVERAGES:
+            setattr(clone, name, _clone_slots(getattr(self, name)))
+        clone.bb_window = deque(self.bb_window, maxlen=self.bb_window.maxlen)
+        clone.prev = self.prev
+        return clone
+
+    def to_dict(self):
+        """Serializa el estado a tipos JSON"""
+        data = {name: _slots_to_dict(getattr(self, name)) for name in self._AVERAGES}
+        data['bb_window'] = list(self.bb_window)
+        data['prev'] = list(self.prev) if self.prev is not None else None
+        return data
+
+    def restore(self, data):
+        """Restaura el estado serializado con to_dict()"""
+        for name in self._AVERAGES:
+            _slots_from_dict(getattr(self, name), data[name])
+        self.bb_window.clear()
+        self.bb_window.extend(data['bb_window'])
+        self.prev = tuple(data['prev']) if data['prev'] is not None else None
+
+    def _movement(self, high, low, close):
+        """Rango verdadero, +DM y -DM respecto a la última vela cerrada"""
+        prev_high, prev_low, prev_close = self.prev
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        up = high - prev_high
+        down = prev_low - low
+        plus_dm = up if up > down and up > 0 else 0.0
+        minus_dm = down if down > up and down > 0 else 0.0
+        return tr, plus_dm, minus_dm
+
+    def update(self, high, low, close):
+        """Incorpora una vela cerrada"""
+        high, low, close = float(high), float(low), float(close)
+        if self.prev is not None:
+            tr, plus_dm, minus_dm = self._movement(high, low, close)
+            self.atr.update(tr)
+            _, _, dx = _directional_index(self.plus_dm.update(plus_dm), self.minus_dm.update(minus_dm),
+                                          self.adx_tr.update(tr))
+            if dx is not None:
+                self.adx.update(dx)
+
+        macd = self.macd_fast.update(close) - self.macd_slow.update(close)
+        self.macd_signal.update(macd)
+        self.bb_window.append(close)
+        self.prev = (high, low, close)
+
+    def peek(self, high, low, close):
+        """Valores actuales con la vela en formación, sin modificar el estado"""
+        high, low, close = float(high), float(low), float(close)
+        atr = plus_di = minus_di = adx = None
+        if self.prev is not None:
+            tr, plus_dm, minus_dm = self._movement(high, low, close)
+            atr = self.atr.peek(tr)
+            plus_di, minus_di, dx = _directional_index(self.plus_dm.peek(plus_dm), self.minus_dm.peek(minus_dm),
+                                                       self.adx_tr.peek(tr))
+            if dx is not None:
+                adx = self.adx.peek(dx)
+
+        macd = self.macd_fast.peek(close) - self.macd_slow.peek(close)
+        signal = self.macd_signal.peek(macd)
+
+        bb_width = None
+        window = list(self.bb_window)
+        window.append(close)
+        if len(window) > self.bb_window.maxlen:
+            window = window[1:]
+        if len(window) == self.bb_window.maxlen:
+            mean = sum(window) / len(window)
+            std = (sum((x - mean) ** 2 for x in window) / len(window)) ** 0.5
+            bb_width = 2 * self.bb_std * std / mean * 100 if mean else None
+
+        return {
+            'atr': atr,
+            'bb_width': bb_width,
+            'macd': macd,
+            'macd_signal': signal,
+            'macd_hist': macd - signal,
+            'adx': adx,
+            'plus_di': plus_di,
+            'minus_di': minus_di
+        }
+
+
+class IndicatorState:
+    """
+    Estado incremental de EMAs, RSI y (opcionalmente) la suite OHLC para un
+    símbolo/timeframe.
+
+    Las velas cerradas se incorporan una sola vez; la última vela (en formación)
+    se evalúa en cada ciclo sin modificar el estado. El coste por ciclo depende
+    del número de velas nuevas, no de la longitud del historial.
+    """
+
+    def __init__(self, ema_periods, rsi_period=14, rsi_method='sma', suite_params=None):
+        """
+        Args:
+            ema_periods: Períodos de las EMAs a mantener
+            rsi_period: Período del RSI
+            rsi_method: 'sma' (medias simples) o 'wilder' (suavizado RMA)
+            suite_params: kwargs de IndicatorSuiteState para mantener además
+                ATR/Bollinger/MACD/ADX (requiere máximos y mínimos en sync)
+        """
+        _check_rsi_method(rsi_method)
+        self.ema_periods = list(ema_periods)
+        self.rsi_period = rsi_period
+        self.rsi_method = rsi_method
+        self.suite_params = dict(suite_params) if suite_params is not None else None
+        self.reset()
+
+    def reset(self):
+        """Descarta todo el estado acumulado"""
+        self.emas = {period: EMAState(period) for period in self.ema_periods}
+        self.rsi = WilderRSIState(self.rsi_period) if self.rsi_method == 'wilder' else RSIState(self.rsi_period)
+        self.suite = IndicatorSuiteState(**self.suite_params) if self.suite_params is not None else None
+        self.last_timestamp = None  # Timestamp (ms) de la última vela cerrada incorporada
+        self.candles_processed = 0
+
+    def to_dict(self):
+        """
+        Serializa el estado completo (carries de EMAs, medias del RSI, suite y
+        última vela) para reanudar exactamente tras un reinicio.
+        """
+        return {
+            'ema_periods': self.ema_periods,
+            'rsi_period': self.rsi_period,
+            'rsi_method': self.rsi_method,
+            'suite_params': self.suite_params,
+            'last_timestamp': self.last_timestamp,
+            'candles_processed': self.candles_processed,
+            'emas': {str(period): ema.value for period, ema in self.emas.items()},
+            'rsi': _slots_to_dict(self.rsi),
+            'suite': self.suite.to_dict() if self.suite is not None else None
+        }
+
+    def restore(self, data):
+        """
+        Restaura un estado serializado con to_dict().
+
+        Returns:
+            False (sin modificar nada) si los parámetros guardados no coinciden
+            con los de este estado, p. ej. tras cambiar períodos en la config
+        """
+        params = (list(data.get('ema_periods', [])), data.get('rsi_period'),
+                  data.get('rsi_method'), data.get('suite_params'))
+        if params != (self.ema_periods, self.rsi_period, self.rsi_method, self.suite_params):
+            return False
+
+        self.reset()
+        for period, ema in self.emas.items():
+            ema.value = data['emas'][str(period)]
+        _slots_from_dict(self.rsi, data['rsi'])
+        if self.suite is not None:
+            self.suite.restore(data['suite'])
+        self.last_timestamp = data['last_timestamp']
+        self.candles_processed = data.get('candles_processed', 0)
+        return True
+
+    def update(self, timestamp, close, high=None, low=None):
+        """Incorpora una vela cerrada (con cierre no finito solo avanza last_timestamp)"""
+        if math.isfinite(close):
+            for ema in self.emas.values():
+                ema.update(close)
+            self.rsi.update(close)
+            if self.suite is not None:
+                self.suite.update(high, low, close)
+        self.last_timestamp = int(timestamp)
+        self.candles_processed += 1
+
+    def seed(self, timestamps, closes, highs=None, lows=None):
+        """
+        Inicializa el estado desde un historial de velas cerradas.
+
+        Las EMAs se calculan con el banco vectorizado en una sola pasada; el RSI
+        de medias simples solo necesita las últimas `rsi_period` variaciones,
+        el de Wilder recorre todo el historial (su memoria es infinita).
+        """
+        self.reset()
+        closes = _as_float_array(closes)
+        bank = _ema_bank_kernel(closes, self.ema_periods)
+        for row, period in enumerate(self.ema_periods):
+            value = float(bank[row, -1])
+            self.emas[period].value = value if math.isfinite(value) else None
+
+        # Las velas con cierre no finito se omiten (como en las series)
+        finite = np.isfinite(closes)
+        valid_closes = closes[finite]
+        rsi_start = 0 if self.rsi_method == 'wilder' else max(0, len(valid_closes) - self.rsi_period - 1)
+        for close in valid_closes[rsi_start:]:
+            self.rsi.update(close)
+
+        if self.suite is not None:
+            for high, low, close, ok in zip(highs, lows, closes, finite):
+                if ok:
+                    self.suite.update(high, low, close)
+
+        self.last_timestamp = int(timestamps[-1])
+        self.candles_processed = len(closes)
+
+    def sync(self, timestamps, closes, highs=None, lows=None):
+        """
+        Sincroniza el estado con una ventana de velas ordenada por tiempo.
+
+        Todas las velas salvo la última se consideran cerradas; solo se
+        incorporan las posteriores a last_timestamp. Si la ventana no enlaza
+        con el estado (hueco de datos), se reinicia desde la ventana completa.
+
+        Returns:
+            dict con 'ema' ({period: valor}), 'rsi' y, si hay suite, 'suite'
+            incluyendo la vela en formación
+        """
+        closed = len(closes) - 1
+        if closed < 0:
+            raise ValueError("Sin velas para sincronizar indicadores")
+        if self.suite is not None and (highs is None or lows is None):
+            raise ValueError("La suite OHLC requiere máximos y mínimos")
+
+        if self.last_timestamp is not None and closed > 0 and timestamps[0] > self.last_timestamp:
+            self.reset()
+
+        if self.last_timestamp is None:
+            if closed > 0:
+                self.seed(timestamps[:closed], closes[:closed],
+                          highs[:closed] if highs is not None else None,
+                          lows[:closed] if lows is not None else None)
+        else:
+            start = int(np.searchsorted(timestamps[:closed], self.last_timestamp, side='right'))
+            for i in range(start, closed):
+                self.update(timestamps[i], closes[i],
+                            highs[i] if highs is not None else None,
+                            lows[i] if lows is not None else None)
+
+        return self.snapshot(closes[-1],
+                             highs[-1] if highs is not None else None,
+                             lows[-1] if lows is not None else None)
+
+    @property
+    def is_warm(self):
+        """True cuando EMAs y RSI tienen historial suficiente"""
+        return self.last_timestamp is not None and self.rsi.is_warm
+
+    def snapshot(self, forming_close, forming_high=None, forming_low=None):
+        """Valores actuales evaluando la vela en formación"""
+        values = {
+            'ema': {period: ema.peek(forming_close) for period, ema in self.emas.items()},
+            'rsi': self.rsi.peek(forming_close)
+        }
+        if self.suite is not None:
+            values['suite'] = self.suite.peek(forming_high, forming_low, forming_close)
+        return values
+
+
+class IndicatorCache:
+    """
+    Caché LRU acotada de indicadores sobre velas cerradas.
+
+    Las claves son (symbol, timeframe, indicador, timestamp de la última vela
+    cerrada) y los valores el estado del indicador en ese punto, de modo que
+    la vela en formación se evalúa con peek() sin recalcular el historial.
+    """
+
+    def __init__(self, maxsize=256):
+        """
+        Args:
+            maxsize: Número máximo de entradas antes de descartar la menos usada
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Devuelve el valor cacheado o None (cuenta acierto/fallo)"""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Guarda una entrada, descartando la menos usada si se supera maxsize"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Vacía la caché (las estadísticas se conservan)"""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Estadísticas de uso de la caché"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / lookups * 100) if lookups else 0.0
+        }
@@ -1,4 +1,9 @@
-import pandas as pd
+import copy
+import time
+
+from candle_buffer import CandleBuffer
+from exchange_metrics import BudgetDeferred
+from resampler import TimeframeResampler, timeframe_to_ms
 
 
 class MarketAnalyzer:
@@ -6,64 +11,358 @@ class MarketAnalyzer:
     Analizador de datos de mercado y tendencias
     """
 
-    def __init__(self, exchange, config, indicators, logger):
+    def __init__(self, exchange, config, indicators, logger, store=None, clock=None):
         """
         Args:
             exchange: Instancia del exchange (ccxt)
             config: Configuración del bot
             indicators: Instancia de TechnicalIndicators
             logger: Logger para registrar información
+            store: CandleStore opcional con el historial local de velas
+            clock: Reloj en segundos (inyectable para simulaciones; por defecto time.time)
         """
         self.exchange = exchange
         self.config = config
         self.indicators = indicators
         self.logger = logger
+        self.store = store
+        self.clock = clock
+
+        # Estado incremental de indicadores (se crea en la primera lectura de mercado)
+        self.indicator_state = None
+
+        # Velas recientes en un buffer de tamaño fijo (sin DataFrame por ciclo)
+        self.candles = None
+
+        # Timeframes superiores construidos localmente desde las velas base
+        self.resamplers = {}
+        self.htf_states = {}
+
+    def history_limit(self):
+        """Velas necesarias para que las EMAs sean significativas"""
+        return max(self.config.ema_trend_period + 50, 100)
+
+    def get_market_data(self, log_callback=None, cycle_callback=None, **cycle_options):
+        """
+        Obtiene datos del mercado para calcular RSI y EMAs.
+
+        Args:
+            log_callback: Función para registrar los datos de mercado
+            cycle_callback: Si se indica, las velas se piden con
+                exchange.fetch_cycle_data (en paralelo con ticker/balance) y
+                el resultado completo se entrega a esta función
+            **cycle_options: ticker/balance para fetch_cycle_data
+        """
+        try:
+            if self.candles is None:
+                self.candles = CandleBuffer(self.history_limit())
+                self.load_history_from_store()
+
+            # Obtener velas: historial completo la primera vez, luego solo desde la última conocida
+            since, limit = self._fetch_window()
+            if cycle_callback is not None:
+                cycle_data = self.exchange.fetch_cycle_data(
+                    self.config.symbol,
+                    self.config.timeframe,
+                    since=since,
+                    limit=limit,
+                    **cycle_options
+                )
+                cycle_callback(cycle_data)
+                ohlcv = cycle_data['ohlcv']
+            else:
+                ohlcv = self.exchange.fetch_ohlcv(
+                    self.config.symbol,
+                    self.config.timeframe,
+                    since=since,
+                    limit=limit
+                )
+            self.candles.upsert(ohlcv)
+            self.save_candles_to_store(ohlcv)
+            return self._build_market_data(log_callback)
+
+        except BudgetDeferred:
+            raise  # Petición de baja prioridad aplazada: decide quien programó la tarea
+        except Exception as e:
+            self.logger.error(f"Error obteniendo datos del mercado: {e}")
+            return None
+
+    def apply_stream_event(self, event, log_callback=None, evaluate=True):
+        """
+        Incorpora un evento de MarketStream al buffer de velas sin pedir nada al exchange.
+
+        Los eventos 'candle' reemplazan la vela en formación (o añaden la
+        nueva); los 'ticker' actualizan cierre/máximo/mínimo de la vela en
+        formación. Requiere que get_market_data() haya cargado el historial.
+
+        Args:
+            event: Evento de market_stream (candle_event / ticker_event)
+            log_callback: Callback de registro de datos de mercado
+            evaluate: Si False solo se actualiza el buffer
+
+        Returns:
+            market_data como get_market_data(), o None si no se evaluó
+        """
+        try:
+            if self.candles is None or len(self.candles) == 0:
+                return None
+
+            if event['type'] == 'candle':
+                self.candles.upsert([event['candle']])
+                if event['closed']:
+                    self.save_candles_to_store([event['candle']])
+            elif event['type'] == 'ticker':
+                last = self.candles.last_timestamp
+                if event['timestamp'] >= last + timeframe_to_ms(self.config.timeframe):
+                    return None  # Precio de una vela que aún no ha llegado por el stream
+                price = event['price']
+                self.candles.upsert([[last, float(self.candles.open[-1]), max(float(self.candles.high[-1]), price),
+                                      min(float(self.candles.low[-1]), price), price, float(self.candles.volume[-1])]])
+
+            if not evaluate:
+                return None
+            return self._build_market_data(log_callback)
+
+        except Exception as e:
+            self.logger.error(f"Error procesando evento de mercado: {e}")
+            return None
+
+    def _build_market_data(self, log_callback=None):
+        """Indicadores y tendencia sobre el buffer de velas actual"""
+        candles = self.candles
+
+        # Calcular indicadores: solo las velas cerradas nuevas actualizan el estado,
+        # la última vela (en formación) se evalúa sin modificarlo
+        current_price = float(candles.close[-1])
+        current_volume = float(candles.volume[-1])
+        values = self.update_indicator_state(candles.timestamps, candles.close, candles.high, candles.low)
+
+        current_rsi = values['rsi']
+        ema_fast = values['ema'][self.config.ema_fast_period]
+        ema_slow = values['ema'][self.config.ema_slow_period]
+        ema_trend = values['ema'][self.config.ema_trend_period]
+
+        # Determinar dirección de tendencia
+        trend_direction = self.determine_trend_direction(current_price, ema_fast, ema_slow, ema_trend)
+
+        # Log datos de mercado (si se proporciona callback)
+        if log_callback:
+            log_callback(current_price, current_rsi, current_volume, ema_fast, ema_slow, ema_trend, trend_direction)
+
+        market_data = {
+            'price': current_price,
+            'rsi': current_rsi,
+            'volume': current_volume,
+            'ema_fast': ema_fast,
+            'ema_slow': ema_slow,
+            'ema_trend': ema_trend,
+            'trend_direction': trend_direction,
+            'indicators_warm': self.indicator_state.is_warm,
+            'candles': candles
+        }
+        # ATR, ancho de Bollinger, MACD y ADX (None durante el calentamiento)
+        market_data.update(values['suite'])
+        market_data['htf'] = self.update_higher_timeframes(candles)
+        return market_data
+
+    def load_history_from_store(self):
+        """
+        Carga la ventana de velas desde el almacén local.
+
+        Los huecos internos de la ventana se rellenan desde el exchange; el
+        tramo entre la última vela almacenada y ahora lo cubre la petición
+        incremental normal.
 
-    def get_market_data(self, log_callback=None):
-        """Obtiene datos del mercado para calcular RSI y EMAs"""
+        Returns:
+            Número de velas cargadas en el buffer
+        """
+        if self.store is None:
+            return 0
         try:
-            # Obtener más datos para EMAs
-            limit = max(self.config.ema_trend_period + 50, 100)
-            ohlcv = self.exchange.fetch_ohlcv(
-                self.config.symbol,
-                self.config.timeframe,
-                limit=limit
-            )
-
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-
-            # Calcular indicadores
-            current_price = float(df['close'].iloc[-1])
-            current_volume = float(df['volume'].iloc[-1])
-            current_rsi = self.indicators.calculate_rsi(df['close'])
-
-            # Calcular EMAs
-            ema_fast = self.indicators.calculate_ema(df['close'], self.config.ema_fast_period)
-            ema_slow = self.indicators.calculate_ema(df['close'], self.config.ema_slow_period)
-            ema_trend = self.indicators.calculate_ema(df['close'], self.config.ema_trend_period)
-
-            # Determinar dirección de tendencia
-            trend_direction = self.determine_trend_direction(current_price, ema_fast, ema_slow, ema_trend)
-
-            # Log datos de mercado (si se proporciona callback)
-            if log_callback:
-                log_callback(current_price, current_rsi, current_volume, ema_fast, ema_slow, ema_trend, trend_direction)
-
-            return {
-                'price': current_price,
-                'rsi': current_rsi,
-                'volume': current_volume,
+            symbol, timeframe = self.config.symbol, self.config.timeframe
+            rows = self.store.load(symbol, timeframe, limit=self.history_limit())
+            if rows and self.store.find_gaps(symbol, timeframe, rows[0][0], rows[-1][0]):
+                self.store.backfill(self.exchange, symbol, timeframe, rows[0][0], rows[-1][0])
+                rows = self.store.load(symbol, timeframe, limit=self.history_limit())
+            self.candles.upsert(rows)
+            return len(rows)
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo cargar el historial local de velas: {e}")
+            return 0
+
+    def save_candles_to_store(self, ohlcv):
+        """Guarda en el almacén local las velas recibidas del exchange"""
+        if self.store is None:
+            return
+        try:
+            self.store.upsert(self.config.symbol, self.config.timeframe, ohlcv)
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudieron guardar velas en el almacén local: {e}")
+
+    def _fetch_window(self):
+        """
+        (since, limit) de la próxima petición de velas.
+
+        Con velas en el buffer (y config.incremental_sync) se piden solo desde
+        la última conocida: la vela en formación se reemplaza y se añaden las
+        nuevas. Con el buffer vacío tras restaurar el estado de indicadores se
+        piden desde la última vela procesada. Si el hueco no cabe en la ventana
+        se descarta el buffer y se pide el historial completo.
+        """
+        limit = self.history_limit()
+        last = self.candles.last_timestamp
+        if last is None:
+            state = self.indicator_state
+            if state is None or state.last_timestamp is None:
+                return None, limit
+            last = state.last_timestamp
+        elif not self.config.incremental_sync:
+            return None, limit
+
+        now = self.clock() if self.clock is not None else time.time()
+        missed = int(now * 1000 - last) // timeframe_to_ms(self.config.timeframe)
+        if missed + 2 > limit:
+            self.candles.clear()
+            return None, limit
+        # La vela `last` más las que hayan abierto después (+1 por margen de reloj)
+        return last, max(missed, 0) + 2
+
+    def export_indicator_state(self):
+        """Estado incremental de indicadores serializable (para el snapshot del bot)"""
+        if self.indicator_state is None or self.indicator_state.last_timestamp is None:
+            return None
+        data = self.indicator_state.to_dict()
+        data['symbol'] = self.config.symbol
+        data['timeframe'] = self.config.timeframe
+        return data
+
+    def restore_indicator_state(self, data):
+        """
+        Restaura el estado de indicadores guardado en el snapshot.
+
+        Returns:
+            True si se restauró; False si no hay datos o no son compatibles con
+            la configuración actual (símbolo, timeframe o períodos distintos)
+        """
+        if not data:
+            return False
+        if data.get('symbol') != self.config.symbol or data.get('timeframe') != self.config.timeframe:
+            return False
+
+        state = self._create_indicator_state()
+        if not state.restore(data):
+            self.logger.warning("⚠️ Estado de indicadores guardado con otros parámetros - se recalculará")
+            return False
+
+        self.indicator_state = state
+        return True
+
+    def update_indicator_state(self, timestamps, closes, highs, lows):
+        """
+        Calcula EMAs, RSI y la suite OHLC reutilizando la caché de velas cerradas.
+
+        Cada indicador se busca por (symbol, timeframe, indicador, última vela
+        cerrada). Solo si falta alguno se avanza el estado incremental; la vela
+        en formación se mezcla siempre con peek().
+        """
+        if self.indicator_state is None:
+            self.indicator_state = self._create_indicator_state()
+        return self._cached_indicators(self.indicator_state, self.config.timeframe, timestamps, closes, highs, lows)
+
+    def update_higher_timeframes(self, candles):
+        """
+        Actualiza las velas e indicadores de config.higher_timeframes.
+
+        Las velas superiores se construyen desde el buffer base, sin peticiones
+        extra al exchange, y solo se procesan las velas base cerradas nuevas.
+
+        Returns:
+            dict {timeframe: datos de mercado de ese timeframe}
+        """
+        results = {}
+        for timeframe in self.config.higher_timeframes:
+            if timeframe not in self.resamplers:
+                self.resamplers[timeframe] = TimeframeResampler(
+                    self.config.timeframe, timeframe, self.history_limit()
+                )
+                self.htf_states[timeframe] = self._create_indicator_state()
+
+            htf = self.resamplers[timeframe].update_from_buffer(candles)
+            if len(htf) == 0:
+                continue
+
+            state = self.htf_states[timeframe]
+            values = self._cached_indicators(state, timeframe, htf.timestamps, htf.close, htf.high, htf.low)
+            price = float(htf.close[-1])
+            ema_fast = values['ema'][self.config.ema_fast_period]
+            ema_slow = values['ema'][self.config.ema_slow_period]
+            ema_trend = values['ema'][self.config.ema_trend_period]
+
+            results[timeframe] = {
+                'price': price,
+                'rsi': values['rsi'],
                 'ema_fast': ema_fast,
                 'ema_slow': ema_slow,
                 'ema_trend': ema_trend,
-                'trend_direction': trend_direction,
-                'dataframe': df
+                'trend_direction': self.determine_trend_direction(price, ema_fast, ema_slow, ema_trend),
+                'indicators_warm': state.is_warm,
+                'candles': htf
             }
+            results[timeframe].update(values['suite'])
+        return results
 
-        except Exception as e:
-            self.logger.error(f"Error obteniendo datos del mercado: {e}")
-            return None
+    def _create_indicator_state(self):
+        """Crea un estado incremental con los indicadores configurados"""
+        return self.indicators.create_state(
+            [self.config.ema_fast_period, self.config.ema_slow_period, self.config.ema_trend_period],
+            self.config.rsi_period,
+            self.config.rsi_smoothing,
+            self._suite_params()
+        )
+
+    def _cached_indicators(self, state, timeframe, timestamps, closes, highs, lows):
+        """Valores de indicadores de `state` usando la caché de velas cerradas"""
+        if len(closes) < 2:
+            return state.sync(timestamps, closes, highs, lows)
+
+        last_closed = int(timestamps[-2])
+        prefix = (self.config.symbol, timeframe)
+        keys = [prefix + (('ema', period), last_closed) for period in state.ema_periods]
+        keys.append(prefix + (('rsi', state.rsi_period, state.rsi_method), last_closed))
+        keys.append(prefix + (('suite',) + tuple(sorted(state.suite_params.items())), last_closed))
+
+        cache = self.indicators.cache
+        carries = [cache.get(key) for key in keys]
+        if any(carry is None for carry in carries):
+            state.sync(timestamps, closes, highs, lows)
+            carries = [copy.deepcopy(state.emas[period]) for period in state.ema_periods]
+            carries.append(copy.deepcopy(state.rsi))
+            carries.append(copy.deepcopy(state.suite))
+            for key, carry in zip(keys, carries):
+                cache.put(key, carry)
+
+        forming_close = closes[-1]
+        return {
+            'ema': {period: carry.peek(forming_close) for period, carry in zip(state.ema_periods, carries)},
+            'rsi': carries[-2].peek(forming_close),
+            'suite': carries[-1].peek(highs[-1], lows[-1], forming_close)
+        }
+
+    def _suite_params(self):
+        """Parámetros de ATR/Bollinger/MACD/ADX desde la configuración"""
+        return {
+            'atr_period': self.config.atr_period,
+            'bb_period': self.config.bb_period,
+            'bb_std': self.config.bb_std,
+            'macd_fast': self.config.macd_fast_period,
+            'macd_slow': self.config.macd_slow_period,
+            'macd_signal': self.config.macd_signal_period,
+            'adx_period': self.config.adx_period
+        }
+
+    def indicator_cache_stats(self):
+        """Estadísticas de la caché de indicadores"""
+        return self.indicators.cache.stats()
 
     def determine_trend_direction(self, price, ema_fast, ema_slow, ema_trend):
         """ENHANCED: Trend detection with price position validation"""
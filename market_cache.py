@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class MarketMetadataCache:
+    """
+    Caché en disco de los metadatos de mercados del exchange (load_markets).
+
+    El listado completo de Binance pesa varios MB y tarda en descargarse;
+    aquí se guarda en JSON con su checksum SHA-256 y la hora de descarga. Al
+    arrancar se cargan desde disco con set_markets (sin red) y, si superan
+    el TTL, se refrescan en un hilo de fondo fuera del camino crítico. Un
+    fichero corrupto o con checksum incorrecto se ignora.
+    """
+
+    def __init__(self, path, ttl, logger):
+        """
+        Args:
+            path: Fichero JSON de la caché (ej. data_dir/markets_cache_testnet.json)
+            ttl: Segundos tras los que los metadatos se consideran caducados
+            logger: Logger para registrar información
+        """
+        self.path = path
+        self.ttl = ttl
+        self.logger = logger
+        self.refresh_thread = None
+
+    @staticmethod
+    def _checksum(payload):
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def read(self):
+        """
+        Lee la caché validando el checksum.
+
+        Returns:
+            dict con 'saved_at', 'markets' y 'currencies', o None si no es válida
+        """
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            payload = {'markets': data['markets'], 'currencies': data['currencies']}
+            if data.get('checksum') != self._checksum(payload):
+                self.logger.warning("⚠️ Caché de mercados con checksum inválido - se descargará de nuevo")
+                return None
+            return data
+        except Exception as e:
+            self.logger.warning(f"⚠️ Caché de mercados ilegible: {e}")
+            return None
+
+    def write(self, markets, currencies):
+        """Guarda los metadatos (escritura atómica)"""
+        try:
+            payload = {'markets': markets, 'currencies': currencies or {}}
+            data = {'saved_at': time.time(), 'checksum': self._checksum(payload)}
+            data.update(payload)
+            tmp_file = self.path + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f, default=str)
+            os.replace(tmp_file, self.path)
+        except Exception as e:
+            self.logger.error(f"Error guardando caché de mercados: {e}")
+
+    def is_stale(self, data):
+        """True si los metadatos superan el TTL"""
+        return time.time() - data.get('saved_at', 0) > self.ttl
+
+    def prime(self, exchange, load_markets, load_time_difference=None, set_markets=None):
+        """
+        Deja los mercados disponibles en `exchange` con el mínimo de red.
+
+        Args:
+            exchange: Exchange ccxt (síncrono o asíncrono)
+            load_markets: Callable bloqueante que descarga los mercados (reload)
+            load_time_difference: Callable bloqueante que sincroniza el reloj con
+                el servidor. ccxt lo hace dentro de fetch_markets, que la caché
+                evita, así que se llama tras cargar de disco si el exchange
+                tiene adjustForTimeDifference (peso 1)
+            set_markets: Callable (markets, currencies) para instalar los
+                mercados (por defecto exchange.set_markets)
+
+        Returns:
+            True si se usaron los metadatos de disco
+        """
+        data = self.read()
+        if data is None:
+            load_markets()
+            self.write(exchange.markets, exchange.currencies)
+            return False
+
+        (set_markets or exchange.set_markets)(data['markets'], data['currencies'] or None)
+        options = getattr(exchange, 'options', None) or {}
+        if load_time_difference is not None and options.get('adjustForTimeDifference'):
+            try:
+                load_time_difference()
+            except Exception as e:
+                self.logger.warning(f"⚠️ No se pudo sincronizar el reloj con el exchange: {e}")
+        if self.is_stale(data):
+            self.refresh_in_background(exchange, load_markets)
+        return True
+
+    def refresh_in_background(self, exchange, load_markets):
+        """Descarga los mercados en un hilo y actualiza la caché"""
+        if self.refresh_thread is not None and self.refresh_thread.is_alive():
+            return
+
+        def refresh():
+            try:
+                load_markets()
+                self.write(exchange.markets, exchange.currencies)
+                self.logger.info(f"🔄 Metadatos de mercados actualizados ({len(exchange.markets)} mercados)")
+            except Exception as e:
+                self.logger.warning(f"⚠️ No se pudieron refrescar los mercados: {e}")
+
+        self.refresh_thread = threading.Thread(target=refresh, name='markets-refresh', daemon=True)
+        self.refresh_thread.start()
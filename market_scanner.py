@@ -0,0 +1,150 @@
+import copy
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from exchange_metrics import BudgetDeferred
+from indicators import TechnicalIndicators
+from market_analyzer import MarketAnalyzer
+from signal_detector import SignalDetector
+
+
+class _SymbolLogger(logging.LoggerAdapter):
+    """Prefija los mensajes con el símbolo para distinguir los hilos del escáner"""
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['symbol']}] {msg}", kwargs
+
+
+class MarketScanner:
+    """
+    Escáner multi-símbolo de tendencia y señales swing.
+
+    Cada símbolo tiene su propio MarketAnalyzer (buffer de velas y estado
+    incremental), TechnicalIndicators y SignalDetector, de modo que las
+    señales pendientes y sus confirmaciones no se mezclan entre pares. Las
+    peticiones al exchange (I/O) se reparten en un pool de hilos acotado:
+    escanear decenas de pares cuesta aproximadamente lo mismo que uno.
+    """
+
+    def __init__(self, exchange, config, logger, symbols=None, max_workers=8, store=None, clock=None):
+        """
+        Args:
+            exchange: Instancia del exchange (ccxt)
+            config: Configuración del bot (se copia por símbolo)
+            logger: Logger para registrar información
+            symbols: Símbolos a escanear (por defecto config.scan_symbols)
+            max_workers: Hilos máximos para peticiones simultáneas
+            store: CandleStore opcional compartido
+            clock: Reloj en segundos del bot (inyectable para simulaciones; por defecto la hora actual)
+        """
+        self.exchange = exchange
+        self.config = config
+        self.logger = logger
+        self.store = store
+        self.clock = clock
+        self.symbols = list(symbols if symbols is not None else config.scan_symbols)
+        self.max_workers = max(1, min(max_workers, len(self.symbols) or 1))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scanner')
+        self.retry_after = 0.0  # Segundos hasta reintentar los símbolos aplazados en el último escaneo
+
+        self.analyzers = {}
+        self.detectors = {}
+        self.performance_metrics = {}
+        for symbol in self.symbols:
+            self._add_symbol(symbol)
+
+    def _add_symbol(self, symbol):
+        symbol_config = copy.copy(self.config)
+        symbol_config.symbol = symbol
+        symbol_logger = _SymbolLogger(self.logger, {'symbol': symbol})
+        indicators = TechnicalIndicators(
+            symbol_logger,
+            cache_size=self.config.indicator_cache_size,
+            engine=self.config.indicator_engine
+        )
+        analyzer = MarketAnalyzer(self.exchange, symbol_config, indicators, symbol_logger, store=self.store,
+                                  clock=self.clock)
+        metrics = {'signals_detected': 0}
+
+        self.analyzers[symbol] = analyzer
+        self.performance_metrics[symbol] = metrics
+        self.detectors[symbol] = SignalDetector(symbol_config, symbol_logger, analyzer, metrics, clock=self.clock)
+
+    def scan_symbol(self, symbol):
+        """
+        Obtiene datos de mercado de un símbolo y avanza su detector de señales.
+
+        Returns:
+            dict con symbol, price, rsi, trend_direction, new_signal, confirmed
+            ('long'/'short'/None) y pending; o None si no hubo datos
+        """
+        analyzer = self.analyzers[symbol]
+        detector = self.detectors[symbol]
+
+        market_data = analyzer.get_market_data()
+        if not market_data:
+            return None
+
+        price = market_data['price']
+        rsi = market_data['rsi']
+        trend_direction = market_data['trend_direction']  # determine_trend_direction del analizador
+
+        confirmed = None
+        new_signal = False
+        if detector.pending_long_signal or detector.pending_short_signal:
+            _, confirmed = detector.check_swing_confirmation(price, rsi, trend_direction)
+        else:
+            new_signal = detector.detect_swing_signal(
+                price, rsi, market_data['ema_fast'], market_data['ema_slow'], market_data['ema_trend'],
+                trend_direction, in_position=False
+            )
+        detector.update_last_rsi(rsi)
+
+        pending = 'long' if detector.pending_long_signal else 'short' if detector.pending_short_signal else None
+        return {
+            'symbol': symbol,
+            'price': price,
+            'rsi': rsi,
+            'trend_direction': trend_direction,
+            'new_signal': new_signal,
+            'confirmed': confirmed,
+            'pending': pending
+        }
+
+    def scan(self):
+        """
+        Escanea todos los símbolos en paralelo.
+
+        Returns:
+            Lista de resultados de scan_symbol en el orden de self.symbols
+            (los símbolos con error se omiten)
+        """
+        start = time.monotonic()
+        futures = [(symbol, self.executor.submit(self.scan_symbol, symbol)) for symbol in self.symbols]
+
+        results = []
+        deferred = []
+        for symbol, future in futures:
+            try:
+                result = future.result()
+                if result is not None:
+                    results.append(result)
+            except BudgetDeferred as e:
+                deferred.append(e.retry_after)
+            except Exception as e:
+                self.logger.error(f"Error escaneando {symbol}: {e}")
+
+        self.retry_after = max(deferred, default=0.0)
+        self.logger.info(
+            f"🔭 Escaneo de {len(self.symbols)} símbolos en {time.monotonic() - start:.2f}s "
+            f"({len(results)} con datos)"
+        )
+        if deferred:
+            self.logger.info(f"⏸️ {len(deferred)} símbolos aplazados por presupuesto de peso "
+                             f"(reintento en {self.retry_after:.0f}s)")
+        return results
+
+    def close(self):
+        """Detiene el pool de hilos"""
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,248 @@
+import asyncio
+import csv
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from resampler import timeframe_to_ms
+
+
+def candle_event(symbol, timeframe, candle, closed):
+    """Evento de vela: candle = [timestamp, open, high, low, close, volume]"""
+    return {'type': 'candle', 'symbol': symbol, 'timeframe': timeframe, 'candle': list(candle), 'closed': closed}
+
+
+def ticker_event(symbol, price, timestamp):
+    """Evento de precio (último trade/ticker) en ms"""
+    return {'type': 'ticker', 'symbol': symbol, 'price': float(price), 'timestamp': int(timestamp)}
+
+
+def read_candles_csv(path):
+    """Velas [timestamp, open, high, low, close, volume] de un CSV (se ignora la cabecera)"""
+    with open(path, 'r') as f:
+        reader = csv.reader(f)
+        return [[int(float(row[0]))] + [float(value) for value in row[1:6]]
+                for row in reader if row and row[0][0].isdigit()]
+
+
+class MarketStream(ABC):
+    """
+    Interfaz de datos de mercado por eventos (push) en lugar de polling.
+
+    Las implementaciones entregan eventos 'candle' (la vela en curso cada vez
+    que cambia, con closed=True una sola vez al cerrar) y 'ticker'. El
+    consumidor itera events() y reacciona a cada uno en cuanto llega.
+    """
+
+    def events(self):
+        """Itera eventos hasta que el stream termina o se cierra"""
+        while True:
+            event = self.next_event()
+            if event is None:
+                return
+            yield event
+
+    @abstractmethod
+    def next_event(self, timeout=None):
+        """Siguiente evento o None si el stream terminó (o expiró `timeout`)"""
+
+    def close(self):
+        """Libera conexiones/hilos del stream"""
+
+
+class ReplayStream(MarketStream):
+    """
+    Reproduce velas grabadas (CandleStore, CSV o sintéticas) como un stream en vivo.
+
+    Cada vela se emite como `ticks_per_candle` actualizaciones en formación
+    (recorrido open → high/low → close) seguidas del evento de cierre, igual
+    que un websocket de klines. Con `speed` se respeta el tiempo real
+    escalado (speed=60 → una vela 1h dura un minuto); sin él, máxima velocidad.
+    """
+
+    def __init__(self, rows, symbol, timeframe, ticks_per_candle=1, speed=None, emit_tickers=False):
+        """
+        Args:
+            rows: Velas [timestamp, open, high, low, close, volume] ordenadas
+            symbol: Símbolo de las velas
+            timeframe: Timeframe de las velas
+            ticks_per_candle: Actualizaciones en formación por vela (0 = solo cierres)
+            speed: Factor de aceleración respecto a tiempo real (None = sin esperas)
+            emit_tickers: Emitir también un evento 'ticker' por cada actualización
+        """
+        self.rows = rows
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.ticks_per_candle = ticks_per_candle
+        self.speed = speed
+        self.emit_tickers = emit_tickers
+        self._iterator = self._generate()
+        self._origin = None  # (timestamp de la primera vela, instante real) para speed
+        self._closed = False
+
+    @classmethod
+    def from_store(cls, store, symbol, timeframe, since=None, until=None, **kwargs):
+        """Reproduce el historial de un CandleStore"""
+        return cls(store.load(symbol, timeframe, since, until), symbol, timeframe, **kwargs)
+
+    @classmethod
+    def from_csv(cls, path, symbol, timeframe, **kwargs):
+        """Reproduce un CSV con columnas timestamp,open,high,low,close,volume"""
+        return cls(read_candles_csv(path), symbol, timeframe, **kwargs)
+
+    def _path(self, open_, high, low, close):
+        """Precios intermedios de la vela: primero el extremo más cercano a la apertura"""
+        if abs(high - open_) <= abs(open_ - low):
+            return [high, low, close]
+        return [low, high, close]
+
+    def _generate(self):
+        step = timeframe_to_ms(self.timeframe)
+        for timestamp, open_, high, low, close, volume in (row[:6] for row in self.rows):
+            forming = [timestamp, open_, open_, open_, open_, 0.0]
+            waypoints = self._path(open_, high, low, close)
+            for tick in range(1, self.ticks_per_candle + 1):
+                # Avanza por el recorrido de la vela sin alcanzar aún el cierre
+                price = waypoints[min((tick - 1) * len(waypoints) // self.ticks_per_candle, len(waypoints) - 1)]
+                forming[2] = max(forming[2], price)
+                forming[3] = min(forming[3], price)
+                forming[4] = price
+                forming[5] = volume * tick / (self.ticks_per_candle + 1)
+                event_time = timestamp + step * tick // (self.ticks_per_candle + 1)
+                self._wait_until(event_time)
+                if self.emit_tickers:
+                    yield ticker_event(self.symbol, price, event_time)
+                yield candle_event(self.symbol, self.timeframe, forming, closed=False)
+
+            self._wait_until(timestamp + step)
+            yield candle_event(self.symbol, self.timeframe, [timestamp, open_, high, low, close, volume], closed=True)
+
+    def _wait_until(self, event_time):
+        if not self.speed:
+            return
+        if self._origin is None:
+            self._origin = (event_time, time.monotonic())
+        delay = (event_time - self._origin[0]) / 1000.0 / self.speed - (time.monotonic() - self._origin[1])
+        if delay > 0:
+            time.sleep(delay)
+
+    def next_event(self, timeout=None):
+        if self._closed:
+            return None
+        return next(self._iterator, None)
+
+    def close(self):
+        self._closed = True
+
+
+class WebSocketStream(MarketStream):
+    """
+    Klines y ticker en vivo por websocket (ccxt.pro) en un hilo de fondo.
+
+    El hilo mantiene su propio event loop con watch_ohlcv/watch_ticker y
+    deja los eventos en una cola; ante desconexiones reintenta tras
+    `reconnect_delay` segundos. Una vela se marca cerrada cuando llega la
+    siguiente, ya que Binance publica la vela nueva justo tras el cierre.
+    """
+
+    def __init__(self, symbol, timeframe, logger, testnet=False, watch_ticker=True, reconnect_delay=5):
+        """
+        Args:
+            symbol: Símbolo a seguir
+            timeframe: Timeframe de las klines
+            logger: Logger para registrar información
+            testnet: Usar el sandbox de Binance
+            watch_ticker: Emitir también eventos 'ticker'
+            reconnect_delay: Segundos antes de reconectar tras un error
+        """
+        import ccxt.pro
+
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.logger = logger
+        self.watch_ticker = watch_ticker
+        self.reconnect_delay = reconnect_delay
+
+        self.exchange = ccxt.pro.binance({'enableRateLimit': True})
+        self.exchange.set_sandbox_mode(testnet)
+
+        self.queue = queue.Queue()
+        self._stop = threading.Event()
+        self._last_candle = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name='market-stream', daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        tasks = [self._watch_klines()]
+        if self.watch_ticker:
+            tasks.append(self._watch_tickers())
+        try:
+            self._loop.run_until_complete(asyncio.gather(*tasks))
+        except asyncio.CancelledError:
+            pass  # close() cancela las suscripciones
+        finally:
+            self._loop.run_until_complete(self.exchange.close())
+            self._loop.close()
+            self.queue.put(None)
+
+    async def _watch_klines(self):
+        while not self._stop.is_set():
+            try:
+                candles = await self.exchange.watch_ohlcv(self.symbol, self.timeframe)
+                for candle in candles:
+                    self._push_candle(candle)
+            except Exception as e:
+                if self._stop.is_set():
+                    return
+                self.logger.warning(f"⚠️ Stream de velas desconectado: {e} - reconectando en {self.reconnect_delay}s")
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _watch_tickers(self):
+        while not self._stop.is_set():
+            try:
+                ticker = await self.exchange.watch_ticker(self.symbol)
+                if ticker.get('last') is not None:
+                    self.queue.put(ticker_event(self.symbol, ticker['last'], ticker.get('timestamp') or time.time() * 1000))
+            except Exception as e:
+                if self._stop.is_set():
+                    return
+                self.logger.warning(f"⚠️ Stream de ticker desconectado: {e} - reconectando en {self.reconnect_delay}s")
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _push_candle(self, candle):
+        last = self._last_candle
+        if last is not None and candle[0] < last[0]:
+            return  # Actualización atrasada de una vela ya cerrada
+        if last is not None and candle[0] > last[0]:
+            self.queue.put(candle_event(self.symbol, self.timeframe, last, closed=True))
+        self._last_candle = list(candle)
+        self.queue.put(candle_event(self.symbol, self.timeframe, candle, closed=False))
+
+    def next_event(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def events(self):
+        while not self._stop.is_set():
+            event = self.next_event(timeout=1.0)
+            if event is not None:
+                yield event
+            elif not self._thread.is_alive():
+                return
+
+    def _cancel_tasks(self):
+        for task in asyncio.all_tasks(self._loop):
+            task.cancel()
+
+    def close(self):
+        self._stop.set()
+        try:
+            self._loop.call_soon_threadsafe(self._cancel_tasks)
+        except RuntimeError:
+            pass  # El loop ya terminó
+        self._thread.join(timeout=10)
@@ -0,0 +1,345 @@
+"""
+Barrido paralelo de parámetros dentro de rsi_bot._PARAM_BOUNDS.
+
+Genera una rejilla o una muestra aleatoria de configuraciones dentro de
+los límites que Claude puede ajustar en vivo y reparte los backtests entre
+todos los núcleos con ProcessPoolExecutor. Las velas y los indicadores
+(que no dependen de estos parámetros) se calculan una vez y se comparten
+con los workers por multiprocessing.shared_memory en lugar de serializarse
+en cada tarea. El resultado es una tabla ordenada por la métrica elegida.
+
+Por defecto usa el backtest vectorizado (vector_backtest.py); --exact usa el
+motor por eventos (backtest.py), mucho más lento.
+
+Uso:
+    python param_sweep.py --start 2023-01-01 --configs 10000
+    python param_sweep.py --mode grid --steps 3 --out sweep.csv
+    python param_sweep.py --csv historial.csv --metric win_rate --min-trades 20
+"""
+import argparse
+import copy
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import BacktestEngine, _parse_date, candle_arrays, compute_indicator_arrays
+from config import BotConfig
+from rsi_bot import _PARAM_BOUNDS, _coerce_param
+from vector_backtest import VectorBacktester, trend_codes
+
+SHARED_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume',
+                  'ema_fast', 'ema_slow', 'ema_trend', 'rsi', 'trend')
+SUMMARY_KEYS = ('total_trades', 'win_rate', 'total_pnl_pct', 'return_pct', 'max_drawdown_pct', 'final_equity')
+
+
+def _cast(config, name, value):
+    """Mismo tipo que el valor por defecto de config (misma conversión que _apply_param_adjustments)"""
+    current = getattr(config, name)
+    if isinstance(current, int):
+        return _coerce_param(current, value)
+    return round(float(value), 4)
+
+
+def grid_params(steps=3, bounds=None, config=None):
+    """
+    Rejilla regular dentro de los límites.
+
+    Args:
+        steps: Valores por parámetro (incluye ambos extremos)
+        bounds: {parámetro: (mínimo, máximo)} (por defecto _PARAM_BOUNDS)
+        config: BotConfig para el tipo de cada parámetro
+
+    Returns:
+        Lista de dicts {parámetro: valor} sin duplicados (steps ** n_parámetros como máximo)
+    """
+    bounds = bounds or _PARAM_BOUNDS
+    config = config or BotConfig()
+    axes = []
+    for name, (low, high) in bounds.items():
+        values = [_cast(config, name, value) for value in np.linspace(low, high, steps)]
+        axes.append(list(dict.fromkeys(values)))
+    return [dict(zip(bounds, combo)) for combo in itertools.product(*axes)]
+
+
+def random_params(count, bounds=None, config=None, seed=None):
+    """
+    Muestra aleatoria uniforme dentro de los límites.
+
+    Args:
+        count: Configuraciones a generar
+        bounds: {parámetro: (mínimo, máximo)} (por defecto _PARAM_BOUNDS)
+        config: BotConfig para el tipo de cada parámetro
+        seed: Semilla (reproducible)
+
+    Returns:
+        Lista de dicts {parámetro: valor}
+    """
+    bounds = bounds or _PARAM_BOUNDS
+    config = config or BotConfig()
+    rng = np.random.default_rng(seed)
+    samples = {name: rng.uniform(low, high, count) for name, (low, high) in bounds.items()}
+    return [{name: _cast(config, name, samples[name][i]) for name in bounds} for i in range(count)]
+
+
+def prepare_arrays(candles, config):
+    """
+    Columnas de velas e indicadores (con códigos de tendencia) de toda la serie.
+
+    Ninguno depende de _PARAM_BOUNDS, así que se calculan una sola vez por barrido.
+
+    Returns:
+        (velas {columna: array}, indicadores {nombre: array})
+    """
+    arrays = candle_arrays(candles)
+    indicators = compute_indicator_arrays(arrays['close'], config)
+    indicators['trend'] = trend_codes(arrays['close'], indicators['ema_fast'], indicators['ema_slow'],
+                                      indicators['ema_trend'], config)
+    return arrays, indicators
+
+
+class SharedCandles:
+    """
+    Velas e indicadores en un bloque de memoria compartida.
+
+    Una matriz float64 (columna × vela) con SHARED_COLUMNS. Los workers se
+    conectan por nombre con attach() y leen vistas sin copiar los datos.
+    """
+
+    def __init__(self, arrays, indicator_arrays):
+        """
+        Args:
+            arrays: Columnas de velas (candle_arrays)
+            indicator_arrays: Indicadores con 'trend' (compute_indicator_arrays + trend_codes)
+        """
+        columns = dict(arrays, **indicator_arrays)
+        self.shape = (len(SHARED_COLUMNS), len(arrays['close']))
+        self.shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(self.shape)) * 8, 1))
+        matrix = np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)
+        for row, name in enumerate(SHARED_COLUMNS):
+            matrix[row] = columns[name]
+        del matrix
+        self.name = self.shm.name
+
+    @staticmethod
+    def attach(name, shape):
+        """
+        Conecta con un bloque existente.
+
+        Returns:
+            (SharedMemory, velas {columna: array}, indicadores {nombre: array})
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        views = dict(zip(SHARED_COLUMNS, matrix))
+        candles = {column: views[column] for column in SHARED_COLUMNS[:6]}
+        candles['timestamp'] = views['timestamp'].astype(np.int64)
+        indicators = {column: views[column] for column in ('ema_fast', 'ema_slow', 'ema_trend', 'rsi')}
+        indicators['trend'] = views['trend'].astype(np.int8)
+        return shm, candles, indicators
+
+    def close(self):
+        """Libera el bloque (solo el proceso que lo creó)"""
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Estado de cada worker (se inicializa una vez por proceso)
+_worker = {}
+
+
+def _init_worker(name, shape, config, engine, backtest_kwargs):
+    shm, candles, indicators = SharedCandles.attach(name, shape)
+    _worker.update(shm=shm, candles=candles, indicators=indicators, config=config,
+                   engine=engine, kwargs=backtest_kwargs)
+
+
+def _close_worker():
+    """Desconecta el bloque compartido del proceso actual (ejecución sin pool)"""
+    shm = _worker.pop('shm')
+    _worker.clear()
+    shm.close()
+
+
+def evaluate_params(candles, indicators, params, config, engine='vector', **backtest_kwargs):
+    """
+    Backtest de una configuración.
+
+    Returns:
+        Fila con los parámetros y las claves de SUMMARY_KEYS ('error' si falla)
+    """
+    engine_class = BacktestEngine if engine == 'exact' else VectorBacktester
+    row = dict(params)
+    try:
+        result = engine_class(candles, config, params=params, indicator_arrays=indicators, **backtest_kwargs).run()
+        row.update((key, result['summary'][key]) for key in SUMMARY_KEYS)
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def _run_batch(batch):
+    """Ejecuta un lote de configuraciones en el worker"""
+    return [evaluate_params(_worker['candles'], _worker['indicators'], params, _worker['config'],
+                            _worker['engine'], **_worker['kwargs'])
+            for params in batch]
+
+
+def rank_results(rows, metric='return_pct', min_trades=0):
+    """
+    Ordena resultados de mejor a peor.
+
+    Las configuraciones con error o con menos de min_trades trades van al
+    final. El empate se rompe con el menor drawdown.
+
+    Returns:
+        Lista ordenada con la clave 'rank' añadida
+    """
+    def key(row):
+        valid = 'error' not in row and row.get('total_trades', 0) >= min_trades
+        return (not valid, -row.get(metric, 0) if valid else 0, row.get('max_drawdown_pct', 0))
+
+    ranked = sorted(rows, key=key)
+    for rank, row in enumerate(ranked, 1):
+        row['rank'] = rank
+    return ranked
+
+
+def run_sweep(candles, param_sets, config=None, workers=None, engine='vector', batch_size=None,
+              metric='return_pct', min_trades=0, **backtest_kwargs):
+    """
+    Backtest de cada configuración en paralelo.
+
+    Args:
+        candles: Velas (lista de filas o dict de columnas)
+        param_sets: Lista de dicts {parámetro: valor} (grid_params/random_params)
+        config: BotConfig base
+        workers: Procesos (por defecto os.cpu_count(); 1 = en el proceso actual)
+        engine: 'vector' (aproximado, rápido) o 'exact' (BacktestEngine)
+        batch_size: Configuraciones por tarea (por defecto ~8 tareas por worker)
+        metric: Clave del resumen para ordenar
+        min_trades: Trades mínimos para entrar en el ranking
+        **backtest_kwargs: initial_balance, fee_rate, slippage_pct, warmup
+
+    Returns:
+        Filas (parámetros + resumen) ordenadas por rank_results()
+    """
+    config = copy.copy(config or BotConfig())
+    arrays, indicators = prepare_arrays(candles, config)
+    workers = workers or os.cpu_count() or 1
+    batch_size = batch_size or max(1, len(param_sets) // (workers * 8))
+    batches = [param_sets[i:i + batch_size] for i in range(0, len(param_sets), batch_size)]
+
+    rows = []
+    with SharedCandles(arrays, indicators) as shared:
+        init_args = (shared.name, shared.shape, config, engine, backtest_kwargs)
+        if workers == 1:
+            _init_worker(*init_args)
+            try:
+                for batch in batches:
+                    rows.extend(_run_batch(batch))
+            finally:
+                _close_worker()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+                for batch_rows in pool.map(_run_batch, batches):
+                    rows.extend(batch_rows)
+    return rank_results(rows, metric, min_trades)
+
+
+def format_table(rows, top=20):
+    """Tabla de texto con las primeras `top` filas del ranking"""
+    params = list(_PARAM_BOUNDS)
+    headers = ['#'] + params + ['trades', 'win%', 'ret%', 'dd%']
+    lines = ['  '.join(f"{header:>8}" for header in headers)]
+    for row in rows[:top]:
+        if 'error' in row:
+            values = [str(row['rank'])] + [str(row[name]) for name in params] + [f"error: {row['error']}"]
+        else:
+            values = ([str(row['rank'])] + [f"{row[name]:g}" for name in params]
+                      + [str(row['total_trades']), f"{row['win_rate']:.1f}",
+                         f"{row['return_pct']:.2f}", f"{row['max_drawdown_pct']:.2f}"])
+        lines.append('  '.join(f"{value:>8}" for value in values))
+    return '\n'.join(lines)
+
+
+def write_results(rows, path):
+    """Guarda el ranking completo en CSV"""
+    fields = ['rank'] + list(_PARAM_BOUNDS) + list(SUMMARY_KEYS) + ['error']
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    from candle_store import CandleStore
+    from market_stream import read_candles_csv
+
+    parser = argparse.ArgumentParser(description="Barrido paralelo de parámetros dentro de _PARAM_BOUNDS")
+    parser.add_argument('--csv', help="CSV timestamp,open,high,low,close,volume (por defecto el almacén de velas)")
+    parser.add_argument('--symbol', default=None, help="Por defecto config.symbol")
+    parser.add_argument('--timeframe', default=None, help="Por defecto config.timeframe")
+    parser.add_argument('--start', default=None, help="Fecha inicial YYYY-MM-DD (UTC)")
+    parser.add_argument('--end', default=None, help="Fecha final YYYY-MM-DD (UTC)")
+    parser.add_argument('--mode', choices=('random', 'grid'), default='random')
+    parser.add_argument('--configs', type=int, default=1000, help="Configuraciones aleatorias (modo random)")
+    parser.add_argument('--steps', type=int, default=3, help="Valores por parámetro (modo grid)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=None, help="Procesos (por defecto todos los núcleos)")
+    parser.add_argument('--exact', action='store_true', help="Usar el backtest por eventos (lento)")
+    parser.add_argument('--metric', default='return_pct', choices=SUMMARY_KEYS)
+    parser.add_argument('--min-trades', type=int, default=10)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--out', default=None, help="CSV con el ranking completo (por defecto logs/sweep_*.csv)")
+    args = parser.parse_args()
+
+    config = BotConfig()
+    config.symbol = args.symbol or config.symbol
+    config.timeframe = args.timeframe or config.timeframe
+
+    if args.csv:
+        candles = read_candles_csv(args.csv)
+        count = len(candles)
+    else:
+        store = CandleStore(config.candle_store_file)
+        candles = store.load_arrays(config.symbol, config.timeframe,
+                                    _parse_date(args.start) if args.start else None,
+                                    _parse_date(args.end) if args.end else None)
+        store.close()
+        count = len(candles['timestamp'])
+    if count == 0:
+        print("❌ Sin velas para el rango indicado (descárgalas con history_downloader.py)")
+        return
+
+    if args.mode == 'grid':
+        param_sets = grid_params(args.steps, config=config)
+    else:
+        param_sets = random_params(args.configs, config=config, seed=args.seed)
+
+    started = time.perf_counter()
+    rows = run_sweep(candles, param_sets, config, workers=args.workers,
+                     engine='exact' if args.exact else 'vector', metric=args.metric, min_trades=args.min_trades)
+    elapsed = time.perf_counter() - started
+
+    out = args.out or os.path.join(config.logs_dir, f'sweep_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
+    write_results(rows, out)
+    print(f"\n🔬 {len(rows)} configuraciones × {count} velas en {elapsed:.1f}s "
+          f"({len(rows) / elapsed:,.0f} configs/s)")
+    print(format_table(rows, args.top))
+    print(f"🧾 Ranking completo en {out}")
+
+
+if __name__ == "__main__":
+    main()
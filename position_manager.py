@@ -1,13 +1,15 @@
 import time
 from datetime import datetime
 
+from exchange_metrics import BudgetDeferred
+
 
 class PositionManager:
     """
     Gestor de posiciones (abrir, cerrar, sizing)
     """
 
-    def __init__(self, exchange, config, logger, log_trade_callback=None, save_state_callback=None):
+    def __init__(self, exchange, config, logger, log_trade_callback=None, save_state_callback=None, clock=None):
         """
         Args:
             exchange: Instancia del exchange (ccxt)
@@ -15,27 +17,81 @@ class PositionManager:
             logger: Logger para registrar información
             log_trade_callback: Función callback para registrar trades
             save_state_callback: Función callback para guardar estado
+            clock: Reloj en segundos (inyectable para simulaciones; por defecto la hora actual)
         """
         self.exchange = exchange
         self.config = config
         self.logger = logger
         self.log_trade_callback = log_trade_callback
         self.save_state_callback = save_state_callback
+        self.clock = clock
 
         # Estado de posición
         self.position = None
         self.in_position = False
 
+        # Caché del balance USDT (TTL corto, se invalida al enviar órdenes)
+        self._balance = None
+        self._balance_time = 0
+        self._balance_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _now(self):
+        return datetime.fromtimestamp(self.clock()) if self.clock is not None else datetime.now()
+
+    def _elapsed_clock(self):
+        """Reloj para la caducidad de cachés: el inyectado (simulaciones) o time.monotonic"""
+        return self.clock() if self.clock is not None else time.monotonic()
+
+    def balance_cached(self):
+        """True si hay un balance en caché dentro de config.balance_cache_ttl"""
+        return self._balance is not None and self._elapsed_clock() - self._balance_time < self.config.balance_cache_ttl
+
+    def store_balance(self, balance):
+        """
+        Guarda en caché un balance ya descargado (p. ej. en paralelo con las velas del ciclo).
+
+        Returns:
+            Balance USDT libre
+        """
+        self._balance = float(balance.get('USDT', {}).get('free', 0))
+        self._balance_time = self._elapsed_clock()
+        return self._balance
+
     def get_account_balance(self):
-        """Obtiene el balance de la cuenta"""
+        """Obtiene el balance de la cuenta (cacheado durante config.balance_cache_ttl segundos)"""
+        if self.balance_cached():
+            self._balance_stats['hits'] += 1
+            return self._balance
+
         try:
-            balance = self.exchange.fetch_balance()
-            usdt_balance = float(balance.get('USDT', {}).get('free', 0))
-            return usdt_balance
+            self._balance_stats['misses'] += 1
+            return self.store_balance(self.exchange.fetch_balance())
+        except BudgetDeferred:
+            raise  # Petición de baja prioridad aplazada: decide quien programó la tarea
         except Exception as e:
             self.logger.error(f"Error obteniendo balance: {e}")
             return 0
 
+    def invalidate_balance_cache(self):
+        """Descarta el balance cacheado (tras enviar una orden o detectar un fill)"""
+        if self._balance is not None:
+            self._balance_stats['invalidations'] += 1
+        self._balance = None
+
+    def balance_cache_stats(self):
+        """Estadísticas de la caché de balance"""
+        lookups = self._balance_stats['hits'] + self._balance_stats['misses']
+        stats = dict(self._balance_stats)
+        stats['hit_rate'] = (self._balance_stats['hits'] / lookups * 100) if lookups else 0.0
+        return stats
+
+    def _create_market_order(self, side, quantity):
+        """Envía una orden de mercado; el balance cacheado deja de ser válido aunque falle"""
+        try:
+            return self.exchange.create_market_order(self.config.symbol, side, quantity)
+        finally:
+            self.invalidate_balance_cache()
+
     def calculate_position_size(self, price):
         """Calcula el tamaño de la posición para swing trading"""
         balance = self.get_account_balance()
@@ -97,9 +153,9 @@ class PositionManager:
             # Intentar crear orden real
             try:
                 if self.config.testnet:
-                    order = self.exchange.create_market_order(self.config.symbol, 'buy', quantity)
+                    order = self._create_market_order('buy', quantity)
                 else:
-                    order = self.exchange.create_market_order(self.config.symbol, 'buy', quantity)
+                    order = self._create_market_order('buy', quantity)
             except Exception as order_error:
                 self.logger.warning(f"Error creando orden real: {order_error}")
                 order = self.create_test_order('buy', quantity, price)
@@ -107,7 +163,7 @@ class PositionManager:
             self.position = {
                 'side': 'long',
                 'entry_price': price,
-                'entry_time': datetime.now(),
+                'entry_time': self._now(),
                 'quantity': quantity,
                 'stop_loss': stop_price,
                 'take_profit': take_profit_price,
@@ -158,9 +214,9 @@ class PositionManager:
 
             try:
                 if self.config.testnet:
-                    order = self.exchange.create_market_order(self.config.symbol, 'sell', quantity)
+                    order = self._create_market_order('sell', quantity)
                 else:
-                    order = self.exchange.create_market_order(self.config.symbol, 'sell', quantity)
+                    order = self._create_market_order('sell', quantity)
             except Exception as order_error:
                 self.logger.warning(f"Error creando orden real: {order_error}")
                 order = self.create_test_order('sell', quantity, price)
@@ -168,7 +224,7 @@ class PositionManager:
             self.position = {
                 'side': 'short',
                 'entry_price': price,
-                'entry_time': datetime.now(),
+                'entry_time': self._now(),
                 'quantity': quantity,
                 'stop_loss': stop_price,
                 'take_profit': take_profit_price,
@@ -219,7 +275,7 @@ class PositionManager:
 
             # Intentar crear orden de cierre
             try:
-                order = self.exchange.create_market_order(self.config.symbol, side, self.position['quantity'])
+                order = self._create_market_order(side, self.position['quantity'])
             except Exception as order_error:
                 self.logger.warning(f"Error creando orden de cierre: {order_error}")
                 order = self.create_test_order(side, self.position['quantity'], current_price)
@@ -233,7 +289,7 @@ class PositionManager:
             pnl_pct *= self.config.leverage
 
             # Calcular duración del swing
-            duration_hours = (datetime.now() - self.position['entry_time']).total_seconds() / 3600
+            duration_hours = (self._now() - self.position['entry_time']).total_seconds() / 3600
 
             self.logger.info(f"⭕ Posición SWING cerrada - {reason}")
             self.logger.info(f"💰 P&L: {pnl_pct:.2f}% | Duración: {duration_hours:.1f}h")
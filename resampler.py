@@ -0,0 +1,124 @@
+import numpy as np
+
+from candle_buffer import CandleBuffer
+
+_UNIT_MS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+# Las velas semanales de Binance abren el lunes; el epoch Unix cae en jueves
+_WEEK_OFFSET_MS = 4 * _UNIT_MS['d']
+
+
+def timeframe_to_ms(timeframe):
+    """Convierte un timeframe estilo ccxt ('15m', '4h', '1d', '1w') a milisegundos"""
+    try:
+        amount, unit = int(timeframe[:-1]), timeframe[-1]
+        return amount * _UNIT_MS[unit]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Timeframe no soportado: {timeframe}")
+
+
+class TimeframeResampler:
+    """
+    Construye velas de un timeframe superior a partir de las velas base.
+
+    Las velas se agrupan en intervalos alineados al epoch (igual que Binance:
+    12h a 00:00/12:00 UTC, 1d a 00:00 UTC, 1w los lunes). Cada vela base
+    cerrada se incorpora una sola vez al agregado del intervalo en curso; la
+    vela base en formación solo se combina con él al publicar la vela
+    superior, así que actualizar el tick no acumula volumen ni extremos dos
+    veces. Los intervalos incompletos al inicio del historial se descartan.
+    """
+
+    def __init__(self, base_timeframe, target_timeframe, capacity):
+        """
+        Args:
+            base_timeframe: Timeframe de las velas de entrada (ej. '4h')
+            target_timeframe: Timeframe a construir (ej. '1d')
+            capacity: Velas superiores retenidas
+        """
+        self.base_timeframe = base_timeframe
+        self.target_timeframe = target_timeframe
+        self.base_ms = timeframe_to_ms(base_timeframe)
+        self.target_ms = timeframe_to_ms(target_timeframe)
+        if self.target_ms <= self.base_ms or self.target_ms % self.base_ms:
+            raise ValueError(f"{target_timeframe} no es múltiplo superior de {base_timeframe}")
+        self.offset_ms = _WEEK_OFFSET_MS if target_timeframe.endswith('w') else 0
+
+        self.candles = CandleBuffer(capacity)
+        self.last_base_timestamp = None  # Última vela base cerrada incorporada
+        self._bucket = None              # Inicio del intervalo en curso
+        self._partial = None             # [open, high, low, close, volume] de sus velas cerradas
+
+    def bucket_start(self, timestamp):
+        """Inicio (ms) del intervalo superior que contiene `timestamp`"""
+        return (int(timestamp) - self.offset_ms) // self.target_ms * self.target_ms + self.offset_ms
+
+    def _add_closed(self, timestamp, open_, high, low, close, volume):
+        bucket = self.bucket_start(timestamp)
+        if bucket != self._bucket:
+            # Solo se abren intervalos que empiezan en su primera vela base
+            self._bucket = bucket if timestamp == bucket else None
+            self._partial = None
+        if self._bucket is None:
+            return
+
+        if self._partial is None:
+            self._partial = [open_, high, low, close, volume]
+        else:
+            partial = self._partial
+            partial[1] = max(partial[1], high)
+            partial[2] = min(partial[2], low)
+            partial[3] = close
+            partial[4] += volume
+
+        self.candles.upsert([[bucket] + self._partial])
+
+    def update(self, timestamps, open_, high, low, close, volume):
+        """
+        Incorpora una ventana de velas base (la última se considera en formación).
+
+        Solo se procesan las velas cerradas posteriores a last_base_timestamp,
+        por lo que el coste depende de las velas nuevas.
+
+        Returns:
+            Buffer de velas superiores (la última puede estar en formación)
+        """
+        count = len(timestamps)
+        if count == 0:
+            return self.candles
+
+        closed = count - 1
+        start = 0
+        if self.last_base_timestamp is not None:
+            start = int(np.searchsorted(timestamps[:closed], self.last_base_timestamp, side='right'))
+
+        for i in range(start, closed):
+            self._add_closed(int(timestamps[i]), float(open_[i]), float(high[i]),
+                             float(low[i]), float(close[i]), float(volume[i]))
+            self.last_base_timestamp = int(timestamps[i])
+
+        self._publish_forming(int(timestamps[-1]), float(open_[-1]), float(high[-1]),
+                              float(low[-1]), float(close[-1]), float(volume[-1]))
+        return self.candles
+
+    def update_from_buffer(self, buffer):
+        """Incorpora las velas de un CandleBuffer base"""
+        return self.update(buffer.timestamps, buffer.open, buffer.high,
+                           buffer.low, buffer.close, buffer.volume)
+
+    def _publish_forming(self, timestamp, open_, high, low, close, volume):
+        """Publica la vela superior en curso combinando la vela base en formación"""
+        bucket = self.bucket_start(timestamp)
+        if bucket == self._bucket and self._partial is not None:
+            partial = self._partial
+            row = [bucket, partial[0], max(partial[1], high), min(partial[2], low), close, partial[4] + volume]
+        elif timestamp == bucket:
+            row = [bucket, open_, high, low, close, volume]
+        else:
+            return
+        self.candles.upsert([row])
@@ -1,3 +1,6 @@
+import time
+
+
 class RiskManager:
     """
     Gestor de riesgo (trailing stops, exit conditions)
@@ -135,3 +138,35 @@ class RiskManager:
             elif current_rsi < 20 and current_price > ema_fast:
                 self.close_position_callback("RSI Oversold + Sobre EMA21", current_rsi, current_price, market_data)
                 return
+
+    def is_circuit_breaker_active(self, performance_metrics, trend_direction, rsi, now=None):
+        """
+        Devuelve True si el bot debe pausar búsqueda de señales nuevas.
+
+        Activa tras N pérdidas consecutivas (config.circuit_breaker_losses).
+        Se desactiva una vez pasadas config.circuit_breaker_hours Y el mercado
+        muestra convicción real: tendencia fuerte (bullish/bearish) + RSI extremo.
+
+        Args:
+            performance_metrics: Métricas con consecutive_losses y last_loss_time
+            trend_direction: Tendencia actual
+            rsi: RSI actual
+            now: Instante actual en segundos (por defecto time.time())
+        """
+        consecutive = performance_metrics.get('consecutive_losses', 0)
+        if consecutive < self.config.circuit_breaker_losses:
+            return False
+
+        last_loss = performance_metrics.get('last_loss_time', 0)
+        hours_elapsed = ((time.time() if now is None else now) - last_loss) / 3600
+
+        if hours_elapsed < self.config.circuit_breaker_hours:
+            return True
+
+        # Cooldown cumplido: reanudar solo con señal clara de mercado
+        strong_trend = trend_direction in ('bullish', 'bearish')
+        extreme_rsi = rsi < 35 or rsi > 70
+        if strong_trend and extreme_rsi:
+            return False
+
+        return True
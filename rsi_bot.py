@@ -8,7 +8,11 @@ from dotenv import load_dotenv
 from config import BotConfig
 from claude_advisor import ClaudeAdvisor, ParamAdjustments
 from indicators import TechnicalIndicators
+from candle_store import CandleStore
 from market_analyzer import MarketAnalyzer
+from market_scanner import MarketScanner
+from market_stream import WebSocketStream
+from scheduler import CandleScheduler
 from signal_detector import SignalDetector
 from position_manager import PositionManager
 from risk_manager import RiskManager
@@ -16,6 +20,8 @@ from state_manager import StateManager
 from analytics import Analytics
 from logging_manager import LoggingManager
 from exchange_client import ExchangeClient
+from async_exchange_client import AsyncExchangeClient
+from exchange_metrics import BudgetDeferred, ExchangeMetrics, InstrumentedExchange, RequestBudget
 
 # Cargar variables de entorno
 load_dotenv()
@@ -31,8 +37,15 @@ _PARAM_BOUNDS = {
     'breakeven_threshold':           (0.5, 2.0),
 }
 
+
+def _coerce_param(current, value):
+    """Convierte un valor sugerido al tipo del parámetro actual (los enteros se redondean, no se truncan)"""
+    if isinstance(current, int):
+        return int(round(value))
+    return type(current)(value)
+
 class BinanceRSIEMABot:
-    def __init__(self, api_key, api_secret, testnet=True):
+    def __init__(self, api_key, api_secret, testnet=True, exchange=None, clock=None):
         """
         Bot de trading RSI + EMA + Filtro de Tendencia para Binance - v2.1
 
@@ -40,7 +53,10 @@ class BinanceRSIEMABot:
             api_key: Tu API key de Binance
             api_secret: Tu API secret de Binance
             testnet: True para usar testnet, False para trading real
+            exchange: Exchange ccxt ya creado (p. ej. FakeBinanceExchange para simulación)
+            clock: Reloj en segundos para velas y planificador (por defecto time.time)
         """
+        self.clock = clock or time.time
 
         # Configuración centralizada
         self.config = BotConfig(testnet)
@@ -55,11 +71,16 @@ class BinanceRSIEMABot:
         self.logger = self.logging_manager.setup_logging()
 
         # Inicializar módulo de indicadores técnicos
-        self.indicators = TechnicalIndicators(self.logger)
+        self.indicators = TechnicalIndicators(
+            self.logger,
+            cache_size=self.config.indicator_cache_size,
+            engine=self.config.indicator_engine
+        )
 
         # Estado del bot
         self.last_signal_time = 0
         self.last_claude_scan_time = 0  # Último escaneo proactivo de mercado con Claude
+        self.last_analysis_time = 0  # Última evaluación completa (modo stream)
 
         # Variables de estado de mercado (para tracking)
         self.last_rsi = 50
@@ -94,15 +115,47 @@ class BinanceRSIEMABot:
             'last_loss_time': 0
         }
         
+        # Planificador alineado a cierres de vela (loop principal y tareas periódicas)
+        self.scheduler = CandleScheduler(
+            self.config.timeframe,
+            settle_seconds=self.config.candle_settle_seconds,
+            check_interval=self.config.check_interval,
+            logger=self.logger,
+            clock=self.clock
+        )
+
         # Configuración del exchange DESPUÉS de definir variables
-        self.exchange_client = ExchangeClient(api_key, api_secret, self.config, self.logger)
-        self.exchange = self.exchange_client.exchange  # Backward compatibility
+        if self.config.async_exchange and exchange is None:
+            self.exchange_client = AsyncExchangeClient(api_key, api_secret, self.config, self.logger)
+        else:
+            self.exchange_client = ExchangeClient(api_key, api_secret, self.config, self.logger, exchange=exchange)
+        # Métricas por endpoint y presupuesto de peso: resúmenes y escáner ceden ante órdenes y stops
+        self.exchange_metrics = ExchangeMetrics()
+        self.request_budget = RequestBudget(self.config.request_weight_limit)
+        self.exchange = InstrumentedExchange(
+            self.exchange_client.exchange, self.exchange_metrics, self.request_budget
+        )  # Backward compatibility
+        # Con el cliente asíncrono las peticiones de cada ciclo se lanzan en paralelo
+        self.parallel_cycle = isinstance(self.exchange_client, AsyncExchangeClient)
 
         # Inicializar módulo de análisis de mercado
-        self.market_analyzer = MarketAnalyzer(self.exchange, self.config, self.indicators, self.logger)
+        self.candle_store = CandleStore(self.config.candle_store_file, self.logger)
+        self.market_analyzer = MarketAnalyzer(
+            self.exchange, self.config, self.indicators, self.logger, store=self.candle_store, clock=self.clock
+        )
+
+        # Escáner de señales en pares adicionales (no abre posiciones)
+        self.market_scanner = None
+        if self.config.scan_symbols:
+            self.market_scanner = MarketScanner(
+                self.exchange.with_priority('low'), self.config, self.logger,
+                max_workers=self.config.scanner_workers, store=self.candle_store, clock=self.clock
+            )
 
         # Inicializar módulo de detección de señales
-        self.signal_detector = SignalDetector(self.config, self.logger, self.market_analyzer, self.performance_metrics)
+        self.signal_detector = SignalDetector(
+            self.config, self.logger, self.market_analyzer, self.performance_metrics, clock=self.clock
+        )
 
         # Inicializar módulo de gestión de posiciones
         self.position_manager = PositionManager(
@@ -110,7 +163,8 @@ class BinanceRSIEMABot:
             self.config,
             self.logger,
             log_trade_callback=self.log_trade,
-            save_state_callback=self.save_bot_state
+            save_state_callback=self.save_bot_state,
+            clock=self.clock
         )
 
         # Inicializar módulo de gestión de riesgo
@@ -137,7 +191,8 @@ class BinanceRSIEMABot:
             self.logger,
             self.position_manager,
             self.signal_detector,
-            get_balance_callback=self.get_account_balance
+            get_balance_callback=self.get_account_balance,
+            clock=self.clock
         )
         self.analytics.set_performance_metrics(self.performance_metrics)
 
@@ -190,6 +245,10 @@ class BinanceRSIEMABot:
         self.last_ema_trend = loaded_state['last_ema_trend']
         self.trend_direction = loaded_state['trend_direction']
 
+        # Reinicio en caliente: continuar EMAs/RSI desde la última vela guardada
+        if self.market_analyzer.restore_indicator_state(self.state_manager.get_loaded_indicator_state()):
+            self.logger.info("♻️ Estado de indicadores restaurado - solo se pedirán las velas perdidas")
+
     def setup_logging(self):
         """Configura sistema de logging - delegado a logging_manager"""
         return self.logging_manager.setup_logging()
@@ -212,7 +271,20 @@ class BinanceRSIEMABot:
     
     def get_market_data(self):
         """Obtiene datos del mercado para calcular RSI y EMAs - delegado a market_analyzer"""
-        return self.market_analyzer.get_market_data(log_callback=self.log_market_data)
+        if not self.parallel_cycle:
+            return self.market_analyzer.get_market_data(log_callback=self.log_market_data)
+        # Cliente asíncrono: velas y (si la caché expiró) balance en una sola ida y vuelta
+        return self.market_analyzer.get_market_data(
+            log_callback=self.log_market_data,
+            cycle_callback=self._apply_cycle_data,
+            ticker=False,
+            balance=not self.position_manager.in_position and not self.position_manager.balance_cached()
+        )
+
+    def _apply_cycle_data(self, cycle_data):
+        """Aprovecha el balance descargado junto con las velas del ciclo"""
+        if cycle_data.get('balance') is not None:
+            self.position_manager.store_balance(cycle_data['balance'])
     
     def determine_trend_direction(self, price, ema_fast, ema_slow, ema_trend):
         """Determinar dirección de tendencia - delegado a market_analyzer"""
@@ -236,7 +308,7 @@ class BinanceRSIEMABot:
     
     def log_market_data(self, price, rsi, volume, ema_fast, ema_slow, ema_trend, trend_direction, signal=None):
         """Registra datos de mercado con EMAs"""
-        timestamp = datetime.now()
+        timestamp = datetime.fromtimestamp(self.clock())
         
         # Calcular PnL no realizado si estamos en posición
         unrealized_pnl = 0
@@ -309,6 +381,7 @@ class BinanceRSIEMABot:
             self.last_ema_fast, self.last_ema_slow, self.last_ema_trend,
             self.trend_direction
         )
+        self.state_manager.set_indicator_state(self.market_analyzer.export_indicator_state())
         self.state_manager.save_bot_state()
 
     def load_bot_state(self):
@@ -432,7 +505,7 @@ class BinanceRSIEMABot:
 
         confirmation_time_hours = 0
         if self.signal_detector.signal_trigger_time:
-            confirmation_time_hours = (datetime.now() - self.signal_detector.signal_trigger_time).total_seconds() / 3600
+            confirmation_time_hours = (datetime.fromtimestamp(self.clock()) - self.signal_detector.signal_trigger_time).total_seconds() / 3600
 
         if signal_type == 'long':
             if self.open_long_position(current_price, current_rsi, ema_fast, ema_slow,
@@ -481,9 +554,10 @@ class BinanceRSIEMABot:
             suggested = getattr(adjustments, param)
             clamped = max(lo, min(hi, suggested))
             current = getattr(self.config, param)
-            if abs(clamped - current) > 1e-9:
-                setattr(self.config, param, type(current)(clamped))
-                changes.append(f"{param}: {current} → {type(current)(clamped)}")
+            value = _coerce_param(current, clamped)
+            if abs(value - current) > 1e-9:
+                setattr(self.config, param, value)
+                changes.append(f"{param}: {current} → {value}")
         if changes:
             self.logger.info(
                 f"🤖 Claude ajustó parámetros [{adjustments.regime}]: {', '.join(changes)}"
@@ -493,34 +567,18 @@ class BinanceRSIEMABot:
             self.logger.debug(f"🤖 Claude evaluó parámetros [{adjustments.regime}]: sin cambios necesarios")
 
     def _is_circuit_breaker_active(self, trend_direction, rsi):
-        """
-        Devuelve True si el bot debe pausar búsqueda de señales nuevas.
-
-        Activa tras N pérdidas consecutivas (config.circuit_breaker_losses).
-        Se desactiva una vez pasadas config.circuit_breaker_hours Y el mercado
-        muestra convicción real: tendencia fuerte (bullish/bearish) + RSI extremo.
-        """
-        consecutive = self.performance_metrics.get('consecutive_losses', 0)
-        if consecutive < self.config.circuit_breaker_losses:
-            return False
-
-        last_loss = self.performance_metrics.get('last_loss_time', 0)
-        hours_elapsed = (time.time() - last_loss) / 3600
-
-        if hours_elapsed < self.config.circuit_breaker_hours:
-            return True
-
-        # Cooldown cumplido: reanudar solo con señal clara de mercado
-        strong_trend = trend_direction in ('bullish', 'bearish')
-        extreme_rsi = rsi < 35 or rsi > 70
-        if strong_trend and extreme_rsi:
-            return False
-
-        return True
+        """Pausa de señales nuevas tras pérdidas consecutivas - delegado a risk_manager"""
+        return self.risk_manager.is_circuit_breaker_active(
+            self.performance_metrics, trend_direction, rsi, now=self.clock()
+        )
 
-    def analyze_and_trade(self):
+    def analyze_and_trade(self, market_data=None):
         """Análisis principal y ejecución de trades para swing"""
-        market_data = self.get_market_data()
+        if market_data is None:
+            # Con posición abierta la consulta alimenta los stops: prioridad crítica
+            level = 'critical' if self.position_manager.in_position else 'normal'
+            with self.exchange.priority(level):
+                market_data = self.get_market_data()
         if not market_data:
             return
 
@@ -534,7 +592,7 @@ class BinanceRSIEMABot:
         if self.position_manager.in_position:
             return
 
-        current_time = time.time()
+        current_time = self.clock()
         confirmed, signal_type = self.check_swing_confirmation(current_price, current_rsi, trend_direction)
 
         if confirmed:
@@ -543,7 +601,7 @@ class BinanceRSIEMABot:
             if self._is_circuit_breaker_active(trend_direction, current_rsi):
                 consecutive = self.performance_metrics.get('consecutive_losses', 0)
                 last_loss = self.performance_metrics.get('last_loss_time', 0)
-                hours_str = f"{(time.time() - last_loss) / 3600:.1f}h" if last_loss else "desconocido"
+                hours_str = f"{(self.clock() - last_loss) / 3600:.1f}h" if last_loss else "desconocido"
                 self.logger.warning(
                     f"🛑 Circuit breaker activo ({consecutive} pérdidas consecutivas, "
                     f"{hours_str} desde la última) — esperando tendencia fuerte + RSI extremo"
@@ -551,10 +609,83 @@ class BinanceRSIEMABot:
             else:
                 self._scan_for_new_signal(market_data, current_time)
     
+    def on_market_event(self, event):
+        """
+        Procesa un evento del stream de mercado.
+
+        Al cierre de vela (y como mínimo cada check_interval) se ejecuta el
+        análisis completo; el resto de eventos solo revisan las salidas de la
+        posición abierta, así los stops reaccionan al instante sin alterar el
+        ritmo de confirmación de señales.
+
+        Returns:
+            True si se ejecutó el análisis completo
+        """
+        closed = event['type'] == 'candle' and event['closed']
+        full = closed or self.clock() - self.last_analysis_time >= self.config.check_interval
+        market_data = self.market_analyzer.apply_stream_event(
+            event,
+            log_callback=self.log_market_data if full else None,
+            evaluate=full or self.position_manager.in_position
+        )
+        if not market_data:
+            return False
+
+        if full:
+            self.analyze_and_trade(market_data)
+            self.last_analysis_time = self.clock()
+        else:
+            self.check_exit_conditions_swing(market_data['price'], market_data['rsi'], market_data)
+        return full
+
+    def run_stream(self, stream):
+        """
+        Ejecuta el bot dirigido por eventos hasta que el stream termina.
+
+        Carga el historial por REST una vez y después reacciona a cada evento.
+        """
+        self.analyze_and_trade()
+        self.last_analysis_time = self.clock()
+
+        for event in stream.events():
+            self.on_market_event(event)
+            self.scheduler.run_due_tasks()
+
+    def scan_markets(self):
+        """Escanea config.scan_symbols y registra las señales detectadas"""
+        if self.market_scanner is None:
+            return []
+        results = self.market_scanner.scan()
+        if self.market_scanner.retry_after:
+            # Sin margen de peso: se reintenta cuando libere la ventana, sin esperar en el loop
+            self.scheduler.retry_task('market_scan', self.market_scanner.retry_after)
+        for result in results:
+            if result['confirmed']:
+                self.logger.info(
+                    f"🔭 {result['symbol']}: señal {result['confirmed'].upper()} confirmada | "
+                    f"${result['price']:,.4f} | RSI: {result['rsi']:.1f} | {result['trend_direction']}"
+                )
+            elif result['new_signal']:
+                self.logger.info(f"🔭 {result['symbol']}: nueva señal {result['pending']} pendiente de confirmación")
+        return results
+
+    def register_scheduled_tasks(self):
+        """Registra en el planificador el resumen, el guardado de estado y el escaneo"""
+        self.scheduler.add_task('summary', self._scheduled_summary, self.config.summary_interval)
+        self.scheduler.add_task('save_state', self.save_bot_state, self.config.save_state_interval)
+        if self.market_scanner is not None:
+            self.scheduler.add_task('market_scan', self.scan_markets, self.config.check_interval or self.scheduler.candle_seconds)
+
+    def _create_market_stream(self):
+        """Stream de mercado según config.market_data_source (None = polling)"""
+        if self.config.market_data_source != 'websocket':
+            return None
+        return WebSocketStream(self.config.symbol, self.config.timeframe, self.logger, testnet=self.config.testnet)
+
     def run(self):
         """Ejecuta el bot en un loop continuo optimizado para swing trading"""
         self.logger.info(f"🤖 RSI + EMA + Trend Filter Swing Bot v{BOT_VERSION} iniciado")
-        self.logger.info(f"📊 Timeframe: {self.config.timeframe} | RSI({self.config.rsi_period}) | OS: {self.config.rsi_oversold} | OB: {self.config.rsi_overbought}")
+        self.logger.info(f"📊 Timeframe: {self.config.timeframe} | RSI({self.config.rsi_period}, {self.config.rsi_smoothing}) | OS: {self.config.rsi_oversold} | OB: {self.config.rsi_overbought}")
         self.logger.info(f"📈 EMAs: Fast({self.config.ema_fast_period}) | Slow({self.config.ema_slow_period}) | Trend({self.config.ema_trend_period})")
         self.logger.info(f"⚡ Leverage: {self.config.leverage}x | Risk: {self.config.position_size_pct}% | SL: {self.config.stop_loss_pct}% | TP: {self.config.take_profit_pct}%")
         self.logger.info(f"🎯 Swing Confirmación: {self.config.swing_confirmation_threshold}% | Max espera: {self.config.max_swing_wait} períodos")
@@ -562,26 +693,28 @@ class BinanceRSIEMABot:
         self.logger.info(f"💾 Estado guardado en: {self.config.state_file}")
         self.logger.info(f"🐳 Ejecutándose en Docker - PID: {os.getpid()}")
         
-        # Para swing trading, verificar cada 30 minutos (timeframe 4h)
-        check_interval = 1800  # 30 minutos en segundos
-        iteration = 0
+        # Despertar en cada cierre de vela (+ margen) y cada check_interval dentro de la vela
+        self.register_scheduled_tasks()
+        stream = self._create_market_stream()
         
         try:
             while True:
                 try:
+                    if stream is not None:
+                        # Modo eventos: el stream reconecta solo; si termina se vuelve a polling
+                        self.run_stream(stream)
+                        stream.close()
+                        stream = None
+                        continue
+
                     # Main trading logic with error recovery
                     self.analyze_and_trade()
 
-                    # Mostrar resumen cada 4 horas (8 iteraciones de 30 min)
-                    iteration += 1
-                    if iteration % 8 == 0:
-                        self.log_performance_summary()
+                    # Resumen y guardado de estado según su marca programada
+                    self.scheduler.run_due_tasks()
 
-                    # Guardar estado cada hora (2 iteraciones)
-                    if iteration % 2 == 0:
-                        self.save_bot_state()
-
-                    time.sleep(check_interval)
+                    if self.scheduler.wait_next():
+                        self.logger.info(f"🕯️ Cierre de vela {self.config.timeframe} - evaluando")
 
                 except ccxt.NetworkError as e:
                     # Network errors: retry without crashing
@@ -629,7 +762,24 @@ class BinanceRSIEMABot:
             except:
                 self.logger.error("No se pudo guardar el estado")
             raise
+
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Libera el pool del escáner y la sesión del exchange"""
+        if self.market_scanner is not None:
+            self.market_scanner.close()
+        self.exchange_client.close()
     
+    def _scheduled_summary(self):
+        """Resumen periódico; se aplaza si la cuota de baja prioridad no admite el balance"""
+        try:
+            self.log_performance_summary()
+        except BudgetDeferred as e:
+            self.logger.info(f"⏸️ Resumen aplazado {e.retry_after:.0f}s por presupuesto de peso")
+            self.scheduler.retry_task('summary', e.retry_after)
+
     def log_performance_summary(self):
         """Muestra resumen de performance - delegado a analytics"""
         # Actualizar analytics con estado de mercado actual
@@ -637,7 +787,50 @@ class BinanceRSIEMABot:
             self.last_ema_fast, self.last_ema_slow, self.last_ema_trend,
             self.trend_direction
         )
-        self.analytics.log_performance_summary()
+        with self.exchange.priority('low'):
+            self.analytics.log_performance_summary()
+
+        cache_stats = self.market_analyzer.indicator_cache_stats()
+        self.logger.info(
+            f"🧮 Caché indicadores: {cache_stats['hits']} aciertos / {cache_stats['misses']} fallos "
+            f"({cache_stats['hit_rate']:.1f}%) | {cache_stats['size']}/{cache_stats['maxsize']} entradas"
+        )
+
+        balance_stats = self.position_manager.balance_cache_stats()
+        self.logger.info(
+            f"💵 Caché balance: {balance_stats['hits']} aciertos / {balance_stats['misses']} fallos "
+            f"({balance_stats['hit_rate']:.1f}%) | {balance_stats['invalidations']} invalidaciones por órdenes"
+        )
+
+        self.log_exchange_metrics()
+
+    def get_exchange_metrics(self):
+        """
+        Métricas de peticiones al exchange.
+
+        Returns:
+            dict de ExchangeMetrics.snapshot() con la clave 'budget' (RequestBudget.stats())
+        """
+        metrics = self.exchange_metrics.snapshot()
+        metrics['budget'] = self.request_budget.stats()
+        self.performance_metrics['exchange_requests'] = metrics['total_calls']
+        self.performance_metrics['exchange_errors'] = metrics['total_errors']
+        return metrics
+
+    def log_exchange_metrics(self):
+        """Registra llamadas, latencias, errores y peso por endpoint"""
+        metrics = self.get_exchange_metrics()
+        budget = metrics['budget']
+        self.logger.info(
+            f"📡 Exchange: {metrics['total_calls']} peticiones | {metrics['total_errors']} errores | "
+            f"peso {budget['used_weight']}/{budget['weight_limit']} último minuto | "
+            f"aplazadas: {sum(budget['deferrals'].values())} ({budget['deferred_seconds']:.1f}s)"
+        )
+        for method, endpoint in sorted(metrics['endpoints'].items()):
+            self.logger.info(
+                f"   {method}: {endpoint['calls']} llamadas | media {endpoint['avg_ms']:.0f}ms | "
+                f"máx {endpoint['max_ms']:.0f}ms | errores {endpoint['error_rate']:.1f}% | peso {endpoint['weight']}"
+            )
 
 
 # Ejemplo de uso optimizado para swing trading
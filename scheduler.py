@@ -0,0 +1,116 @@
+import math
+import time
+
+from resampler import timeframe_to_ms
+
+
+class CandleScheduler:
+    """
+    Planificador alineado a los cierres de vela.
+
+    Despierta `settle_seconds` después de cada cierre del timeframe (margen
+    para que el exchange publique la vela definitiva) y, opcionalmente, en
+    los múltiplos de `check_interval` dentro de la vela. Todas las marcas se
+    alinean al epoch, igual que las velas de Binance, así que no hay deriva
+    entre iteraciones. Las tareas periódicas (resumen, guardado de estado)
+    usan la misma rejilla y se ejecutan en la primera comprobación tras
+    vencer.
+    """
+
+    def __init__(self, timeframe, settle_seconds=5, check_interval=None, logger=None,
+                 clock=time.time, sleep=time.sleep):
+        """
+        Args:
+            timeframe: Timeframe de las velas (ej. '4h')
+            settle_seconds: Segundos tras el cierre antes de despertar
+            check_interval: Segundos entre comprobaciones dentro de la vela (None = solo cierres)
+            logger: Logger para errores de tareas
+            clock: Reloj en segundos (inyectable para tests/backtests)
+            sleep: Función de espera (inyectable para tests/backtests)
+        """
+        self.candle_seconds = timeframe_to_ms(timeframe) / 1000.0
+        self.settle_seconds = settle_seconds
+        self.check_interval = check_interval if check_interval and check_interval < self.candle_seconds else None
+        self.logger = logger
+        self.clock = clock
+        self.sleep = sleep
+        self.tasks = []
+
+    def _next_boundary(self, period, now):
+        """Primera marca k * period + settle estrictamente posterior a now"""
+        return (math.floor((now - self.settle_seconds) / period) + 1) * period + self.settle_seconds
+
+    def next_wakeup(self, now=None):
+        """
+        Próximo despertar.
+
+        Returns:
+            (instante en segundos, True si corresponde a un cierre de vela)
+        """
+        now = self.clock() if now is None else now
+        close = self._next_boundary(self.candle_seconds, now)
+        if self.check_interval is None:
+            return close, True
+        check = self._next_boundary(self.check_interval, now)
+        if check < close - 1e-6:
+            return check, False
+        return close, True
+
+    def wait_next(self):
+        """
+        Espera hasta el próximo despertar.
+
+        Returns:
+            True si el despertar corresponde a un cierre de vela
+        """
+        wakeup, is_close = self.next_wakeup()
+        while True:
+            delay = wakeup - self.clock()
+            if delay <= 0:
+                return is_close
+            self.sleep(delay)
+
+    def add_task(self, name, callback, interval):
+        """
+        Registra una tarea periódica alineada a múltiplos de `interval` segundos.
+
+        La primera ejecución es en la primera marca posterior al registro.
+        """
+        self.tasks.append({
+            'name': name,
+            'callback': callback,
+            'interval': interval,
+            'next_due': self._next_boundary(interval, self.clock())
+        })
+
+    def retry_task(self, name, delay):
+        """
+        Adelanta la próxima ejecución de una tarea a `delay` segundos desde ahora.
+
+        Para tareas que se aplazan (p. ej. sin presupuesto de peso) y no
+        deben esperar a la siguiente marca de su intervalo.
+        """
+        for task in self.tasks:
+            if task['name'] == name:
+                task['next_due'] = min(task['next_due'], self.clock() + delay)
+
+    def run_due_tasks(self, now=None):
+        """
+        Ejecuta las tareas vencidas (una vez cada una aunque se hayan saltado marcas).
+
+        Returns:
+            Nombres de las tareas ejecutadas
+        """
+        now = self.clock() if now is None else now
+        executed = []
+        for task in self.tasks:
+            if now + 1e-6 < task['next_due']:
+                continue
+            task['next_due'] = self._next_boundary(task['interval'], max(now, task['next_due']))
+            try:
+                task['callback']()
+                executed.append(task['name'])
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Error en tarea programada {task['name']}: {e}")
+        return executed
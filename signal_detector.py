@@ -6,18 +6,20 @@ class SignalDetector:
     Detector y confirmador de señales de trading
     """
 
-    def __init__(self, config, logger, market_analyzer, performance_metrics):
+    def __init__(self, config, logger, market_analyzer, performance_metrics, clock=None):
         """
         Args:
             config: Configuración del bot
             logger: Logger para registrar información
             market_analyzer: Instancia de MarketAnalyzer para pullback detection
             performance_metrics: Diccionario de métricas de rendimiento
+            clock: Reloj en segundos (inyectable para simulaciones; por defecto la hora actual)
         """
         self.config = config
         self.logger = logger
         self.market_analyzer = market_analyzer
         self.performance_metrics = performance_metrics
+        self.clock = clock
 
         # Estado de señales pendientes
         self.pending_long_signal = False
@@ -29,6 +31,9 @@ class SignalDetector:
         # Variables para comparación
         self.last_rsi = 50
 
+    def _now(self):
+        return datetime.fromtimestamp(self.clock()) if self.clock is not None else datetime.now()
+
     def detect_swing_signal(self, price, rsi, ema_fast, ema_slow, ema_trend, trend_direction, in_position):
         """OPTIMIZED: More flexible signal detection"""
 
@@ -47,7 +52,7 @@ class SignalDetector:
             if is_pullback or not self.config.pullback_ema_touch or rsi < 25:
                 self.pending_long_signal = True
                 self.signal_trigger_price = price
-                self.signal_trigger_time = datetime.now()
+                self.signal_trigger_time = self._now()
                 self.swing_wait_count = 0
 
                 self.performance_metrics['signals_detected'] += 1
@@ -65,7 +70,7 @@ class SignalDetector:
             if is_pullback or not self.config.pullback_ema_touch or rsi > 85:
                 self.pending_short_signal = True
                 self.signal_trigger_price = price
-                self.signal_trigger_time = datetime.now()
+                self.signal_trigger_time = self._now()
                 self.swing_wait_count = 0
 
                 self.performance_metrics['signals_detected'] += 1
@@ -82,7 +87,7 @@ class SignalDetector:
             if is_pullback:
                 self.pending_long_signal = True
                 self.signal_trigger_price = price
-                self.signal_trigger_time = datetime.now()
+                self.signal_trigger_time = self._now()
                 self.swing_wait_count = 0
 
                 self.performance_metrics['signals_detected'] += 1
@@ -100,7 +105,7 @@ class SignalDetector:
             if is_pullback and ema_sep >= self.config.trend_continuation_ema_sep:
                 self.pending_long_signal = True
                 self.signal_trigger_price = price
-                self.signal_trigger_time = datetime.now()
+                self.signal_trigger_time = self._now()
                 self.swing_wait_count = 0
 
                 self.performance_metrics['signals_detected'] += 1
@@ -37,6 +37,9 @@ class StateManager:
             'trend_direction': 'neutral'
         }
 
+        # Estado incremental de indicadores (EMAs, RSI, suite) para reinicio en caliente
+        self.indicator_state = None
+
     def set_market_state(self, last_signal_time, last_rsi, last_price, last_ema_fast, last_ema_slow, last_ema_trend, trend_direction):
         """Actualiza referencias a las variables de estado de mercado"""
         self.market_state = {
@@ -49,6 +52,10 @@ class StateManager:
             'trend_direction': trend_direction
         }
 
+    def set_indicator_state(self, indicator_state):
+        """Actualiza el estado serializado de indicadores a persistir"""
+        self.indicator_state = indicator_state
+
     def save_bot_state(self):
         """Guarda el estado actual del bot en archivo JSON"""
         try:
@@ -78,7 +85,8 @@ class StateManager:
                 'last_ema_fast': self.market_state['last_ema_fast'],
                 'last_ema_slow': self.market_state['last_ema_slow'],
                 'last_ema_trend': self.market_state['last_ema_trend'],
-                'trend_direction': self.market_state['trend_direction']
+                'trend_direction': self.market_state['trend_direction'],
+                'indicator_state': self.indicator_state
             }
 
             with open(self.config.state_file, 'w') as f:
@@ -143,6 +151,7 @@ class StateManager:
             self.market_state['last_ema_slow'] = state_data.get('last_ema_slow', 0)
             self.market_state['last_ema_trend'] = state_data.get('last_ema_trend', 0)
             self.market_state['trend_direction'] = state_data.get('trend_direction', 'neutral')
+            self.indicator_state = state_data.get('indicator_state')
 
             self.logger.info(f"📥 Estado del bot cargado desde {state_time.strftime('%H:%M:%S')}")
             return True
@@ -249,6 +258,7 @@ class StateManager:
                 self.logger.warning(f"🔍 BTC residual detectado: {btc_balance:.6f} BTC (≈${value_usdt:.2f}) — liquidando...")
                 try:
                     order = self.exchange.create_market_order(self.config.symbol, 'sell', btc_balance)
+                    self.position_manager.invalidate_balance_cache()
                     self.logger.info(f"✅ BTC residual liquidado: vendido {btc_balance:.6f} BTC @ ≈${current_price:,.2f} (orden {order.get('id', '?')})")
                 except Exception as sell_err:
                     self.logger.error(f"❌ No se pudo liquidar BTC residual: {sell_err}")
@@ -311,3 +321,7 @@ class StateManager:
     def get_loaded_market_state(self):
         """Retorna el estado de mercado cargado para que el bot lo restaure"""
         return self.market_state
+
+    def get_loaded_indicator_state(self):
+        """Retorna el estado de indicadores cargado (None si no había)"""
+        return self.indicator_state
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from async_exchange_client import AsyncExchangeClient
+from exchange_metrics import ExchangeMetrics, InstrumentedExchange
+from indicators import TechnicalIndicators
+from market_analyzer import MarketAnalyzer
+
+
+class FakeAsyncExchange:
+    """Exchange asíncrono con latencia simulada por llamada"""
+
+    def __init__(self, latency=0.1):
+        self.latency = latency
+        self.markets = {'BTC/USDT': {}}
+        self.currencies = {}
+        self.rateLimit = 50
+        self.closed = False
+        self.calls = []
+        self.set_markets_threads = []
+        self.ohlcv = [[0, 1.0, 2.0, 0.5, 1.5, 10.0]]
+
+    async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        await asyncio.sleep(self.latency)
+        return [row[:] for row in self.ohlcv[-(limit or len(self.ohlcv)):]]
+
+    async def fetch_ticker(self, symbol):
+        await asyncio.sleep(self.latency)
+        return {'symbol': symbol, 'last': 1.5}
+
+    async def fetch_balance(self):
+        self.calls.append(('fetch_balance', bool(self.markets)))
+        await asyncio.sleep(self.latency)
+        return {'USDT': {'free': 100.0}}
+
+    async def load_markets(self, reload=False):
+        self.calls.append(('load_markets', bool(self.markets)))
+        await asyncio.sleep(self.latency)
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.set_markets_threads.append(threading.current_thread().name)
+        self.markets = markets
+        self.currencies = currencies or {}
+
+    async def create_market_order(self, symbol, side, amount):
+        raise ValueError("orden rechazada")
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def client(tmp_path):
+    config = MagicMock()
+    config.symbol = 'BTC/USDT'
+    config.testnet = True
+    config.markets_cache_file = str(tmp_path / 'markets_cache.json')
+    config.markets_cache_ttl = 3600
+    fake = FakeAsyncExchange()
+    client = AsyncExchangeClient('key', 'secret', config, MagicMock(), exchange=fake)
+    yield client
+    client.close()
+
+
+class TestAsyncExchangeClient:
+    def test_cycle_calls_overlap(self, client):
+        start = time.monotonic()
+        data = client.fetch_cycle_data('BTC/USDT', '4h', limit=1)
+        elapsed = time.monotonic() - start
+        assert data['ticker']['last'] == 1.5
+        assert data['balance']['USDT']['free'] == 100.0
+        assert len(data['ohlcv']) == 1
+        assert elapsed < 0.25  # 3 llamadas de 0.1s en paralelo
+
+    def test_cycle_can_skip_ticker_and_balance(self, client):
+        data = client.fetch_cycle_data('BTC/USDT', '4h', limit=1, ticker=False, balance=False)
+        assert data['ticker'] is None and data['balance'] is None
+        assert client.async_exchange.calls == []
+
+    def test_cycle_keeps_candles_when_balance_fails(self, client):
+        async def failing_balance():
+            raise TimeoutError("balance timeout")
+
+        client.async_exchange.fetch_balance = failing_balance
+        data = client.fetch_cycle_data('BTC/USDT', '4h', limit=1)
+        assert len(data['ohlcv']) == 1
+        assert data['ticker']['last'] == 1.5
+        assert data['balance'] is None
+        client.logger.warning.assert_called_once()
+
+    def test_cycle_raises_when_candles_fail(self, client):
+        async def failing_ohlcv(symbol, timeframe, since=None, limit=None):
+            raise TimeoutError("ohlcv timeout")
+
+        client.async_exchange.fetch_ohlcv = failing_ohlcv
+        with pytest.raises(TimeoutError):
+            client.fetch_cycle_data('BTC/USDT', '4h', limit=1)
+
+    def test_analyzer_cycle_latency_is_max_not_sum(self, client):
+        client.async_exchange.ohlcv = [[i * 14400000, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10.0]
+                                       for i in range(250)]
+        config = MagicMock(symbol='BTC/USDT', timeframe='4h', rsi_period=14, rsi_smoothing='sma',
+                           incremental_sync=True, ema_fast_period=21, ema_slow_period=50, ema_trend_period=200,
+                           ema_separation_min=0.1, atr_period=14, bb_period=20, bb_std=2.0, macd_fast_period=12,
+                           macd_slow_period=26, macd_signal_period=9, adx_period=14)
+        metrics = ExchangeMetrics()
+        analyzer = MarketAnalyzer(InstrumentedExchange(client.exchange, metrics), config, TechnicalIndicators(),
+                                  MagicMock())
+        cycles = []
+
+        start = time.monotonic()
+        market_data = analyzer.get_market_data(cycle_callback=cycles.append)
+        elapsed = time.monotonic() - start
+
+        assert market_data['price'] == 100.5 + 249
+        assert cycles[0]['balance']['USDT']['free'] == 100.0
+        assert elapsed < 0.25  # velas + ticker + balance de 0.1s: ~max, no la suma (0.3s)
+        assert metrics.snapshot()['endpoints']['fetch_cycle_data']['weight'] == 2 + 2 + 20
+
+    def test_sync_facade_keeps_ccxt_interface(self, client):
+        assert client.exchange.fetch_ticker('BTC/USDT')['last'] == 1.5
+        assert client.exchange.markets == {'BTC/USDT': {}}
+        assert client.exchange.rateLimit == 50
+
+    def test_facade_calls_from_threads_share_the_loop(self, client):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.exchange.fetch_balance()))
+                   for _ in range(10)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 10
+        assert time.monotonic() - start < 0.5
+
+    def test_errors_propagate_to_caller(self, client):
+        with pytest.raises(ValueError):
+            client.exchange.create_market_order('BTC/USDT', 'buy', 0.001)
+
+    def test_verify_connection(self, client):
+        client.verify_connection()
+        client.logger.info.assert_called()
+        assert os.path.exists(client.config.markets_cache_file)
+
+    def test_warm_start_primes_markets_on_loop_before_balance(self, client):
+        client.market_cache.write({'BTC/USDT': {'id': 'BTCUSDT'}}, {})
+        fake = client.async_exchange
+        fake.markets = None
+
+        client.verify_connection()
+
+        assert fake.set_markets_threads == ['exchange-loop']
+        assert fake.calls == [('fetch_balance', True)]  # sin descarga de mercados
+
+    def test_close_releases_session_and_loop(self, client):
+        fake = client.async_exchange
+        client.close()
+        assert fake.closed is True
+        assert not client._thread.is_alive()
+        with pytest.raises(RuntimeError):
+            client.submit('fetch_balance')
@@ -0,0 +1,99 @@
+import csv
+import os
+import signal
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analytics import Analytics
+from backtest import BacktestEngine, candle_arrays, compute_indicator_arrays, summarize
+from config import BotConfig
+from fake_exchange import FakeBinanceExchange, synthetic_candles
+
+
+@pytest.fixture(scope='module')
+def candles():
+    return synthetic_candles(1500, seed=11, start=0, volatility=0.03)
+
+
+def _order_trace(orders):
+    return [(order['timestamp'], order['side'], round(order['amount'], 8), round(order['price'], 6))
+            for order in orders]
+
+
+class TestIndicatorArrays:
+    def test_rsi_undefined_maps_to_neutral(self, candles):
+        config = BotConfig()
+        arrays = compute_indicator_arrays(candle_arrays(candles)['close'], config)
+        assert arrays['rsi'][0] == 50.0
+        assert set(arrays) == {'ema_fast', 'ema_slow', 'ema_trend', 'rsi'}
+        assert len(arrays['ema_trend']) == len(candles)
+
+    def test_candle_arrays_accepts_columns(self, candles):
+        arrays = candle_arrays(candles)
+        assert candle_arrays(arrays)['close'].tolist() == arrays['close'].tolist()
+        assert arrays['timestamp'].dtype.kind == 'i'
+
+
+class TestBacktestEngine:
+    def test_matches_bot_on_fake_exchange(self, candles, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv('ANTHROPIC_API_KEY', raising=False)
+        handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)}
+        from rsi_bot import BinanceRSIEMABot
+
+        engine = BacktestEngine(candles)
+        result = engine.run(close_at_end=False)
+
+        exchange = FakeBinanceExchange(candles, warmup=engine.warmup, allow_short=True)
+        bot = BinanceRSIEMABot('key', 'secret', testnet=True, exchange=exchange, clock=exchange.clock)
+        try:
+            while True:
+                bot.analyze_and_trade()
+                if not exchange.advance():
+                    break
+        finally:
+            bot.shutdown()
+            for handler in bot.logger.handlers[:]:
+                bot.logger.removeHandler(handler)
+                handler.close()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+        assert len(exchange.orders) > 4
+        assert _order_trace(engine.exchange.orders) == _order_trace(exchange.orders)
+        assert result['metrics']['total_trades'] == bot.performance_metrics['total_trades']
+        assert result['metrics']['signals_detected'] == bot.performance_metrics['signals_detected']
+
+    def test_writes_trades_csv_in_analytics_schema(self, candles, tmp_path):
+        path = tmp_path / 'trades.csv'
+        result = BacktestEngine(candles).run(trades_file=str(path))
+
+        with open(path) as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == Analytics.TRADES_CSV_HEADER
+        closes = [row for row in rows[1:] if row[1] == 'CLOSE']
+        assert len(closes) == len(result['trades']) == result['summary']['total_trades']
+        assert result['summary']['final_equity'] == pytest.approx(result['equity'][-1])
+
+    def test_params_override_config_copy(self, candles):
+        config = BotConfig()
+        engine = BacktestEngine(candles, config, params={'stop_loss_pct': 1.0})
+        assert engine.config.stop_loss_pct == 1.0
+        assert config.stop_loss_pct != 1.0
+
+    def test_closes_open_position_at_end(self, candles):
+        engine = BacktestEngine(candles)
+        engine.run()
+        assert engine.exchange.balances[engine.exchange.base] == pytest.approx(0, abs=1e-9)
+
+
+class TestSummarize:
+    def test_drawdown_and_win_rate(self):
+        summary = summarize(np.array([100.0, 120.0, 90.0, 110.0]), [{'pnl_pct': 2.0}, {'pnl_pct': -1.0}], 100.0)
+        assert summary['max_drawdown_pct'] == pytest.approx(25.0)
+        assert summary['win_rate'] == 50.0
+        assert summary['return_pct'] == pytest.approx(10.0)
+        assert summary['total_trades'] == 2
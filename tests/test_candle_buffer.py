@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from candle_buffer import CandleBuffer
+
+
+def make_rows(n, start=0):
+    return [[(start + i) * 1000, 10.0 + i, 11.0 + i, 9.0 + i, 10.5 + i, 1.0] for i in range(n)]
+
+
+class TestCandleBuffer:
+    def test_rejects_non_positive_capacity(self):
+        with pytest.raises(ValueError):
+            CandleBuffer(0)
+
+    def test_upsert_fills_empty_buffer(self):
+        buffer = CandleBuffer(5)
+        assert buffer.upsert(make_rows(3)) == 3
+        assert len(buffer) == 3
+        np.testing.assert_array_equal(buffer.timestamps, [0, 1000, 2000])
+        np.testing.assert_array_equal(buffer.close, [10.5, 11.5, 12.5])
+
+    def test_keeps_only_last_capacity_candles(self):
+        buffer = CandleBuffer(4)
+        buffer.upsert(make_rows(10))
+        assert len(buffer) == 4
+        np.testing.assert_array_equal(buffer.timestamps, [6000, 7000, 8000, 9000])
+
+    def test_forming_candle_is_overwritten(self):
+        buffer = CandleBuffer(4)
+        buffer.upsert(make_rows(3))
+        updated = make_rows(3)
+        updated[-1][4] = 99.0
+        assert buffer.upsert(updated) == 0
+        assert len(buffer) == 3
+        assert buffer.close[-1] == 99.0
+
+    def test_wraparound_keeps_views_contiguous_and_ordered(self):
+        buffer = CandleBuffer(4)
+        buffer.upsert(make_rows(4))
+        buffer.upsert(make_rows(4, start=3))  # vela 3 actualizada + 3 nuevas
+        close = buffer.close
+        assert close.flags['C_CONTIGUOUS']
+        np.testing.assert_array_equal(buffer.timestamps, [3000, 4000, 5000, 6000])
+        np.testing.assert_array_equal(close, [10.5, 11.5, 12.5, 13.5])
+
+    def test_views_are_zero_copy(self):
+        buffer = CandleBuffer(4)
+        buffer.upsert(make_rows(4))
+        view = buffer.close
+        buffer.upsert([[3000, 0.0, 0.0, 0.0, 42.0, 0.0]])
+        assert view[-1] == 42.0
+
+    def test_ignores_candles_older_than_last(self):
+        buffer = CandleBuffer(8)
+        buffer.upsert(make_rows(5, start=2))
+        assert buffer.upsert(make_rows(3)) == 0
+        assert buffer.last_timestamp == 6000
+        assert len(buffer) == 5
@@ -0,0 +1,94 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from candle_store import CandleStore
+
+HOUR = 3600000
+
+
+def make_rows(n, start=0):
+    return [[(start + i) * HOUR, 10.0 + i, 11.0 + i, 9.0 + i, 10.5 + i, 1.0] for i in range(n)]
+
+
+class PagedExchange:
+    """Sirve velas 1h de un historial fijo respetando since/limit"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls.append((since, limit))
+        selected = [row for row in self.rows if since is None or row[0] >= since]
+        return [row[:] for row in selected[:limit]]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CandleStore(str(tmp_path / 'candles.db'))
+    yield store
+    store.close()
+
+
+class TestCandleStore:
+    def test_upsert_and_load_round_trip(self, store):
+        assert store.upsert('BTC/USDT', '1h', make_rows(5)) == 5
+        assert store.load('BTC/USDT', '1h') == make_rows(5)
+        assert store.load('BTC/USDT', '4h') == []
+
+    def test_upsert_replaces_existing_candle(self, store):
+        store.upsert('BTC/USDT', '1h', make_rows(3))
+        updated = make_rows(3)[-1]
+        updated[4] = 99.0
+        store.upsert('BTC/USDT', '1h', [updated])
+        assert store.count('BTC/USDT', '1h') == 3
+        assert store.load('BTC/USDT', '1h')[-1][4] == 99.0
+
+    def test_load_limit_returns_most_recent_in_order(self, store):
+        store.upsert('BTC/USDT', '1h', make_rows(10))
+        rows = store.load('BTC/USDT', '1h', limit=3)
+        assert [row[0] for row in rows] == [7 * HOUR, 8 * HOUR, 9 * HOUR]
+        assert store.last_timestamp('BTC/USDT', '1h') == 9 * HOUR
+
+    def test_load_arrays(self, store):
+        store.upsert('BTC/USDT', '1h', make_rows(4))
+        arrays = store.load_arrays('BTC/USDT', '1h', since=HOUR)
+        assert arrays['timestamp'].dtype == np.int64
+        np.testing.assert_array_equal(arrays['close'], [11.5, 12.5, 13.5])
+
+    def test_persists_between_instances(self, tmp_path):
+        path = str(tmp_path / 'candles.db')
+        CandleStore(path).upsert('BTC/USDT', '1h', make_rows(3))
+        assert CandleStore(path).count('BTC/USDT', '1h') == 3
+
+    def test_find_gaps(self, store):
+        rows = make_rows(10)
+        store.upsert('BTC/USDT', '1h', rows[2:4] + rows[6:8])
+        gaps = store.find_gaps('BTC/USDT', '1h', 0, 9 * HOUR)
+        assert gaps == [(0, HOUR), (4 * HOUR, 5 * HOUR), (8 * HOUR, 9 * HOUR)]
+
+    def test_no_gaps_when_complete(self, store):
+        store.upsert('BTC/USDT', '1h', make_rows(5))
+        assert store.find_gaps('BTC/USDT', '1h', 0, 4 * HOUR) == []
+
+    def test_backfill_paginates_missing_ranges(self, store):
+        history = make_rows(30)
+        store.upsert('BTC/USDT', '1h', history[10:12])
+        exchange = PagedExchange(history)
+
+        written = store.backfill(exchange, 'BTC/USDT', '1h', 0, 29 * HOUR, page_limit=4)
+        assert written == 28
+        assert store.load('BTC/USDT', '1h') == history
+        assert exchange.calls[0] == (0, 4)
+        assert all(limit == 4 for _, limit in exchange.calls)
+
+    def test_backfill_stops_when_exchange_has_no_data(self, store):
+        exchange = MagicMock()
+        exchange.fetch_ohlcv.return_value = []
+        assert store.backfill(exchange, 'BTC/USDT', '1h', 0, 5 * HOUR) == 0
+        assert exchange.fetch_ohlcv.call_count == 1
@@ -0,0 +1,194 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from exchange_metrics import BudgetDeferred, ExchangeMetrics, InstrumentedExchange, RequestBudget, request_weight
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeExchange:
+    def __init__(self):
+        self.markets = {'BTC/USDT': {}}
+        self.last_response_headers = {}
+        self.fail_next = False
+
+    def fetch_ohlcv(self, symbol, timeframe='1h', since=None, limit=None):
+        return [[0, 1, 1, 1, 1, 1]]
+
+    def fetch_balance(self):
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError('timeout')
+        self.last_response_headers = {'X-MBX-USED-WEIGHT-1M': '120'}
+        return {'USDT': {'free': 100}}
+
+    def create_market_order(self, symbol, side, amount):
+        return {'id': '1', 'side': side}
+
+    def amount_to_precision(self, symbol, amount):
+        return str(amount)
+
+
+class TestRequestWeight:
+    def test_ohlcv_weight_depends_on_limit(self):
+        assert request_weight('fetch_ohlcv', ('BTC/USDT', '4h'), {'limit': 3}) == 1
+        assert request_weight('fetch_ohlcv', ('BTC/USDT', '4h'), {'limit': 250}) == 2
+        assert request_weight('fetch_ohlcv', ('BTC/USDT', '4h', None, 1000), {}) == 5
+
+    def test_fixed_and_unknown_endpoints(self):
+        assert request_weight('fetch_balance', (), {}) == 20
+        assert request_weight('fetch_my_trades', (), {}) == 1
+
+
+class TestExchangeMetrics:
+    def test_snapshot_aggregates_latency_and_errors(self):
+        metrics = ExchangeMetrics()
+        metrics.record('fetch_ticker', 40, 2)
+        metrics.record('fetch_ticker', 300, 2)
+        metrics.record('fetch_ticker', 7000, 2, error=RuntimeError('boom'))
+
+        endpoint = metrics.snapshot()['endpoints']['fetch_ticker']
+        assert endpoint['calls'] == 3
+        assert endpoint['errors'] == 1
+        assert endpoint['error_rate'] == pytest.approx(100 / 3)
+        assert endpoint['weight'] == 6
+        assert endpoint['max_ms'] == 7000
+        assert endpoint['histogram']['50'] == 1
+        assert endpoint['histogram']['500'] == 1
+        assert endpoint['histogram']['inf'] == 1
+        assert 'boom' in endpoint['last_error']
+
+
+class TestRequestBudget:
+    def test_low_priority_deferred_before_critical(self):
+        clock = FakeClock()
+        budget = RequestBudget(weight_limit=100, window_seconds=60, clock=clock, sleep=clock.sleep)
+        budget.acquire(60, 'normal')
+
+        # Las órdenes siguen pasando sin esperar
+        assert budget.acquire(30, 'critical') == 0
+
+        # El escáner espera a que caduque la ventana
+        waited = budget.acquire(10, 'low')
+        assert waited == pytest.approx(60)
+        assert budget.deferrals['low'] == 1
+        assert budget.used_weight() == 10
+
+    def test_server_weight_overrides_local_estimate(self):
+        clock = FakeClock()
+        budget = RequestBudget(weight_limit=100, clock=clock, sleep=clock.sleep)
+        budget.acquire(5)
+        budget.observe_server_weight(70)
+        assert budget.used_weight() == 70
+
+        assert budget.acquire(5, 'low') > 0
+        assert budget.stats()['deferrals']['low'] == 1
+
+    def test_try_acquire_never_sleeps(self):
+        clock = FakeClock()
+        slept = []
+        budget = RequestBudget(weight_limit=100, window_seconds=60, clock=clock, sleep=slept.append)
+        budget.acquire(60, 'normal')
+
+        assert budget.try_acquire(10, 'low') is False
+        assert budget.retry_after(10, 'low') == pytest.approx(60)
+        assert budget.deferrals['low'] == 1
+        assert slept == []
+        assert budget.try_acquire(10, 'critical') is True
+        assert budget.used_weight() == 70
+
+    def test_first_request_never_blocks(self):
+        clock = FakeClock()
+        budget = RequestBudget(weight_limit=10, clock=clock, sleep=clock.sleep)
+        assert budget.acquire(50, 'low') == 0
+
+
+class TestInstrumentedExchange:
+    def test_records_calls_and_passes_attributes_through(self):
+        exchange = InstrumentedExchange(FakeExchange())
+        exchange.fetch_ohlcv('BTC/USDT', '4h', limit=3)
+        assert exchange.markets == {'BTC/USDT': {}}
+        assert exchange.amount_to_precision('BTC/USDT', 1) == '1'
+
+        snapshot = exchange.metrics.snapshot()
+        assert list(snapshot['endpoints']) == ['fetch_ohlcv']
+        assert snapshot['total_weight'] == 1
+
+    def test_errors_are_counted_and_reraised(self):
+        fake = FakeExchange()
+        fake.fail_next = True
+        exchange = InstrumentedExchange(fake)
+        with pytest.raises(RuntimeError):
+            exchange.fetch_balance()
+        exchange.fetch_balance()
+        endpoint = exchange.metrics.snapshot()['endpoints']['fetch_balance']
+        assert endpoint['calls'] == 2
+        assert endpoint['error_rate'] == 50
+
+    def test_priorities_reach_the_budget(self):
+        clock = FakeClock()
+        budget = RequestBudget(weight_limit=100, clock=clock, sleep=clock.sleep)
+        exchange = InstrumentedExchange(FakeExchange(), budget=budget)
+        calls = []
+        original_acquire, original_try = budget.acquire, budget.try_acquire
+        budget.acquire = lambda weight, priority='normal': calls.append(priority) or original_acquire(weight, priority)
+        budget.try_acquire = lambda weight, priority='low': calls.append(priority) or original_try(weight, priority)
+
+        exchange.fetch_ohlcv('BTC/USDT', '4h', limit=3)
+        with exchange.priority('low'):
+            exchange.fetch_ohlcv('BTC/USDT', '4h', limit=3)
+            exchange.create_market_order('BTC/USDT', 'buy', 1)
+        exchange.with_priority('low').fetch_ohlcv('BTC/USDT', '4h', limit=3)
+
+        assert calls == ['normal', 'low', 'critical', 'low']
+
+    def test_low_priority_request_deferred_without_blocking(self):
+        clock = FakeClock()
+        slept = []
+        budget = RequestBudget(weight_limit=10, clock=clock, sleep=slept.append)
+        exchange = InstrumentedExchange(FakeExchange(), budget=budget)
+        budget.acquire(5, 'normal')
+        exchange.fetch_ohlcv('BTC/USDT', '4h', limit=3)
+
+        with pytest.raises(BudgetDeferred) as deferred:
+            exchange.with_priority('low').fetch_ohlcv('BTC/USDT', '4h', limit=3)
+        assert deferred.value.retry_after == pytest.approx(60)
+        assert slept == []
+        assert 'fetch_ohlcv' in exchange.metrics.snapshot()['endpoints']
+
+    def test_priority_is_per_thread(self):
+        exchange = InstrumentedExchange(FakeExchange())
+        seen = []
+        with exchange.priority('low'):
+            thread = threading.Thread(target=lambda: seen.append(exchange.current_priority()))
+            thread.start()
+            thread.join()
+            assert exchange.current_priority() == 'low'
+        assert seen == ['normal']
+        assert exchange.current_priority() == 'normal'
+
+    def test_reads_used_weight_header(self):
+        clock = FakeClock()
+        budget = RequestBudget(clock=clock, sleep=clock.sleep)
+        exchange = InstrumentedExchange(FakeExchange(), budget=budget)
+        exchange.fetch_balance()
+        assert budget.used_weight() == 120
+
+    def test_unknown_priority_rejected(self):
+        exchange = InstrumentedExchange(FakeExchange())
+        with pytest.raises(ValueError):
+            with exchange.priority('urgent'):
+                pass
@@ -0,0 +1,201 @@
+import os
+import signal
+import sys
+import time
+from unittest.mock import patch
+
+import ccxt
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fake_exchange import FakeBinanceExchange, synthetic_candles
+
+H4 = 4 * 3600 * 1000
+
+
+def make_candles(count=10, start_price=100.0):
+    return [[i * H4, start_price + i, start_price + i + 2, start_price + i - 2, start_price + i + 1, 10.0]
+            for i in range(count)]
+
+
+@pytest.fixture
+def exchange():
+    return FakeBinanceExchange(make_candles(), warmup=5)
+
+
+class TestSyntheticCandles:
+    def test_reproducible_and_consistent(self):
+        first = synthetic_candles(200, seed=7, start=0)
+        assert first == synthetic_candles(200, seed=7, start=0)
+        assert [row[0] for row in first[:3]] == [0, H4, 2 * H4]
+        for _, open_, high, low, close, volume in first:
+            assert low <= min(open_, close) <= max(open_, close) <= high
+            assert volume > 0
+
+    def test_default_path_ends_now(self):
+        candles = synthetic_candles(10, seed=1)
+        exchange = FakeBinanceExchange(candles, warmup=10)
+        assert abs(exchange.clock() - time.time()) < 4 * 3600
+
+
+class TestMarketData:
+    def test_ohlcv_visible_up_to_cursor(self, exchange):
+        rows = exchange.fetch_ohlcv('BTC/USDT', '4h')
+        assert len(rows) == 5
+        assert rows[-1][0] == 4 * H4
+        assert exchange.milliseconds() == 5 * H4 - 1
+
+    def test_ohlcv_since_and_limit(self, exchange):
+        exchange.advance(3)
+        assert [r[0] for r in exchange.fetch_ohlcv('BTC/USDT', '4h', since=6 * H4, limit=2)] == [6 * H4, 7 * H4]
+        assert [r[0] for r in exchange.fetch_ohlcv('BTC/USDT', '4h', limit=2)] == [6 * H4, 7 * H4]
+        assert exchange.fetch_ohlcv('BTC/USDT', '4h', since=20 * H4) == []
+
+    def test_advance_until_exhausted(self, exchange):
+        assert exchange.advance(100) is True
+        assert exchange.exhausted
+        assert exchange.advance() is False
+
+    def test_ticker_uses_forming_close(self, exchange):
+        assert exchange.fetch_ticker('BTC/USDT')['last'] == 105.0
+
+    def test_unknown_symbol_and_timeframe(self, exchange):
+        with pytest.raises(ccxt.BadSymbol):
+            exchange.fetch_ticker('ETH/USDT')
+        with pytest.raises(ccxt.BadRequest):
+            exchange.fetch_ohlcv('BTC/USDT', '1h')
+
+    def test_load_markets(self, exchange):
+        markets = exchange.load_markets()
+        assert markets['BTC/USDT']['base'] == 'BTC'
+        assert set(exchange.currencies) == {'BTC', 'USDT'}
+
+
+class TestOrders:
+    def test_buy_and_sell_update_balance_with_fees(self):
+        exchange = FakeBinanceExchange(make_candles(), warmup=5, balance={'USDT': 1000}, fee_rate=0.001)
+        order = exchange.create_market_order('BTC/USDT', 'buy', 2)
+        assert order['price'] == 105.0
+        assert order['fee']['cost'] == pytest.approx(0.21)
+        assert exchange.fetch_balance()['USDT']['free'] == pytest.approx(1000 - 210.21)
+        assert exchange.fetch_positions()[0]['size'] == 2
+
+        exchange.advance()
+        exchange.create_market_order('BTC/USDT', 'sell', 2)
+        assert exchange.balances['BTC'] == 0
+        assert exchange.balances['USDT'] == pytest.approx(1000 - 210.21 + 212 - 0.212)
+        assert exchange.fetch_positions() == []
+
+    def test_slippage_and_partial_fill(self):
+        exchange = FakeBinanceExchange(make_candles(), warmup=5, slippage_pct=1.0, fill_ratio=0.5, fee_rate=0)
+        order = exchange.create_market_order('BTC/USDT', 'buy', 2)
+        assert order['price'] == pytest.approx(106.05)
+        assert order['filled'] == 1
+        assert order['status'] == 'expired'
+
+    def test_insufficient_funds(self, exchange):
+        with pytest.raises(ccxt.InsufficientFunds):
+            exchange.create_market_order('BTC/USDT', 'sell', 1)
+        with pytest.raises(ccxt.InsufficientFunds):
+            exchange.create_market_order('BTC/USDT', 'buy', 1000)
+
+
+class TestFailureInjection:
+    def test_injected_error_raised_once(self, exchange):
+        exchange.inject_error(ccxt.RateLimitExceeded('429'))
+        with pytest.raises(ccxt.RateLimitExceeded):
+            exchange.fetch_balance()
+        assert exchange.fetch_balance()['USDT']['free'] == 10000
+        assert exchange.injected_errors == 1
+
+    def test_order_rejections_are_not_counted_as_injected(self, exchange):
+        exchange.load_markets()
+        with pytest.raises(ccxt.InsufficientFunds):
+            exchange.create_market_order('BTC/USDT', 'buy', 1000)
+        assert exchange.injected_errors == 0
+
+    def test_random_errors_are_seeded(self):
+        def failures(seed):
+            exchange = FakeBinanceExchange(make_candles(), rate_limit_rate=0.3, seed=seed)
+            result = []
+            for _ in range(50):
+                try:
+                    exchange.fetch_ticker('BTC/USDT')
+                    result.append(False)
+                except ccxt.RateLimitExceeded:
+                    result.append(True)
+            return result
+
+        assert failures(3) == failures(3)
+        assert 0 < sum(failures(3)) < 50
+
+    def test_latency_uses_injected_sleep(self):
+        slept = []
+        exchange = FakeBinanceExchange(make_candles(), latency=(0.1, 0.2), seed=1, sleep=slept.append)
+        exchange.fetch_ticker('BTC/USDT')
+        exchange.fetch_balance()
+        assert len(slept) == 2
+        assert all(0.1 <= delay <= 0.2 for delay in slept)
+        assert exchange.calls == {'fetch_ticker': 1, 'fetch_balance': 1}
+
+
+@pytest.fixture
+def make_bot(tmp_path, monkeypatch):
+    """Crea bots contra un FakeBinanceExchange y los cierra al terminar el test"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('ANTHROPIC_API_KEY', raising=False)
+    # LoggingManager instala manejadores de SIGINT/SIGTERM: se restauran al terminar
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)}
+    from rsi_bot import BinanceRSIEMABot
+    bots = []
+
+    def factory(exchange):
+        bot = BinanceRSIEMABot('key', 'secret', testnet=True, exchange=exchange, clock=exchange.clock)
+        bots.append(bot)
+        return bot
+
+    yield factory
+    for bot in bots:
+        bot.shutdown()
+        for handler in bot.logger.handlers[:]:
+            bot.logger.removeHandler(handler)
+            handler.close()
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+class TestBotLoop:
+    def test_bot_runs_against_fake_exchange(self, make_bot):
+        exchange = FakeBinanceExchange.synthetic(600, seed=5, warmup=300)
+        bot = make_bot(exchange)
+        exchange.rate_limit_rate = 0.05
+        cycles = 0
+        while True:
+            bot.analyze_and_trade()
+            cycles += 1
+            if not exchange.advance():
+                break
+
+        assert cycles == 301  # vela inicial + 300 avances
+        metrics = bot.get_exchange_metrics()
+        assert metrics['endpoints']['fetch_ohlcv']['calls'] >= cycles
+        assert metrics['total_errors'] > 0
+        # Tras el arranque solo se piden las velas nuevas (sincronización incremental)
+        assert len(bot.market_analyzer.candles) == bot.market_analyzer.history_limit()
+
+    def test_summary_deferred_by_budget_is_rescheduled(self, make_bot):
+        from exchange_metrics import BudgetDeferred
+
+        exchange = FakeBinanceExchange.synthetic(400, seed=5, warmup=300)
+        bot = make_bot(exchange)
+        bot.register_scheduled_tasks()
+        bot.position_manager.invalidate_balance_cache()
+        exchange.inject_error(BudgetDeferred('fetch_balance', 30.0))
+
+        with patch.object(bot.logger, 'error') as error:
+            bot._scheduled_summary()
+
+        summary = next(task for task in bot.scheduler.tasks if task['name'] == 'summary')
+        assert summary['next_due'] <= exchange.clock() + 30.0
+        error.assert_not_called()  # El aplazamiento no es un error de balance
+        assert not bot.position_manager.balance_cached()
@@ -0,0 +1,90 @@
+import os
+import sys
+import threading
+from unittest.mock import MagicMock, patch
+
+import ccxt
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from candle_store import CandleStore
+from history_downloader import HistoryDownloader
+
+HOUR = 3600000
+
+
+class SyntheticExchange:
+    """Exchange local que sirve velas 1h sintéticas respetando since/limit"""
+
+    rateLimit = 0
+
+    def __init__(self, candles, max_limit=1000, fail_at=None):
+        self.rows = [[i * HOUR, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 1.0] for i in range(candles)]
+        self.max_limit = max_limit
+        self.fail_at = set(fail_at or [])
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        with self._lock:
+            self.calls.append(since)
+            if since in self.fail_at:
+                raise ccxt.ExchangeError("fallo simulado")
+        selected = [row[:] for row in self.rows if row[0] >= since]
+        return selected[:min(limit, self.max_limit)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CandleStore(str(tmp_path / 'candles.db'))
+    yield store
+    store.close()
+
+
+class TestHistoryDownloader:
+    def test_plan_chunks_aligned_and_covering_range(self, store):
+        downloader = HistoryDownloader(SyntheticExchange(0), store, MagicMock(), chunk_candles=10)
+        chunks = downloader.plan_chunks('1h', 0, 25 * HOUR + 123)
+        assert chunks == [(0, 9 * HOUR), (10 * HOUR, 19 * HOUR), (20 * HOUR, 25 * HOUR)]
+
+    def test_downloads_range_concurrently_into_store(self, store):
+        exchange = SyntheticExchange(100)
+        downloader = HistoryDownloader(exchange, store, MagicMock(), max_workers=4, chunk_candles=10)
+        summary = downloader.download('BTC/USDT', '1h', 0, 99 * HOUR)
+
+        assert summary == {'chunks': 10, 'skipped': 0, 'failed': 0, 'candles': 100}
+        assert store.load('BTC/USDT', '1h') == exchange.rows
+        assert store.find_gaps('BTC/USDT', '1h', 0, 99 * HOUR) == []
+
+    def test_paginates_when_exchange_limit_is_smaller_than_chunk(self, store):
+        exchange = SyntheticExchange(30, max_limit=4)
+        downloader = HistoryDownloader(exchange, store, MagicMock(), chunk_candles=10)
+        downloader.download('BTC/USDT', '1h', 0, 29 * HOUR)
+        assert store.count('BTC/USDT', '1h') == 30
+
+    def test_resumes_from_checkpoint_after_failure(self, store, tmp_path):
+        checkpoint = str(tmp_path / 'checkpoint.json')
+        failing = SyntheticExchange(50, fail_at=[20 * HOUR])
+        first = HistoryDownloader(failing, store, MagicMock(), chunk_candles=10, checkpoint_file=checkpoint)
+        summary = first.download('BTC/USDT', '1h', 0, 49 * HOUR)
+        assert summary['failed'] == 1
+        assert store.count('BTC/USDT', '1h') == 40
+
+        exchange = SyntheticExchange(50)
+        resumed = HistoryDownloader(exchange, store, MagicMock(), chunk_candles=10, checkpoint_file=checkpoint)
+        summary = resumed.download('BTC/USDT', '1h', 0, 49 * HOUR)
+        assert summary['skipped'] == 4
+        assert exchange.calls == [20 * HOUR]
+        assert store.count('BTC/USDT', '1h') == 50
+
+    def test_retries_network_errors(self, store):
+        exchange = SyntheticExchange(10)
+        rows = exchange.fetch_ohlcv('BTC/USDT', '1h', since=0, limit=10)
+        exchange.fetch_ohlcv = MagicMock(side_effect=[ccxt.NetworkError("timeout"), rows])
+        downloader = HistoryDownloader(exchange, store, MagicMock(), chunk_candles=10)
+
+        with patch('history_downloader.time.sleep'):
+            summary = downloader.download('BTC/USDT', '1h', 0, 9 * HOUR)
+
+        assert summary['candles'] == 10
+        assert exchange.fetch_ohlcv.call_count == 2
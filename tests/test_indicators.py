@@ -1,3 +1,4 @@
+import json
 import pytest
 import numpy as np
 import pandas as pd
@@ -5,7 +6,9 @@ import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from indicators import TechnicalIndicators
+from indicators import (
+    TechnicalIndicators, EMAState, RSIState, WilderRSIState, IndicatorCache, IndicatorSuiteState
+)
 
 
 @pytest.fixture
@@ -97,3 +100,361 @@ class TestEMA:
         prices = [100.0] * 20
         ema = indicators.calculate_ema(prices, period=10)
         assert abs(ema - 100.0) < 0.01
+
+
+def make_prices(n, seed=7):
+    rng = np.random.default_rng(seed)
+    return list(100 + np.cumsum(rng.normal(0, 1, n)))
+
+
+def make_gapped_prices(n, seed=7):
+    """Precios con huecos: NaN al principio, NaN sueltos y consecutivos, e infinito"""
+    prices = np.array(make_prices(n, seed))
+    prices[[0, 1, 50, 120, 121, 249]] = np.nan
+    prices[200] = np.inf
+    return prices
+
+
+class TestIndicatorState:
+    def test_ema_state_matches_calculate_ema(self, indicators):
+        prices = make_prices(60)
+        state = EMAState(10)
+        for price in prices:
+            state.update(price)
+        assert state.value == pytest.approx(indicators.calculate_ema(prices, 10), rel=1e-12)
+
+    def test_rsi_state_matches_calculate_rsi(self, indicators):
+        prices = make_prices(60)
+        state = RSIState(14)
+        for price in prices:
+            state.update(price)
+        assert state.value() == pytest.approx(indicators.calculate_rsi(prices, 14), rel=1e-9)
+
+    def test_rsi_state_returns_50_during_warmup(self):
+        state = RSIState(14)
+        for price in [100, 101, 102]:
+            state.update(price)
+        assert state.value() == 50
+
+    def test_sync_evaluates_forming_candle_like_full_recompute(self, indicators):
+        prices = make_prices(80)
+        timestamps = list(range(80))
+        state = indicators.create_state([5, 20], rsi_period=14)
+        values = state.sync(timestamps, prices)
+        assert values['ema'][5] == pytest.approx(indicators.calculate_ema(prices, 5), rel=1e-12)
+        assert values['ema'][20] == pytest.approx(indicators.calculate_ema(prices, 20), rel=1e-12)
+        assert values['rsi'] == pytest.approx(indicators.calculate_rsi(prices, 14), rel=1e-9)
+
+    def test_sync_only_processes_new_closed_candles(self, indicators):
+        prices = make_prices(81)
+        state = indicators.create_state([5], rsi_period=14)
+        state.sync(list(range(80)), prices[:80])
+        assert state.candles_processed == 79
+
+        # Mismo ciclo con la vela en formación actualizada: nada nuevo que incorporar
+        state.sync(list(range(80)), prices[:79] + [prices[79] + 1])
+        assert state.candles_processed == 79
+
+        # Cierra una vela: ventana desplazada, solo se incorpora una
+        values = state.sync(list(range(1, 81)), prices[1:81])
+        assert state.candles_processed == 80
+        assert values['ema'][5] == pytest.approx(indicators.calculate_ema(prices, 5), rel=1e-12)
+
+    def test_sync_reseeds_when_window_leaves_a_gap(self, indicators):
+        prices = make_prices(100)
+        state = indicators.create_state([5], rsi_period=14)
+        state.sync(list(range(40)), prices[:40])
+        values = state.sync(list(range(60, 100)), prices[60:])
+        assert state.last_timestamp == 98
+        assert values['ema'][5] == pytest.approx(indicators.calculate_ema(prices[60:], 5), rel=1e-12)
+
+
+class TestSeries:
+    def test_ema_series_last_value_is_calculate_ema(self, indicators):
+        prices = make_prices(120)
+        series = indicators.ema_series(prices, 21)
+        assert isinstance(series, np.ndarray)
+        assert len(series) == 120
+        assert series[-1] == indicators.calculate_ema(prices, 21)
+
+    def test_ema_series_matches_per_bar_scalar(self, indicators):
+        prices = make_prices(40)
+        series = indicators.ema_series(prices, 10)
+        for i in range(1, 41):
+            assert series[i - 1] == pytest.approx(indicators.calculate_ema(prices[:i], 10), rel=1e-12)
+
+    def test_rsi_series_last_value_is_calculate_rsi(self, indicators):
+        prices = make_prices(120)
+        series = indicators.rsi_series(prices, 14)
+        assert series[-1] == indicators.calculate_rsi(prices, 14)
+
+    def test_rsi_series_nan_during_warmup(self, indicators):
+        series = indicators.rsi_series(make_prices(30), 14)
+        assert np.isnan(series[:13]).all()
+        assert not np.isnan(series[13:]).any()
+
+    def test_rsi_series_matches_per_bar_scalar(self, indicators):
+        prices = make_prices(40)
+        series = indicators.rsi_series(prices, 14)
+        for i in range(14, 41):
+            assert series[i - 1] == pytest.approx(indicators.calculate_rsi(prices[:i], 14), rel=1e-9)
+
+    def test_series_accept_pandas_input(self, indicators):
+        prices = pd.Series(make_prices(50))
+        assert indicators.ema_series(prices, 5)[-1] == indicators.calculate_ema(list(prices), 5)
+
+
+class TestEMABank:
+    def test_bank_matches_individual_emas(self, indicators):
+        prices = make_prices(500)
+        bank = indicators.ema_bank(prices, [21, 50, 200])
+        assert bank.shape == (3, 500)
+        for row, period in enumerate([21, 50, 200]):
+            np.testing.assert_allclose(bank[row], indicators.ema_series(prices, period), rtol=1e-10)
+
+    def test_bank_writes_into_preallocated_output(self, indicators):
+        prices = make_prices(100)
+        out = np.empty((2, 100))
+        result = indicators.ema_bank(prices, [5, 10], out=out)
+        assert result is out
+        np.testing.assert_allclose(out[1], indicators.ema_series(prices, 10), rtol=1e-10)
+
+    def test_bank_handles_period_one_and_short_input(self, indicators):
+        prices = [100.0, 101.0, 99.0]
+        bank = indicators.ema_bank(prices, [1, 200])
+        np.testing.assert_allclose(bank[0], prices)
+        np.testing.assert_allclose(bank[1], indicators.ema_series(prices, 200), rtol=1e-12)
+
+    def test_bank_empty_input(self, indicators):
+        assert indicators.ema_bank([], [21, 50]).shape == (2, 0)
+
+
+class TestWilderRSI:
+    def test_wilder_series_matches_reference_recursion(self, indicators):
+        prices = make_prices(60)
+        deltas = np.diff(prices)
+        gains = np.clip(deltas, 0, None)
+        losses = np.clip(-deltas, 0, None)
+        avg_gain, avg_loss = gains[:14].mean(), losses[:14].mean()
+        for g, l in zip(gains[14:], losses[14:]):
+            avg_gain = (avg_gain * 13 + g) / 14
+            avg_loss = (avg_loss * 13 + l) / 14
+        expected = 100 - 100 / (1 + avg_gain / avg_loss)
+        assert indicators.calculate_rsi(prices, 14, method='wilder') == pytest.approx(expected, rel=1e-10)
+
+    def test_wilder_series_nan_until_period_deltas(self, indicators):
+        series = indicators.rsi_series(make_prices(30), 14, method='wilder')
+        assert np.isnan(series[:14]).all()
+        assert not np.isnan(series[14:]).any()
+
+    def test_wilder_state_matches_series(self, indicators):
+        prices = make_prices(80)
+        series = indicators.rsi_series(prices, 14, method='wilder')
+        state = WilderRSIState(14)
+        for i, price in enumerate(prices):
+            assert state.peek(price) == pytest.approx(series[i] if i >= 14 else 50, rel=1e-10)
+            state.update(price)
+
+    def test_wilder_state_reports_warmup(self):
+        state = WilderRSIState(14)
+        state.update(100)
+        assert not state.is_warm
+        assert state.warmup_remaining == 14
+        for i in range(14):
+            state.update(101 + i)
+        assert state.is_warm
+        assert state.warmup_remaining == 0
+        assert state.value() == 100.0
+
+    def test_create_state_with_wilder_method(self, indicators):
+        prices = make_prices(100)
+        state = indicators.create_state([21], rsi_period=14, rsi_method='wilder')
+        values = state.sync(list(range(100)), prices)
+        assert state.is_warm
+        assert values['rsi'] == pytest.approx(indicators.calculate_rsi(prices, 14, method='wilder'), rel=1e-10)
+
+    def test_unknown_method_rejected(self, indicators):
+        with pytest.raises(ValueError):
+            indicators.create_state([21], rsi_method='ema')
+        assert indicators.calculate_rsi(make_prices(30), method='ema') == 50
+
+
+class TestIndicatorCache:
+    def test_counts_hits_and_misses(self):
+        cache = IndicatorCache(maxsize=4)
+        assert cache.get('a') is None
+        cache.put('a', 1)
+        assert cache.get('a') == 1
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 50.0
+
+    def test_evicts_least_recently_used(self):
+        cache = IndicatorCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert len(cache) == 2
+        assert cache.stats()['evictions'] == 1
+
+
+class TestNumpyEngine:
+    @pytest.fixture
+    def numpy_indicators(self):
+        return TechnicalIndicators(engine='numpy')
+
+    def test_unknown_engine_rejected(self):
+        with pytest.raises(ValueError):
+            TechnicalIndicators(engine='polars')
+
+    def test_ema_matches_pandas_engine(self, indicators, numpy_indicators):
+        prices = make_prices(300)
+        np.testing.assert_allclose(numpy_indicators.ema_series(prices, 21),
+                                   indicators.ema_series(prices, 21), rtol=1e-10)
+
+    @pytest.mark.parametrize('method', ['sma', 'wilder'])
+    def test_rsi_matches_pandas_engine(self, indicators, numpy_indicators, method):
+        prices = make_prices(300)
+        np.testing.assert_allclose(numpy_indicators.rsi_series(prices, 14, method),
+                                   indicators.rsi_series(prices, 14, method), rtol=1e-10)
+
+    def test_ema_skips_non_finite_prices_like_pandas(self, indicators, numpy_indicators):
+        prices = make_gapped_prices(300)
+        expected = pd.Series(np.where(np.isfinite(prices), prices, np.nan)).ewm(
+            span=21, adjust=False, ignore_na=True).mean().to_numpy()
+        assert np.isnan(expected[:2]).all() and not np.isnan(expected[2:]).any()
+        for engine in (indicators, numpy_indicators):
+            np.testing.assert_allclose(engine.ema_series(prices, 21), expected, rtol=1e-10, equal_nan=True)
+        np.testing.assert_allclose(numpy_indicators.ema_bank(prices, [21, 50])[0], expected, rtol=1e-10,
+                                   equal_nan=True)
+
+    @pytest.mark.parametrize('method', ['sma', 'wilder'])
+    def test_rsi_skips_non_finite_prices_like_pandas(self, indicators, numpy_indicators, method):
+        prices = make_gapped_prices(300)
+        valid = pd.Series(prices)[np.isfinite(prices)]
+        delta = valid.diff().fillna(0)
+        gain, loss = delta.clip(lower=0), (-delta).clip(lower=0)
+        if method == 'sma':
+            avg_gain, avg_loss = gain.rolling(14).mean().to_numpy(), loss.rolling(14).mean().to_numpy()
+        else:
+            def rma(values):
+                out = np.full(len(values), np.nan)
+                out[14] = values[1:15].mean()
+                for i in range(15, len(values)):
+                    out[i] = (out[i - 1] * 13 + values[i]) / 14
+                return out
+            avg_gain, avg_loss = rma(gain.to_numpy()), rma(loss.to_numpy())
+        rsi = pd.Series(100 - 100 / (1 + avg_gain / avg_loss), index=valid.index)
+        expected = rsi.reindex(range(len(prices)), method='ffill').to_numpy()
+        for engine in (indicators, numpy_indicators):
+            np.testing.assert_allclose(engine.rsi_series(prices, 14, method), expected, rtol=1e-10, equal_nan=True)
+
+    @pytest.mark.parametrize('method', ['sma', 'wilder'])
+    def test_state_skips_non_finite_prices(self, numpy_indicators, method):
+        prices = make_gapped_prices(300)
+        ema = numpy_indicators.ema_series(prices, 21)
+        rsi = numpy_indicators.rsi_series(prices, 14, method)
+
+        updated = numpy_indicators.create_state([21], 14, method)
+        for i, price in enumerate(prices):
+            if i > 40:
+                values = updated.snapshot(price)
+                assert values['ema'][21] == pytest.approx(ema[i], rel=1e-10)
+                assert values['rsi'] == pytest.approx(rsi[i], rel=1e-10)
+            updated.update(i, price)
+        assert updated.emas[21].value == pytest.approx(ema[-1], rel=1e-10)
+
+        seeded = numpy_indicators.create_state([21], 14, method)
+        seeded.seed(list(range(250)), prices[:250])
+        assert seeded.emas[21].value == pytest.approx(ema[249], rel=1e-10)
+        assert seeded.rsi.value() == pytest.approx(rsi[249], rel=1e-10)
+
+    def test_scalar_fallbacks_preserved(self, numpy_indicators):
+        assert numpy_indicators.calculate_ema([], 3) == 0
+        assert numpy_indicators.calculate_rsi([100, 101, 102]) == 50
+
+
+def make_ohlc(n, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    high = close + rng.uniform(0.1, 1.5, n)
+    low = close - rng.uniform(0.1, 1.5, n)
+    return high, low, close
+
+
+class TestIndicatorSuite:
+    def test_atr_matches_reference(self, indicators):
+        high, low, close = make_ohlc(60)
+        tr = [max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1])) for i in range(1, 60)]
+        atr = sum(tr[:14]) / 14
+        for value in tr[14:]:
+            atr = (atr * 13 + value) / 14
+        suite = indicators.indicator_suite(high, low, close)
+        assert suite['atr'][-1] == pytest.approx(atr, rel=1e-10)
+        assert np.isnan(suite['atr'][13])
+        assert not np.isnan(suite['atr'][14])
+
+    def test_macd_uses_ema_difference(self, indicators):
+        high, low, close = make_ohlc(100)
+        suite = indicators.indicator_suite(high, low, close)
+        macd = indicators.ema_series(close, 12) - indicators.ema_series(close, 26)
+        np.testing.assert_allclose(suite['macd'], macd, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(suite['macd_signal'], indicators.ema_series(macd, 9), rtol=1e-9, atol=1e-9)
+
+    def test_bollinger_width(self, indicators):
+        high, low, close = make_ohlc(40)
+        suite = indicators.indicator_suite(high, low, close)
+        window = close[-20:]
+        assert suite['bb_width'][-1] == pytest.approx(4 * window.std() / window.mean() * 100)
+
+    def test_adx_warmup_and_range(self, indicators):
+        high, low, close = make_ohlc(100)
+        adx = indicators.indicator_suite(high, low, close)['adx']
+        assert np.isnan(adx[:27]).all()
+        assert ((adx[27:] >= 0) & (adx[27:] <= 100)).all()
+
+    def test_incremental_state_matches_vectorized(self, indicators):
+        high, low, close = make_ohlc(120)
+        suite = indicators.indicator_suite(high, low, close)
+        state = IndicatorSuiteState()
+        for i in range(120):
+            values = state.peek(high[i], low[i], close[i])
+            for key in ('atr', 'bb_width', 'macd', 'macd_signal', 'adx', 'plus_di'):
+                expected = suite[key][i]
+                if np.isnan(expected):
+                    assert values[key] is None
+                else:
+                    assert values[key] == pytest.approx(expected, rel=1e-9, abs=1e-9)
+            state.update(high[i], low[i], close[i])
+
+    def test_indicator_state_requires_high_low_for_suite(self, indicators):
+        state = indicators.create_state([21], suite_params={})
+        with pytest.raises(ValueError):
+            state.sync([0, 1], [100.0, 101.0])
+
+
+class TestStatePersistence:
+    @pytest.mark.parametrize('method', ['sma', 'wilder'])
+    def test_json_round_trip_continues_identically(self, indicators, method):
+        high, low, close = make_ohlc(260)
+        timestamps = np.arange(260, dtype=np.int64)
+        original = indicators.create_state([21, 50, 200], rsi_method=method, suite_params={})
+        original.sync(timestamps[:200], close[:200], high[:200], low[:200])
+
+        restored = indicators.create_state([21, 50, 200], rsi_method=method, suite_params={})
+        assert restored.restore(json.loads(json.dumps(original.to_dict()))) is True
+        assert restored.last_timestamp == original.last_timestamp
+
+        expected = original.sync(timestamps[150:], close[150:], high[150:], low[150:])
+        assert restored.sync(timestamps[150:], close[150:], high[150:], low[150:]) == expected
+
+    def test_restore_rejects_different_parameters(self, indicators):
+        state = indicators.create_state([21, 50])
+        state.sync([0, 1, 2], [100.0, 101.0, 102.0])
+        other = indicators.create_state([21, 100])
+        assert other.restore(state.to_dict()) is False
+        assert other.last_timestamp is None
@@ -1,10 +1,12 @@
+import json
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from market_analyzer import MarketAnalyzer
+from indicators import TechnicalIndicators
 
 
 @pytest.fixture
@@ -106,3 +108,221 @@ class TestPullbackToEMA:
         )
         assert is_pullback is True
         assert pullback_type == 'EMA21'  # EMA21 check comes first
+
+
+def make_ohlcv(n, start=0):
+    return [[(start + i) * 14400000, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10.0] for i in range(n)]
+
+
+@pytest.fixture
+def live_analyzer():
+    cfg = MagicMock()
+    cfg.symbol = 'BTC/USDT'
+    cfg.timeframe = '4h'
+    cfg.rsi_period = 14
+    cfg.rsi_smoothing = 'sma'
+    cfg.incremental_sync = True
+    cfg.ema_fast_period = 21
+    cfg.ema_slow_period = 50
+    cfg.ema_trend_period = 200
+    cfg.ema_separation_min = 0.1
+    cfg.atr_period = 14
+    cfg.bb_period = 20
+    cfg.bb_std = 2.0
+    cfg.macd_fast_period = 12
+    cfg.macd_slow_period = 26
+    cfg.macd_signal_period = 9
+    cfg.adx_period = 14
+    return MarketAnalyzer(exchange=MagicMock(), config=cfg, indicators=TechnicalIndicators(), logger=MagicMock())
+
+
+class TestGetMarketData:
+    def test_indicators_match_full_recompute(self, live_analyzer):
+        ohlcv = make_ohlcv(250)
+        live_analyzer.exchange.fetch_ohlcv.return_value = ohlcv
+        data = live_analyzer.get_market_data()
+
+        closes = [c[4] for c in ohlcv]
+        indicators = TechnicalIndicators()
+        assert data['ema_fast'] == pytest.approx(indicators.calculate_ema(closes, 21))
+        assert data['ema_trend'] == pytest.approx(indicators.calculate_ema(closes, 200))
+        assert data['rsi'] == pytest.approx(indicators.calculate_rsi(closes, 14))
+
+    def test_new_candle_updates_state_incrementally(self, live_analyzer):
+        live_analyzer.exchange.fetch_ohlcv.return_value = make_ohlcv(250)
+        live_analyzer.get_market_data()
+        assert live_analyzer.indicator_state.candles_processed == 249
+
+        live_analyzer.exchange.fetch_ohlcv.return_value = make_ohlcv(250, start=1)
+        live_analyzer.get_market_data()
+        assert live_analyzer.indicator_state.candles_processed == 250
+
+    def test_wilder_smoothing_selected_from_config(self, live_analyzer):
+        live_analyzer.config.rsi_smoothing = 'wilder'
+        ohlcv = make_ohlcv(250)
+        live_analyzer.exchange.fetch_ohlcv.return_value = ohlcv
+        data = live_analyzer.get_market_data()
+
+        closes = [c[4] for c in ohlcv]
+        assert live_analyzer.indicator_state.rsi_method == 'wilder'
+        assert data['rsi'] == pytest.approx(TechnicalIndicators().calculate_rsi(closes, 14, method='wilder'))
+        assert data['indicators_warm'] is True
+
+    def test_polls_within_same_candle_hit_cache(self, live_analyzer):
+        base = make_ohlcv(250)
+        for tick in range(8):
+            ohlcv = [row[:] for row in base]
+            ohlcv[-1][4] += tick  # solo cambia la vela en formación
+            live_analyzer.exchange.fetch_ohlcv.return_value = ohlcv
+            data = live_analyzer.get_market_data()
+
+        closes = [c[4] for c in ohlcv]
+        stats = live_analyzer.indicator_cache_stats()
+        assert stats['misses'] == 5  # 3 EMAs + RSI + suite OHLC en la primera lectura
+        assert stats['hits'] == 7 * 5
+        assert data['ema_fast'] == pytest.approx(TechnicalIndicators().calculate_ema(closes, 21))
+        assert data['rsi'] == pytest.approx(TechnicalIndicators().calculate_rsi(closes, 14))
+
+    def test_market_data_includes_volatility_suite(self, live_analyzer):
+        ohlcv = make_ohlcv(250)
+        live_analyzer.exchange.fetch_ohlcv.return_value = ohlcv
+        data = live_analyzer.get_market_data()
+
+        suite = TechnicalIndicators().indicator_suite(
+            [c[2] for c in ohlcv], [c[3] for c in ohlcv], [c[4] for c in ohlcv]
+        )
+        for key in ('atr', 'bb_width', 'macd', 'macd_signal', 'macd_hist', 'adx'):
+            assert data[key] == pytest.approx(suite[key][-1], rel=1e-9)
+
+    def test_higher_timeframes_built_without_extra_requests(self, live_analyzer):
+        live_analyzer.config.higher_timeframes = ['1d']
+        live_analyzer.exchange.fetch_ohlcv.return_value = make_ohlcv(250)
+        data = live_analyzer.get_market_data()
+
+        assert live_analyzer.exchange.fetch_ohlcv.call_count == 1
+        daily = data['htf']['1d']
+        assert len(daily['candles']) == 42
+        assert daily['price'] == data['price']
+        assert daily['trend_direction'] in ('bullish', 'weak_bullish', 'neutral')
+
+    def test_restored_state_fetches_only_missed_candles(self, live_analyzer):
+        live_analyzer.exchange.fetch_ohlcv.return_value = make_ohlcv(250)
+        live_analyzer.get_market_data()
+        saved = json.loads(json.dumps(live_analyzer.export_indicator_state()))
+
+        restarted = MarketAnalyzer(exchange=MagicMock(), config=live_analyzer.config,
+                                   indicators=TechnicalIndicators(), logger=MagicMock())
+        assert restarted.restore_indicator_state(saved) is True
+        restarted.exchange.fetch_ohlcv.return_value = make_ohlcv(252)[248:]
+        with patch('market_analyzer.time.time', return_value=252 * 14400):
+            data = restarted.get_market_data()
+
+        assert restarted.exchange.fetch_ohlcv.call_args.kwargs['since'] == 248 * 14400000
+        assert restarted.indicator_state.candles_processed == 251
+
+        closes = [c[4] for c in make_ohlcv(252)]
+        assert data['ema_fast'] == pytest.approx(TechnicalIndicators().calculate_ema(closes, 21))
+
+    def test_restore_ignores_state_from_other_symbol(self, live_analyzer):
+        live_analyzer.exchange.fetch_ohlcv.return_value = make_ohlcv(250)
+        live_analyzer.get_market_data()
+        saved = live_analyzer.export_indicator_state()
+        saved['symbol'] = 'ETH/USDT'
+        assert live_analyzer.restore_indicator_state(saved) is False
+
+    def test_incremental_sync_fetches_since_last_candle(self, live_analyzer):
+        history = make_ohlcv(252)
+        live_analyzer.exchange.fetch_ohlcv.return_value = history[:250]
+        with patch('market_analyzer.time.time', return_value=249.5 * 14400):
+            live_analyzer.get_market_data()
+
+        # La vela en formación cerró y abrió otra: solo se piden esas dos
+        tail = [row[:] for row in history[249:251]]
+        live_analyzer.exchange.fetch_ohlcv.return_value = tail
+        with patch('market_analyzer.time.time', return_value=250.5 * 14400):
+            data = live_analyzer.get_market_data()
+
+        kwargs = live_analyzer.exchange.fetch_ohlcv.call_args.kwargs
+        assert kwargs['since'] == 249 * 14400000
+        assert kwargs['limit'] == 3
+        assert len(live_analyzer.candles) == 250
+        assert live_analyzer.candles.last_timestamp == 250 * 14400000
+
+        closes = [c[4] for c in history[:251]]
+        assert data['ema_fast'] == pytest.approx(TechnicalIndicators().calculate_ema(closes[-250:], 21))
+        assert data['rsi'] == pytest.approx(TechnicalIndicators().calculate_rsi(closes[-250:], 14))
+
+    def test_incremental_sync_replaces_forming_bar(self, live_analyzer):
+        live_analyzer.exchange.fetch_ohlcv.return_value = make_ohlcv(250)
+        with patch('market_analyzer.time.time', return_value=249.2 * 14400):
+            live_analyzer.get_market_data()
+            forming = make_ohlcv(250)[-1]
+            forming[4] += 3.0
+            live_analyzer.exchange.fetch_ohlcv.return_value = [forming]
+            data = live_analyzer.get_market_data()
+
+        assert len(live_analyzer.candles) == 250
+        assert data['price'] == forming[4]
+
+    def test_full_refetch_when_incremental_sync_disabled(self, live_analyzer):
+        live_analyzer.config.incremental_sync = False
+        live_analyzer.exchange.fetch_ohlcv.return_value = make_ohlcv(250)
+        with patch('market_analyzer.time.time', return_value=249.5 * 14400):
+            live_analyzer.get_market_data()
+            live_analyzer.get_market_data()
+
+        kwargs = live_analyzer.exchange.fetch_ohlcv.call_args.kwargs
+        assert kwargs['since'] is None
+        assert kwargs['limit'] == 250
+
+    def test_gap_larger_than_window_refetches_full_history(self, live_analyzer):
+        live_analyzer.exchange.fetch_ohlcv.return_value = make_ohlcv(250)
+        with patch('market_analyzer.time.time', return_value=249.5 * 14400):
+            live_analyzer.get_market_data()
+        live_analyzer.exchange.fetch_ohlcv.return_value = make_ohlcv(250, start=1000)
+        with patch('market_analyzer.time.time', return_value=1249.5 * 14400):
+            live_analyzer.get_market_data()
+
+        assert live_analyzer.exchange.fetch_ohlcv.call_args.kwargs['since'] is None
+        assert live_analyzer.candles.timestamps[0] == 1000 * 14400000
+
+    def test_startup_loads_history_from_store(self, live_analyzer, tmp_path):
+        from candle_store import CandleStore
+        store = CandleStore(str(tmp_path / 'candles.db'))
+        history = make_ohlcv(252)
+        store.upsert('BTC/USDT', '4h', history[:250])
+        live_analyzer.store = store
+        live_analyzer.exchange.fetch_ohlcv.return_value = history[249:251]
+
+        with patch('market_analyzer.time.time', return_value=250.5 * 14400):
+            data = live_analyzer.get_market_data()
+
+        # Sin historial por red: solo desde la última vela almacenada
+        assert live_analyzer.exchange.fetch_ohlcv.call_count == 1
+        assert live_analyzer.exchange.fetch_ohlcv.call_args.kwargs['since'] == 249 * 14400000
+        assert store.last_timestamp('BTC/USDT', '4h') == 250 * 14400000
+        closes = [c[4] for c in history[1:251]]
+        assert data['rsi'] == pytest.approx(TechnicalIndicators().calculate_rsi(closes, 14))
+
+    def test_stream_events_update_without_fetching(self, live_analyzer):
+        from market_stream import ReplayStream, ticker_event
+        history = make_ohlcv(260)
+        live_analyzer.exchange.fetch_ohlcv.return_value = history[:250]
+        live_analyzer.get_market_data()
+
+        data = None
+        for event in ReplayStream(history[250:], 'BTC/USDT', '4h', ticks_per_candle=2).events():
+            data = live_analyzer.apply_stream_event(event)
+
+        assert live_analyzer.exchange.fetch_ohlcv.call_count == 1
+        closes = [c[4] for c in history[10:]]
+        assert data['ema_fast'] == pytest.approx(TechnicalIndicators().calculate_ema(closes, 21))
+        assert data['rsi'] == pytest.approx(TechnicalIndicators().calculate_rsi(closes, 14))
+
+        data = live_analyzer.apply_stream_event(ticker_event('BTC/USDT', 500.0, history[-1][0] + 1000))
+        assert data['price'] == 500.0
+        assert live_analyzer.candles.high[-1] == 500.0
+
+    def test_stream_event_ignored_before_history_loaded(self, live_analyzer):
+        from market_stream import ticker_event
+        assert live_analyzer.apply_stream_event(ticker_event('BTC/USDT', 100.0, 0)) is None
@@ -0,0 +1,135 @@
+import json
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from market_cache import MarketMetadataCache
+
+MARKETS = {'BTC/USDT': {'id': 'BTCUSDT', 'symbol': 'BTC/USDT', 'spot': True}}
+CURRENCIES = {'BTC': {'id': 'BTC', 'code': 'BTC'}}
+
+
+class FakeExchange:
+    def __init__(self):
+        self.markets = None
+        self.currencies = None
+        self.downloads = 0
+
+    def load_markets(self, reload=False):
+        self.downloads += 1
+        self.set_markets(MARKETS, CURRENCIES)
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = markets
+        self.currencies = currencies
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return MarketMetadataCache(str(tmp_path / 'markets_cache.json'), ttl=3600, logger=MagicMock())
+
+
+class TestMarketMetadataCache:
+    def test_first_start_downloads_and_persists(self, cache):
+        exchange = FakeExchange()
+        assert cache.prime(exchange, exchange.load_markets) is False
+        assert exchange.downloads == 1
+        assert cache.read()['markets'] == MARKETS
+
+    def test_restart_uses_disk_without_network(self, cache):
+        cache.write(MARKETS, CURRENCIES)
+        exchange = FakeExchange()
+        assert cache.prime(exchange, exchange.load_markets) is True
+        assert exchange.downloads == 0
+        assert exchange.markets == MARKETS
+        assert cache.refresh_thread is None
+
+    def test_stale_cache_refreshes_in_background(self, cache):
+        cache.write({'OLD/USDT': {'id': 'OLDUSDT', 'symbol': 'OLD/USDT'}}, {})
+        data = json.load(open(cache.path))
+        data['saved_at'] = time.time() - 7200
+        json.dump(data, open(cache.path, 'w'))
+
+        exchange = FakeExchange()
+        release = threading.Event()
+
+        def blocked_loader():
+            release.wait(5)
+            return exchange.load_markets(True)
+
+        assert cache.prime(exchange, blocked_loader) is True
+        # Disponibles de inmediato mientras la descarga sigue bloqueada en el hilo de fondo
+        assert 'OLD/USDT' in exchange.markets
+        assert exchange.downloads == 0
+        assert cache.refresh_thread.is_alive()
+
+        release.set()
+        cache.refresh_thread.join(timeout=5)
+        assert exchange.downloads == 1
+        assert exchange.markets == MARKETS
+        assert cache.read()['markets'] == MARKETS
+        assert not cache.is_stale(cache.read())
+
+    def test_tampered_cache_is_ignored(self, cache):
+        cache.write(MARKETS, CURRENCIES)
+        data = json.load(open(cache.path))
+        data['markets']['BTC/USDT']['symbol'] = 'ETH/USDT'
+        json.dump(data, open(cache.path, 'w'))
+
+        assert cache.read() is None
+        exchange = FakeExchange()
+        assert cache.prime(exchange, exchange.load_markets) is False
+        assert exchange.downloads == 1
+
+    def test_corrupt_file_is_ignored(self, cache):
+        with open(cache.path, 'w') as f:
+            f.write('{no es json')
+        assert cache.read() is None
+
+    def test_warm_start_syncs_clock_when_adjusting_time(self, cache):
+        cache.write(MARKETS, CURRENCIES)
+        exchange = FakeExchange()
+        exchange.options = {'adjustForTimeDifference': True}
+        sync = MagicMock()
+
+        assert cache.prime(exchange, exchange.load_markets, load_time_difference=sync) is True
+        sync.assert_called_once_with()
+        assert exchange.downloads == 0
+
+    def test_warm_start_skips_clock_sync_when_not_adjusting(self, cache):
+        cache.write(MARKETS, CURRENCIES)
+        exchange = FakeExchange()
+        exchange.options = {'adjustForTimeDifference': False}
+        sync = MagicMock()
+
+        cache.prime(exchange, exchange.load_markets, load_time_difference=sync)
+        sync.assert_not_called()
+
+    def test_clock_sync_failure_does_not_block_start(self, cache):
+        cache.write(MARKETS, CURRENCIES)
+        exchange = FakeExchange()
+        exchange.options = {'adjustForTimeDifference': True}
+
+        assert cache.prime(exchange, exchange.load_markets,
+                           load_time_difference=MagicMock(side_effect=RuntimeError('timeout'))) is True
+        assert exchange.markets == MARKETS
+
+    def test_cache_file_is_per_environment(self, tmp_path, monkeypatch):
+        from config import BotConfig
+
+        monkeypatch.chdir(tmp_path)
+        testnet, mainnet = BotConfig(testnet=True), BotConfig(testnet=False)
+        assert testnet.markets_cache_file != mainnet.markets_cache_file
+
+        testnet_exchange, mainnet_exchange = FakeExchange(), FakeExchange()
+        MarketMetadataCache(testnet.markets_cache_file, 3600, MagicMock()).prime(
+            testnet_exchange, testnet_exchange.load_markets)
+        assert MarketMetadataCache(mainnet.markets_cache_file, 3600, MagicMock()).prime(
+            mainnet_exchange, mainnet_exchange.load_markets) is False  # La caché de testnet no sirve para mainnet
+        assert (testnet_exchange.downloads, mainnet_exchange.downloads) == (1, 1)
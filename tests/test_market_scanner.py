@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from exchange_metrics import BudgetDeferred
+from market_scanner import MarketScanner
+
+HOUR4 = 14400000
+
+
+def make_config(**overrides):
+    cfg = SimpleNamespace(
+        symbol='BTC/USDT', timeframe='4h', scan_symbols=[], higher_timeframes=[], incremental_sync=True,
+        rsi_period=14, rsi_smoothing='sma', rsi_oversold=40, rsi_overbought=65,
+        rsi_neutral_low=45, rsi_neutral_high=55, rsi_trend_continuation_max=68,
+        trend_continuation_ema_sep=0.3, pullback_ema_touch=True, ema_touch_threshold=0.5,
+        swing_confirmation_threshold=0.5, max_swing_wait=8,
+        ema_fast_period=21, ema_slow_period=50, ema_trend_period=200, ema_separation_min=0.1,
+        indicator_cache_size=64, indicator_engine='numpy',
+        atr_period=14, bb_period=20, bb_std=2.0, macd_fast_period=12, macd_slow_period=26,
+        macd_signal_period=9, adx_period=14
+    )
+    for key, value in overrides.items():
+        setattr(cfg, key, value)
+    return cfg
+
+
+class SlowExchange:
+    """Sirve velas 4h por símbolo con una latencia fija por petición"""
+
+    def __init__(self, series, latency=0.05):
+        self.series = series
+        self.latency = latency
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        time.sleep(self.latency)
+        return [row[:] for row in self.series[symbol][-limit:]]
+
+
+def trending(n, step):
+    return [[i * HOUR4, 100 + i * step, 101 + i * step, 99 + i * step, 100 + i * step + step / 2, 5.0]
+            for i in range(n)]
+
+
+def falling_then_dip(n):
+    rows = trending(n - 1, 0.5)
+    last = rows[-1][4]
+    rows.append([(n - 1) * HOUR4, last, last, last - 40, last - 40, 5.0])
+    return rows
+
+
+class TestMarketScanner:
+    def test_scans_symbols_concurrently(self):
+        symbols = [f"C{i}/USDT" for i in range(20)]
+        exchange = SlowExchange({symbol: trending(250, 0.5) for symbol in symbols}, latency=0.1)
+        scanner = MarketScanner(exchange, make_config(), MagicMock(), symbols=symbols, max_workers=20)
+
+        start = time.monotonic()
+        results = scanner.scan()
+        elapsed = time.monotonic() - start
+        scanner.close()
+
+        assert [r['symbol'] for r in results] == symbols
+        assert elapsed < 20 * 0.1 / 4  # muy por debajo de la suma secuencial
+        assert all(r['trend_direction'] in ('bullish', 'weak_bullish') for r in results)
+
+    def test_signal_state_is_per_symbol(self):
+        series = {'DIP/USDT': falling_then_dip(250), 'UP/USDT': trending(250, 0.5)}
+        scanner = MarketScanner(SlowExchange(series, latency=0), make_config(), MagicMock(),
+                                symbols=list(series))
+        results = {r['symbol']: r for r in scanner.scan()}
+        scanner.close()
+
+        assert results['DIP/USDT']['new_signal'] is True
+        assert results['DIP/USDT']['pending'] == 'long'
+        assert scanner.detectors['DIP/USDT'].pending_long_signal is True
+        assert scanner.detectors['UP/USDT'].pending_long_signal is False
+        assert scanner.performance_metrics['DIP/USDT']['signals_detected'] == 1
+        assert scanner.analyzers['UP/USDT'].config.symbol == 'UP/USDT'
+
+    def test_symbols_use_the_injected_clock(self):
+        series = {'DIP/USDT': falling_then_dip(250)}
+        now = 249 * HOUR4 / 1000 + 60  # Un minuto después de abrir la última vela
+        scanner = MarketScanner(SlowExchange(series, latency=0), make_config(), MagicMock(),
+                                symbols=list(series), clock=lambda: now)
+        scanner.scan()
+        scanner.close()
+
+        assert scanner.analyzers['DIP/USDT'].clock() == now
+        detector = scanner.detectors['DIP/USDT']
+        assert detector.signal_trigger_time.timestamp() == now
+
+    def test_failed_symbol_is_skipped(self):
+        series = {'OK/USDT': trending(250, 0.5)}
+        exchange = SlowExchange(series, latency=0)
+        logger = MagicMock()
+        scanner = MarketScanner(exchange, make_config(), logger, symbols=['OK/USDT', 'BAD/USDT'])
+        results = scanner.scan()
+        scanner.close()
+        assert [r['symbol'] for r in results] == ['OK/USDT']
+
+    def test_budget_deferred_symbols_report_retry_after(self):
+        series = {'OK/USDT': trending(250, 0.5), 'LOW/USDT': trending(250, 0.5)}
+        exchange = SlowExchange(series, latency=0)
+        fetch = exchange.fetch_ohlcv
+
+        def fetch_ohlcv(symbol, timeframe, since=None, limit=None):
+            if symbol == 'LOW/USDT':
+                raise BudgetDeferred('fetch_ohlcv', 42.0)
+            return fetch(symbol, timeframe, since, limit)
+
+        exchange.fetch_ohlcv = fetch_ohlcv
+        scanner = MarketScanner(exchange, make_config(), MagicMock(), symbols=['OK/USDT', 'LOW/USDT'])
+        results = scanner.scan()
+        scanner.close()
+        assert [r['symbol'] for r in results] == ['OK/USDT']
+        assert scanner.retry_after == 42.0
@@ -0,0 +1,91 @@
+import os
+import queue
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from market_stream import MarketStream, ReplayStream, WebSocketStream
+
+HOUR = 3600000
+
+
+def make_rows(n, start=0):
+    return [[(start + i) * HOUR, 100.0 + i, 102.0 + i, 99.0 + i, 101.0 + i, 10.0] for i in range(n)]
+
+
+class TestMarketStream:
+    def test_next_event_is_abstract(self):
+        with pytest.raises(TypeError):
+            MarketStream()
+
+        class Incomplete(MarketStream):
+            pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+
+class TestReplayStream:
+    def test_closes_only(self):
+        events = list(ReplayStream(make_rows(3), 'BTC/USDT', '1h', ticks_per_candle=0).events())
+        assert [e['closed'] for e in events] == [True, True, True]
+        assert [e['candle'] for e in events] == make_rows(3)
+
+    def test_forming_updates_precede_close(self):
+        events = list(ReplayStream(make_rows(2), 'BTC/USDT', '1h', ticks_per_candle=3).events())
+        assert len(events) == 8
+        first = events[:4]
+        assert [e['closed'] for e in first] == [False, False, False, True]
+        assert all(e['candle'][0] == 0 for e in first)
+        # Las actualizaciones en formación nunca salen del rango de la vela cerrada
+        for event in first[:3]:
+            _, open_, high, low, close, volume = event['candle']
+            assert open_ == 100.0 and 99.0 <= low <= high <= 102.0 and volume < 10.0
+
+    def test_emits_tickers(self):
+        events = list(ReplayStream(make_rows(1), 'BTC/USDT', '1h', ticks_per_candle=2, emit_tickers=True).events())
+        assert [e['type'] for e in events] == ['ticker', 'candle', 'ticker', 'candle', 'candle']
+        assert events[0]['timestamp'] < events[2]['timestamp'] < HOUR
+
+    def test_from_csv(self, tmp_path):
+        path = tmp_path / 'candles.csv'
+        path.write_text("timestamp,open,high,low,close,volume\n" +
+                        "\n".join(",".join(str(v) for v in row) for row in make_rows(2)))
+        stream = ReplayStream.from_csv(str(path), 'BTC/USDT', '1h', ticks_per_candle=0)
+        assert [e['candle'] for e in stream.events()] == make_rows(2)
+
+    def test_close_stops_stream(self):
+        stream = ReplayStream(make_rows(5), 'BTC/USDT', '1h', ticks_per_candle=0)
+        stream.next_event()
+        stream.close()
+        assert stream.next_event() is None
+
+
+class TestWebSocketCandleTracking:
+    @pytest.fixture
+    def stream(self):
+        stream = WebSocketStream.__new__(WebSocketStream)
+        stream.symbol, stream.timeframe = 'BTC/USDT', '1h'
+        stream.queue = queue.Queue()
+        stream._last_candle = None
+        return stream
+
+    def drain(self, stream):
+        events = []
+        while not stream.queue.empty():
+            events.append(stream.queue.get())
+        return events
+
+    def test_previous_candle_closed_when_next_opens(self, stream):
+        rows = make_rows(2)
+        stream._push_candle(rows[0])
+        stream._push_candle(rows[1])
+        events = self.drain(stream)
+        assert [(e['candle'][0], e['closed']) for e in events] == [(0, False), (0, True), (HOUR, False)]
+
+    def test_stale_updates_ignored(self, stream):
+        rows = make_rows(2)
+        stream._push_candle(rows[1])
+        stream._push_candle(rows[0])
+        assert len(self.drain(stream)) == 1
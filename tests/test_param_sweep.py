@@ -0,0 +1,102 @@
+import copy
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import BotConfig
+from fake_exchange import synthetic_candles
+from param_sweep import (SharedCandles, _cast, format_table, grid_params, prepare_arrays, random_params, rank_results,
+                         run_sweep)
+from rsi_bot import _PARAM_BOUNDS, BinanceRSIEMABot
+from vector_backtest import VectorBacktester
+
+
+@pytest.fixture(scope='module')
+def candles():
+    return synthetic_candles(1200, seed=4, start=0)
+
+
+class TestParamGeneration:
+    def test_grid_covers_bounds(self):
+        grid = grid_params(2)
+        assert len(grid) == 2 ** len(_PARAM_BOUNDS)
+        for name, (low, high) in _PARAM_BOUNDS.items():
+            assert {params[name] for params in grid} == {low, high}
+
+    def test_random_within_bounds_and_typed(self):
+        samples = random_params(200, seed=1)
+        assert samples == random_params(200, seed=1)
+        for params in samples:
+            for name, (low, high) in _PARAM_BOUNDS.items():
+                assert low <= params[name] <= high
+            assert isinstance(params['rsi_oversold'], int)
+
+    def test_sweep_and_adjustment_paths_convert_alike(self):
+        config = BotConfig()
+        suggested = dict(config.__dict__, rsi_oversold=32.7, rsi_overbought=68.5)
+        adjustments = SimpleNamespace(regime='test', reasoning='', **{name: suggested[name] for name in _PARAM_BOUNDS})
+        bot = SimpleNamespace(config=copy.copy(config), logger=MagicMock())
+        BinanceRSIEMABot._apply_param_adjustments(bot, adjustments)
+
+        for name in ('rsi_oversold', 'rsi_overbought'):
+            assert getattr(bot.config, name) == _cast(config, name, suggested[name])
+        assert bot.config.rsi_oversold == 33  # Redondeo, no truncado
+
+
+class TestSharedCandles:
+    def test_attach_reads_same_arrays(self, candles):
+        arrays, indicators = prepare_arrays(candles, BotConfig())
+        with SharedCandles(arrays, indicators) as shared:
+            shm, shared_candles, shared_indicators = SharedCandles.attach(shared.name, shared.shape)
+            try:
+                assert shared_candles['timestamp'].tolist() == arrays['timestamp'].tolist()
+                assert shared_indicators['rsi'].tolist() == indicators['rsi'].tolist()
+                assert shared_indicators['trend'].tolist() == indicators['trend'].tolist()
+            finally:
+                del shared_candles, shared_indicators
+                shm.close()
+
+
+class TestRunSweep:
+    def test_pool_matches_direct_backtests(self, candles):
+        param_sets = random_params(6, seed=3)
+        rows = run_sweep(candles, param_sets, workers=2, batch_size=2)
+
+        assert [row['rank'] for row in rows] == list(range(1, 7))
+        returns = [row['return_pct'] for row in rows]
+        assert returns == sorted(returns, reverse=True)
+        for row in rows:
+            params = {name: row[name] for name in _PARAM_BOUNDS}
+            expected = VectorBacktester(candles, params=params).run()['summary']
+            assert row['return_pct'] == pytest.approx(expected['return_pct'])
+            assert row['total_trades'] == expected['total_trades']
+
+    def test_in_process_and_exact_engine(self, candles):
+        params = [dict(random_params(1, seed=8)[0])]
+        vector = run_sweep(candles, params, workers=1)
+        exact = run_sweep(candles, params, workers=1, engine='exact')
+        assert vector[0]['total_trades'] == exact[0]['total_trades']
+        assert 'error' not in exact[0]
+
+
+class TestRanking:
+    def test_min_trades_and_errors_rank_last(self):
+        rows = [
+            {'return_pct': 5.0, 'total_trades': 2, 'max_drawdown_pct': 1.0},
+            {'return_pct': 1.0, 'total_trades': 30, 'max_drawdown_pct': 2.0},
+            {'error': 'boom'},
+            {'return_pct': 1.0, 'total_trades': 30, 'max_drawdown_pct': 1.0},
+        ]
+        ranked = rank_results(rows, min_trades=10)
+        assert [row.get('max_drawdown_pct') for row in ranked[:2]] == [1.0, 2.0]
+        assert {ranked[2].get('error'), ranked[3].get('total_trades')} == {'boom', 2}
+
+    def test_format_table(self, candles):
+        rows = run_sweep(candles, random_params(3, seed=2), workers=1)
+        table = format_table(rows, top=2).splitlines()
+        assert len(table) == 3
+        assert 'rsi_oversold' in table[0]
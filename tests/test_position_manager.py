@@ -0,0 +1,98 @@
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from exchange_metrics import BudgetDeferred
+from position_manager import PositionManager
+
+
+@pytest.fixture
+def config():
+    cfg = MagicMock()
+    cfg.symbol = 'BTC/USDT'
+    cfg.testnet = True
+    cfg.leverage = 1
+    cfg.balance_cache_ttl = 30
+    cfg.min_balance_usdt = 10
+    cfg.position_size_pct = 3
+    cfg.min_notional_usdt = 10
+    cfg.stop_loss_pct = 2.0
+    cfg.take_profit_pct = 4.0
+    return cfg
+
+
+@pytest.fixture
+def exchange():
+    ex = MagicMock()
+    ex.fetch_balance.return_value = {'USDT': {'free': 1000.0}}
+    ex.create_market_order.return_value = {'id': 'order-1'}
+    return ex
+
+
+@pytest.fixture
+def position_manager(exchange, config):
+    return PositionManager(exchange, config, MagicMock())
+
+
+class TestBalanceCache:
+    def test_repeated_reads_within_ttl_hit_cache(self, position_manager, exchange):
+        assert position_manager.get_account_balance() == 1000.0
+        assert position_manager.get_account_balance() == 1000.0
+        assert exchange.fetch_balance.call_count == 1
+        stats = position_manager.balance_cache_stats()
+        assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 50.0)
+
+    def test_expires_after_ttl(self, position_manager, exchange):
+        with patch('position_manager.time.monotonic', return_value=100.0):
+            position_manager.get_account_balance()
+        with patch('position_manager.time.monotonic', return_value=131.0):
+            position_manager.get_account_balance()
+        assert exchange.fetch_balance.call_count == 2
+
+    def test_stored_cycle_balance_is_served_from_cache(self, position_manager, exchange):
+        assert position_manager.balance_cached() is False
+        assert position_manager.store_balance({'USDT': {'free': 500.0}}) == 500.0
+        assert position_manager.balance_cached() is True
+        assert position_manager.get_account_balance() == 500.0
+        exchange.fetch_balance.assert_not_called()
+
+    def test_ttl_follows_injected_clock(self, exchange, config):
+        now = [1000.0]
+        manager = PositionManager(exchange, config, MagicMock(), clock=lambda: now[0])
+        with patch('position_manager.time.monotonic', side_effect=AssertionError("reloj real")):
+            manager.get_account_balance()
+            now[0] += 29
+            manager.get_account_balance()
+            assert exchange.fetch_balance.call_count == 1
+            now[0] += 2
+            manager.get_account_balance()
+        assert exchange.fetch_balance.call_count == 2
+
+    def test_budget_deferral_propagates(self, position_manager, exchange):
+        exchange.fetch_balance.side_effect = BudgetDeferred('fetch_balance', 12.0)
+        with pytest.raises(BudgetDeferred):
+            position_manager.get_account_balance()
+        position_manager.logger.error.assert_not_called()
+
+    def test_order_invalidates_cache(self, position_manager, exchange):
+        position_manager.get_account_balance()
+        assert position_manager.open_long_position(100.0, 35.0, 99.0, 98.0, 90.0, 'bullish') is True
+        exchange.fetch_balance.return_value = {'USDT': {'free': 970.0}}
+        assert position_manager.get_account_balance() == 970.0
+        assert position_manager.balance_cache_stats()['invalidations'] == 1
+
+    def test_failed_order_also_invalidates(self, position_manager, exchange):
+        position_manager.get_account_balance()
+        exchange.create_market_order.side_effect = RuntimeError("timeout")
+        position_manager.open_long_position(100.0, 35.0, 99.0, 98.0, 90.0, 'bullish')
+        position_manager.get_account_balance()
+        assert exchange.fetch_balance.call_count == 2
+
+    def test_errors_are_not_cached(self, position_manager, exchange):
+        exchange.fetch_balance.side_effect = RuntimeError("down")
+        assert position_manager.get_account_balance() == 0
+        exchange.fetch_balance.side_effect = None
+        assert position_manager.get_account_balance() == 1000.0
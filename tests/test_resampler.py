@@ -0,0 +1,92 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from candle_buffer import CandleBuffer
+from resampler import TimeframeResampler, timeframe_to_ms
+
+H4 = 4 * 3600 * 1000
+DAY = 24 * 3600 * 1000
+
+
+def make_rows(n, start=0):
+    rows = []
+    for i in range(start, start + n):
+        price = 100.0 + i
+        rows.append([i * H4, price, price + 2, price - 1 - (i % 3), price + 1, 1.0 + i])
+    return rows
+
+
+def feed(resampler, rows):
+    buffer = CandleBuffer(500)
+    buffer.upsert(rows)
+    return resampler.update_from_buffer(buffer)
+
+
+class TestTimeframeToMs:
+    def test_parses_ccxt_timeframes(self):
+        assert timeframe_to_ms('15m') == 15 * 60 * 1000
+        assert timeframe_to_ms('4h') == H4
+        assert timeframe_to_ms('1d') == DAY
+
+    def test_rejects_unknown_unit(self):
+        with pytest.raises(ValueError):
+            timeframe_to_ms('3x')
+
+
+class TestTimeframeResampler:
+    def test_rejects_non_multiple_target(self):
+        with pytest.raises(ValueError):
+            TimeframeResampler('4h', '6h', 10)
+
+    def test_daily_bars_aggregate_six_4h_candles(self):
+        rows = make_rows(13)  # 2 días completos + primera vela del tercero (en formación)
+        daily = feed(TimeframeResampler('4h', '1d', 10), rows)
+        assert len(daily) == 3
+        np.testing.assert_array_equal(daily.timestamps, [0, DAY, 2 * DAY])
+
+        day = rows[6:12]
+        assert daily.open[1] == day[0][1]
+        assert daily.high[1] == max(r[2] for r in day)
+        assert daily.low[1] == min(r[3] for r in day)
+        assert daily.close[1] == day[-1][4]
+        assert daily.volume[1] == sum(r[5] for r in day)
+
+    def test_partial_leading_bucket_is_dropped(self):
+        rows = make_rows(10, start=3)  # empieza a mitad del día 0
+        daily = feed(TimeframeResampler('4h', '1d', 10), rows)
+        assert daily.timestamps[0] == DAY
+
+    def test_forming_candle_updates_do_not_double_count(self):
+        resampler = TimeframeResampler('4h', '12h', 10)
+        buffer = CandleBuffer(50)
+        rows = make_rows(2)
+        buffer.upsert(rows)
+        resampler.update_from_buffer(buffer)
+
+        for tick in range(5):
+            rows[-1][4] += 1
+            rows[-1][5] += 1
+            buffer.upsert(rows)
+            bars = resampler.update_from_buffer(buffer)
+
+        assert len(bars) == 1
+        assert bars.close[-1] == rows[-1][4]
+        assert bars.volume[-1] == rows[0][5] + rows[1][5]
+
+    def test_incremental_matches_batch(self):
+        rows = make_rows(60)
+        batch = feed(TimeframeResampler('4h', '1d', 20), rows)
+
+        resampler = TimeframeResampler('4h', '1d', 20)
+        buffer = CandleBuffer(500)
+        for end in range(1, 61):
+            buffer.upsert(rows[:end])
+            incremental = resampler.update_from_buffer(buffer)
+
+        np.testing.assert_array_equal(incremental.timestamps, batch.timestamps)
+        np.testing.assert_array_equal(incremental.close, batch.close)
+        np.testing.assert_array_equal(incremental.volume, batch.volume)
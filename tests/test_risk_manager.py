@@ -192,3 +192,25 @@ class TestTrailingStopUpdate:
         position_manager.position = None
         risk_manager.update_trailing_stop_swing(current_price=105.0, market_data={})
         # Should not raise any exception
+
+
+class TestCircuitBreaker:
+    @pytest.fixture(autouse=True)
+    def thresholds(self, config):
+        config.circuit_breaker_losses = 3
+        config.circuit_breaker_hours = 24
+
+    def test_inactive_below_loss_threshold(self, risk_manager):
+        metrics = {'consecutive_losses': 2, 'last_loss_time': 1000}
+        assert risk_manager.is_circuit_breaker_active(metrics, 'neutral', 50, now=1000) is False
+
+    def test_active_during_cooldown(self, risk_manager):
+        metrics = {'consecutive_losses': 3, 'last_loss_time': 1000}
+        assert risk_manager.is_circuit_breaker_active(metrics, 'bullish', 20, now=1000 + 23 * 3600) is True
+
+    def test_after_cooldown_requires_strong_trend_and_extreme_rsi(self, risk_manager):
+        metrics = {'consecutive_losses': 3, 'last_loss_time': 1000}
+        now = 1000 + 25 * 3600
+        assert risk_manager.is_circuit_breaker_active(metrics, 'neutral', 20, now=now) is True
+        assert risk_manager.is_circuit_breaker_active(metrics, 'bullish', 50, now=now) is True
+        assert risk_manager.is_circuit_breaker_active(metrics, 'bearish', 75, now=now) is False
@@ -0,0 +1,95 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scheduler import CandleScheduler
+
+HOUR = 3600
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_scheduler(now, **kwargs):
+    clock = FakeClock(now)
+    return CandleScheduler('4h', clock=clock, sleep=clock.sleep, **kwargs), clock
+
+
+class TestCandleScheduler:
+    def test_wakes_after_candle_close_plus_settle(self):
+        scheduler, clock = make_scheduler(10 * HOUR + 123, settle_seconds=5)
+        assert scheduler.next_wakeup() == (12 * HOUR + 5, True)
+        assert scheduler.wait_next() is True
+        assert clock.now == 12 * HOUR + 5
+
+    def test_no_drift_across_iterations(self):
+        scheduler, clock = make_scheduler(0, settle_seconds=5)
+        wakeups = []
+        for _ in range(3):
+            scheduler.wait_next()
+            clock.now += 17.3  # trabajo de la iteración
+            wakeups.append(clock.now - 17.3)
+        assert wakeups == [5, 4 * HOUR + 5, 8 * HOUR + 5]
+
+    def test_intra_candle_checks(self):
+        scheduler, clock = make_scheduler(4 * HOUR + 5, settle_seconds=5, check_interval=1800)
+        flags = [scheduler.wait_next() for _ in range(8)]
+        assert flags == [False] * 7 + [True]
+        assert clock.now == 8 * HOUR + 5
+
+    def test_check_interval_not_smaller_than_candle_is_ignored(self):
+        scheduler, _ = make_scheduler(0, check_interval=5 * HOUR)
+        assert scheduler.check_interval is None
+
+    def test_periodic_tasks_follow_the_grid(self):
+        scheduler, clock = make_scheduler(HOUR + 30, settle_seconds=5, check_interval=1800)
+        save = MagicMock()
+        summary = MagicMock()
+        scheduler.add_task('save_state', save, HOUR)
+        scheduler.add_task('summary', summary, 4 * HOUR)
+
+        executed = []
+        for _ in range(6):
+            scheduler.wait_next()
+            executed.append(scheduler.run_due_tasks())
+        assert executed == [[], ['save_state'], [], ['save_state'], [], ['save_state', 'summary']]
+        assert clock.now == 4 * HOUR + 5
+
+    def test_missed_marks_run_once(self):
+        scheduler, clock = make_scheduler(0)
+        task = MagicMock()
+        scheduler.add_task('save_state', task, HOUR)
+        clock.now = 5 * HOUR + 100
+        assert scheduler.run_due_tasks() == ['save_state']
+        assert scheduler.run_due_tasks() == []
+        assert task.call_count == 1
+
+    def test_task_errors_are_logged(self):
+        logger = MagicMock()
+        scheduler, clock = make_scheduler(0, logger=logger)
+        scheduler.add_task('boom', MagicMock(side_effect=RuntimeError("fallo")), HOUR)
+        clock.now = HOUR + 10
+        assert scheduler.run_due_tasks() == []
+        logger.error.assert_called_once()
+
+    def test_retry_task_brings_next_run_forward(self):
+        scheduler, clock = make_scheduler(0)
+        task = MagicMock()
+        scheduler.add_task('summary', task, 4 * HOUR)
+        clock.now = 4 * HOUR + 10
+        assert scheduler.run_due_tasks() == ['summary']
+        scheduler.retry_task('summary', 60)
+        clock.now += 59
+        assert scheduler.run_due_tasks() == []
+        clock.now += 1
+        assert scheduler.run_due_tasks() == ['summary']
+        assert task.call_count == 2
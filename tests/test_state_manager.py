@@ -158,3 +158,16 @@ class TestRecoverBotState:
         state_manager.recover_bot_state()
 
         state_manager.recover_position_from_exchange.assert_called_once_with(exchange_position)
+
+
+class TestIndicatorStatePersistence:
+    def test_indicator_state_saved_and_loaded(self, state_manager, tmp_config, position_manager, signal_detector):
+        indicator_state = {'symbol': 'BTC/USDT', 'last_timestamp': 1700000000000, 'emas': {'21': 101.5}}
+        state_manager.set_indicator_state(indicator_state)
+        state_manager.save_bot_state()
+
+        reloaded = StateManager(
+            tmp_config, MagicMock(), MagicMock(), position_manager, signal_detector, {'recoveries_performed': 0}
+        )
+        reloaded.load_bot_state()
+        assert reloaded.get_loaded_indicator_state() == indicator_state
@@ -0,0 +1,69 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backtest import BacktestEngine
+from config import BotConfig
+from fake_exchange import synthetic_candles
+from market_analyzer import MarketAnalyzer
+from vector_backtest import (DIVERGENCE_CANDLES, DIVERGENCE_SEED, TREND_NAMES, VectorBacktester,
+                             compare_engines, confirmation_offsets, trend_codes)
+
+
+@pytest.fixture(scope='module')
+def candles():
+    return synthetic_candles(DIVERGENCE_CANDLES, seed=DIVERGENCE_SEED, start=0)
+
+
+class TestVectorRules:
+    def test_trend_codes_match_market_analyzer(self):
+        config = SimpleNamespace(ema_separation_min=0.1)
+        analyzer = MarketAnalyzer(None, config, None, None)
+        rng = np.random.default_rng(0)
+        closes, fast, slow, trend = (100 + rng.normal(0, 2, 2000) for _ in range(4))
+
+        codes = trend_codes(closes, fast, slow, trend, config)
+        expected = [analyzer.determine_trend_direction(*values) for values in zip(closes, fast, slow, trend)]
+        assert [TREND_NAMES[code] for code in codes] == expected
+
+    def test_confirmation_offsets_and_expiry(self):
+        config = SimpleNamespace(max_swing_wait=3, swing_confirmation_threshold=0.5,
+                                 rsi_neutral_low=45, rsi_neutral_high=55)
+        closes = np.array([100.0, 100.2, 100.6, 100.0, 99.0, 99.0])
+        rsi = np.full(6, 50.0)
+        trend = np.zeros(6, dtype=np.int8)
+
+        long_offsets, short_offsets = confirmation_offsets(closes, rsi, trend, config)
+        assert long_offsets[0] == 2          # +0.6% en la segunda vela
+        assert short_offsets[2] == 1         # -0.6% en la vela siguiente
+        assert long_offsets[3] == 0          # expira (o se acaba la serie) sin confirmar
+
+        sparse_long, sparse_short = confirmation_offsets(closes, rsi, trend, config, indices=np.array([0, 2]))
+        assert list(sparse_long) == [long_offsets[0], 0, long_offsets[2], 0, 0, 0]
+        assert list(sparse_short) == [short_offsets[0], 0, short_offsets[2], 0, 0, 0]
+
+
+class TestDivergence:
+    def test_matches_exact_engine_on_fixed_dataset(self, candles):
+        report = compare_engines(candles, repeat=1)
+        assert report['exact']['total_trades'] > 20
+        assert report['trade_match_pct'] == pytest.approx(100.0)
+        assert report['return_diff_pct'] == pytest.approx(0, abs=1e-6)
+
+    def test_matches_with_param_overrides(self, candles):
+        params = {'rsi_oversold': 40, 'stop_loss_pct': 1.5, 'trailing_stop_distance': 1.0,
+                  'breakeven_threshold': 0.6, 'swing_confirmation_threshold': 0.3}
+        report = compare_engines(candles, params=params, repeat=1)
+        assert report['trade_match_pct'] >= 95
+
+    def test_result_shape_matches_exact_engine(self, candles):
+        config = BotConfig()
+        approx = VectorBacktester(candles, config).run()
+        exact = BacktestEngine(candles, config).run()
+        assert set(exact) - {'metrics'} == set(approx)
+        assert len(approx['equity']) == len(exact['equity'])
+        assert approx['equity'] == pytest.approx(exact['equity'])
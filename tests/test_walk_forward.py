@@ -0,0 +1,81 @@
+import csv
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fake_exchange import synthetic_candles
+from param_sweep import random_params
+from walk_forward import rolling_windows, stitch_equity, walk_forward, write_windows
+
+
+@pytest.fixture(scope='module')
+def candles():
+    return synthetic_candles(1500, seed=6, start=0, volatility=0.03)
+
+
+class TestWindows:
+    def test_rolling_windows_step_by_test_size(self):
+        windows = rolling_windows(1000, train_size=400, test_size=200, start=100)
+        assert windows == [(100, 500, 700), (300, 700, 900)]
+
+    def test_no_windows_when_history_too_short(self):
+        assert rolling_windows(500, 400, 200) == []
+
+
+class TestStitchEquity:
+    def test_each_window_starts_from_previous_capital(self):
+        results = [
+            {'equity': np.array([100.0, 110.0]), 'timestamps': np.array([1, 2])},
+            {'equity': np.array([100.0, 90.0]), 'timestamps': np.array([3, 4])},
+        ]
+        timestamps, equity = stitch_equity(results, 100.0)
+        assert timestamps.tolist() == [1, 2, 3, 4]
+        assert equity.tolist() == pytest.approx([100.0, 110.0, 110.0, 99.0])
+
+
+class TestWalkForward:
+    def test_out_of_sample_is_contiguous(self, candles):
+        study = walk_forward(candles, 400, 200, random_params(20, seed=1), workers=1, min_trades=1)
+
+        assert len(study['windows']) == 4
+        assert len(study['equity']) == 4 * 200
+        steps = np.diff(study['timestamps'])
+        assert (steps == steps[0]).all()
+        for result in study['windows']:
+            assert set(result['params']) == set(random_params(1)[0])
+        assert study['summary']['total_trades'] == sum(r['test']['total_trades'] for r in study['windows'])
+
+    def test_parallel_matches_in_process(self, candles):
+        param_sets = random_params(10, seed=2)
+        serial = walk_forward(candles, 400, 200, param_sets, workers=1)
+        parallel = walk_forward(candles, 400, 200, param_sets, workers=2)
+        assert [r['params'] for r in parallel['windows']] == [r['params'] for r in serial['windows']]
+        assert parallel['equity'].tolist() == pytest.approx(serial['equity'].tolist())
+
+    def test_windows_without_valid_config_do_not_trade(self, candles, tmp_path):
+        study = walk_forward(candles, 400, 200, random_params(5, seed=3), workers=1, min_trades=10 ** 6,
+                             initial_balance=1000.0)
+
+        assert study['skipped_windows'] == len(study['windows']) == 4
+        assert all(not result['valid'] and result['params'] == {} for result in study['windows'])
+        assert study['equity'].tolist() == [1000.0] * 800
+        assert study['summary']['total_trades'] == 0
+        assert study['efficiency'] is None
+
+        path = tmp_path / 'windows.csv'
+        write_windows(study, path)
+        with open(path) as f:
+            assert [row['valid'] for row in csv.DictReader(f)] == ['False'] * 4
+
+    def test_efficiency_reports_means_separately(self, candles):
+        study = walk_forward(candles, 400, 200, random_params(20, seed=1), workers=1, min_trades=1)
+        valid = [r for r in study['windows'] if r['valid']]
+        assert study['train_return'] == pytest.approx(np.mean([r['train']['return_pct'] for r in valid]))
+        assert study['test_return'] == pytest.approx(np.mean([r['test']['return_pct'] for r in valid]))
+        if study['train_return'] > 0:
+            assert study['efficiency'] == pytest.approx(study['test_return'] / study['train_return'])
+        else:
+            assert study['efficiency'] is None
@@ -0,0 +1,497 @@
+"""
+Backtest vectorizado aproximado para cribado rápido de configuraciones.
+
+Calcula con operaciones NumPy sobre todo el historial la clasificación de
+tendencia (MarketAnalyzer.determine_trend_direction), las máscaras de
+entrada (SignalDetector.detect_swing_signal), las ventanas de confirmación
+(check_swing_confirmation) y las salidas SL/TP/trailing/tendencia
+(RiskManager.check_exit_conditions_swing). Solo la secuencia de eventos
+(señal → confirmación → salida) se recorre en Python, un paso por trade y
+no por vela.
+
+Las reglas replican las del bot, pero no se ejecutan los módulos reales:
+las divergencias frente a backtest.BacktestEngine se miden con
+compare_engines() sobre un dataset fijo (ejecuta este módulo).
+
+Referencia (dataset fijo de 5000 velas, 46 trades, mejor de 3 ejecuciones):
+~750k velas/s frente a ~230k del motor exacto, unas 3 veces más rápido; con
+50000 velas la proporción se mantiene. Una sola ejecución en frío ronda x2
+por el arranque de NumPy.
+
+Uso:
+    python vector_backtest.py
+    python vector_backtest.py --candles 20000 --param stop_loss_pct=2.5
+    python vector_backtest.py --csv historial.csv
+"""
+import argparse
+import copy
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backtest import BacktestEngine, _parse_param, candle_arrays, compute_indicator_arrays, summarize
+from config import BotConfig
+
+# Códigos de tendencia (MarketAnalyzer.determine_trend_direction)
+BEARISH, WEAK_BEARISH, NEUTRAL, WEAK_BULLISH, BULLISH = -2, -1, 0, 1, 2
+TREND_NAMES = {BEARISH: 'bearish', WEAK_BEARISH: 'weak_bearish', NEUTRAL: 'neutral',
+               WEAK_BULLISH: 'weak_bullish', BULLISH: 'bullish'}
+
+LONG, SHORT = 1, -1
+
+# Dataset fijo del informe de divergencia
+DIVERGENCE_CANDLES = 5000
+DIVERGENCE_SEED = 42
+
+_EXIT_REASONS = {
+    LONG: ("Stop Loss Emergencia", "Take Profit Objetivo", "Trailing Stop",
+           "Cambio Tendencia Bajista", "RSI Overbought + Bajo EMA21"),
+    SHORT: ("Stop Loss Emergencia", "Take Profit Objetivo", "Trailing Stop",
+            "Cambio Tendencia Alcista", "RSI Oversold + Sobre EMA21")
+}
+
+
+def trend_codes(closes, ema_fast, ema_slow, ema_trend, config):
+    """
+    Tendencia de cada vela como código entero (BEARISH..BULLISH).
+
+    Misma cascada de condiciones que MarketAnalyzer.determine_trend_direction.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sep = np.where(ema_slow > 0, (ema_fast - ema_slow) / ema_slow * 100, 0.0)
+    bull_aligned = (ema_fast > ema_slow) & (ema_slow > ema_trend)
+    bear_aligned = (ema_fast < ema_slow) & (ema_slow < ema_trend)
+    conditions = [
+        bull_aligned & (closes > ema_slow * 0.995) & (sep >= config.ema_separation_min),
+        bull_aligned & (closes > ema_trend),
+        bull_aligned,
+        bear_aligned & (closes < ema_slow * 1.005) & (np.abs(sep) >= config.ema_separation_min),
+        bear_aligned & (closes < ema_trend),
+        bear_aligned,
+        (closes > ema_trend) & (ema_fast > ema_slow),
+        (closes < ema_trend) & (ema_fast < ema_slow)
+    ]
+    choices = [BULLISH, WEAK_BULLISH, NEUTRAL, BEARISH, WEAK_BEARISH, NEUTRAL, WEAK_BULLISH, WEAK_BEARISH]
+    return np.select(conditions, choices, NEUTRAL).astype(np.int8)
+
+
+def pullback_mask(closes, ema_fast, ema_slow, config):
+    """Velas en pullback a EMA21/EMA50 o entre ambas (MarketAnalyzer.is_pullback_to_ema)"""
+    threshold = config.ema_touch_threshold
+    near_fast = np.abs((closes - ema_fast) / ema_fast) * 100 <= threshold
+    near_slow = np.abs((closes - ema_slow) / ema_slow) * 100 <= threshold
+    between = ((ema_slow <= closes) & (closes <= ema_fast)) | ((ema_fast <= closes) & (closes <= ema_slow))
+    return near_fast | near_slow | between
+
+
+def entry_masks(closes, rsi, ema_fast, ema_slow, trend, config):
+    """
+    Velas donde SignalDetector.detect_swing_signal dispararía una señal.
+
+    Returns:
+        (máscara long, máscara short)
+    """
+    pullback = pullback_mask(closes, ema_fast, ema_slow, config)
+    accept_any = not config.pullback_ema_touch
+
+    oversold = (rsi < config.rsi_oversold) & np.isin(trend, (BULLISH, WEAK_BULLISH, NEUTRAL))
+    overbought = ~oversold & (rsi > config.rsi_overbought) & np.isin(trend, (BEARISH, WEAK_BEARISH, NEUTRAL))
+    neutral_zone = (~oversold & ~overbought & (trend == BULLISH)
+                    & (config.rsi_neutral_low <= rsi) & (rsi <= config.rsi_neutral_high))
+    continuation = (~oversold & ~overbought & ~neutral_zone & (trend == BULLISH)
+                    & (config.rsi_neutral_high < rsi) & (rsi <= config.rsi_trend_continuation_max))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ema_sep = np.where(ema_slow > 0, np.abs((ema_fast - ema_slow) / ema_slow) * 100, 0.0)
+
+    long_mask = ((oversold & (pullback | accept_any | (rsi < 25)))
+                 | (neutral_zone & pullback)
+                 | (continuation & pullback & (ema_sep >= config.trend_continuation_ema_sep)))
+    short_mask = overbought & (pullback | accept_any | (rsi > 85))
+    return long_mask, short_mask
+
+
+def confirmation_offsets(closes, rsi, trend, config, indices=None):
+    """
+    Primera vela que confirmaría una señal disparada en cada vela.
+
+    Evalúa check_swing_confirmation sobre las max_swing_wait velas siguientes
+    con ventanas deslizantes. El RSI de referencia del bot (last_rsi) ya es
+    el de la vela evaluada, así que la mejora "+5 puntos" nunca aplica.
+
+    Args:
+        indices: Velas a evaluar (p. ej. solo las que tienen señal); por defecto todas
+
+    Returns:
+        (offsets long, offsets short): desplazamiento 1..max_swing_wait o 0
+        si la señal expira sin confirmarse (0 también fuera de `indices`)
+    """
+    wait = int(config.max_swing_wait)
+    count = len(closes)
+    rows = np.arange(count) if indices is None else np.asarray(indices, dtype=np.intp)
+    pad = np.full(wait, np.nan)
+    future_close = sliding_window_view(np.concatenate((closes, pad)), wait + 1)[rows, 1:]
+    future_rsi = sliding_window_view(np.concatenate((rsi, pad)), wait + 1)[rows, 1:]
+    future_trend = sliding_window_view(np.concatenate((trend, np.zeros(wait, dtype=trend.dtype))), wait + 1)[rows, 1:]
+
+    trigger = closes[rows, None]
+    with np.errstate(invalid='ignore'):
+        change_pct = (future_close - trigger) / trigger * 100
+        threshold = config.swing_confirmation_threshold
+        long_ok = (change_pct >= threshold) & (future_rsi > config.rsi_neutral_low) & (future_trend != BEARISH)
+        short_ok = (-change_pct >= threshold) & (future_rsi < config.rsi_neutral_high) & (future_trend != BULLISH)
+
+    def first_offset(mask):
+        offsets = np.zeros(count, dtype=np.intp)
+        offsets[rows] = np.where(mask.any(axis=1), mask.argmax(axis=1) + 1, 0)
+        return offsets
+
+    return first_offset(long_ok), first_offset(short_ok)
+
+
+class VectorBacktester:
+    """
+    Backtest aproximado con las reglas del bot vectorizadas.
+
+    Los arrays por vela (tendencia, máscaras de entrada, confirmaciones) se
+    calculan una vez; el bucle de eventos salta de señal en señal con
+    searchsorted y busca cada salida en bloques crecientes de velas.
+    Respeta min_time_between_signals, la expiración de señales, el circuit
+    breaker y el sizing/comisiones de PositionManager + FakeBinanceExchange.
+    """
+
+    def __init__(self, candles, config=None, params=None, initial_balance=10000.0, fee_rate=0.001,
+                 slippage_pct=0.0, warmup=None, indicator_arrays=None):
+        """
+        Args:
+            candles: Velas (lista de filas o dict de columnas) ordenadas
+            config: BotConfig base (se copia; por defecto BotConfig())
+            params: Sobrescrituras de parámetros {nombre: valor}
+            initial_balance: Capital inicial en la moneda de cotización
+            fee_rate: Comisión por operación
+            slippage_pct: Deslizamiento por orden en %
+            warmup: Velas de historial antes de la primera evaluación
+            indicator_arrays: Resultado de compute_indicator_arrays() a reutilizar
+                (si incluye 'trend' también se reutiliza)
+        """
+        self.config = copy.copy(config or BotConfig())
+        for name, value in (params or {}).items():
+            setattr(self.config, name, value)
+
+        self.arrays = candle_arrays(candles)
+        self.indicator_arrays = indicator_arrays or compute_indicator_arrays(self.arrays['close'], self.config)
+        self.initial_balance = initial_balance
+        self.fee_rate = fee_rate
+        self.slippage_pct = slippage_pct
+        self.warmup = warmup or max(self.config.ema_trend_period + 50, 100)
+
+    def _exit(self, entry_index, side, stop_loss, take_profit, close_at_end):
+        """
+        Primera vela de salida de una posición abierta en entry_index.
+
+        Returns:
+            (índice de salida, motivo) o (None, None) si sigue abierta al final
+        """
+        config = self.config
+        closes = self.closes
+        count = len(closes)
+        entry = closes[entry_index]
+        breakeven_pct = config.breakeven_threshold / 100
+        distance = config.trailing_stop_distance / 100
+        horizon = 64
+
+        while True:
+            end = min(entry_index + 1 + horizon, count)
+            prices = closes[entry_index + 1:end]
+            if len(prices) == 0:
+                break
+            rsi = self.rsi[entry_index + 1:end]
+            ema_fast = self.ema_fast[entry_index + 1:end]
+            trend = self.trend[entry_index + 1:end]
+            index = np.arange(len(prices))
+
+            if side == LONG:
+                previous = np.maximum.accumulate(closes[entry_index:end - 1])
+                extreme = prices > previous
+                hit = np.flatnonzero(prices >= entry * (1 + breakeven_pct))
+                breakeven = entry * 1.001
+                candidates = np.where(extreme & (index > (hit[0] if len(hit) else len(prices))),
+                                      prices * (1 - distance), -np.inf)
+                trailing = np.maximum(np.maximum.accumulate(candidates), breakeven)
+                if len(hit):
+                    trailing[:hit[0]] = stop_loss
+                else:
+                    trailing[:] = stop_loss
+                exits = (prices <= stop_loss, prices >= take_profit, prices <= trailing,
+                         (trend == BEARISH) & ((rsi > 70) | (prices < ema_fast)),
+                         (trend != BEARISH) & (rsi > 80) & (prices < ema_fast))
+            else:
+                previous = np.minimum.accumulate(closes[entry_index:end - 1])
+                extreme = prices < previous
+                hit = np.flatnonzero(prices <= entry * (1 - breakeven_pct))
+                breakeven = entry * 0.999
+                candidates = np.where(extreme & (index > (hit[0] if len(hit) else len(prices))),
+                                      prices * (1 + distance), np.inf)
+                trailing = np.minimum(np.minimum.accumulate(candidates), breakeven)
+                if len(hit):
+                    trailing[:hit[0]] = stop_loss
+                else:
+                    trailing[:] = stop_loss
+                exits = (prices >= stop_loss, prices <= take_profit, prices >= trailing,
+                         (trend == BULLISH) & ((rsi < 30) | (prices > ema_fast)),
+                         (trend != BULLISH) & (rsi < 20) & (prices > ema_fast))
+
+            any_exit = exits[0] | exits[1] | exits[2] | exits[3] | exits[4]
+            if any_exit.any():
+                offset = int(any_exit.argmax())
+                reason = next(i for i, mask in enumerate(exits) if mask[offset])
+                return entry_index + 1 + offset, _EXIT_REASONS[side][reason]
+            if end == count:
+                break
+            horizon *= 4
+
+        if close_at_end:
+            return count - 1, "Fin del backtest"
+        return None, None
+
+    def _position_size(self, balance, price):
+        """Cantidad según PositionManager.calculate_position_size (0 si no se puede abrir)"""
+        config = self.config
+        if balance < config.min_balance_usdt:
+            return 0
+        effective = balance * (config.position_size_pct / 100) * config.leverage
+        effective = max(effective, config.min_notional_usdt)
+        quantity = round(effective / price, 6)
+        return quantity if quantity * price >= config.min_notional_usdt else 0
+
+    def run(self, close_at_end=True):
+        """
+        Ejecuta el backtest aproximado.
+
+        Args:
+            close_at_end: Cerrar la posición abierta al final de la serie
+
+        Returns:
+            dict con 'trades', 'equity', 'timestamps', 'summary' y
+            'candles_per_second' (mismas claves que BacktestEngine.run)
+        """
+        config = self.config
+        started = time.perf_counter()
+
+        closes = self.closes = self.arrays['close']
+        timestamps = self.arrays['timestamp']
+        indicators = self.indicator_arrays
+        self.ema_fast = indicators['ema_fast']
+        self.rsi = indicators['rsi']
+        trend = indicators.get('trend')
+        if trend is None:
+            trend = trend_codes(closes, indicators['ema_fast'], indicators['ema_slow'], indicators['ema_trend'], config)
+        self.trend = trend
+
+        long_mask, short_mask = entry_masks(closes, self.rsi, self.ema_fast, indicators['ema_slow'], trend, config)
+        signal_mask = long_mask | short_mask
+        candidates = np.flatnonzero(signal_mask)
+        # Las ventanas de confirmación solo se evalúan en velas con señal
+        confirm_long, confirm_short = confirmation_offsets(closes, self.rsi, trend, config, indices=candidates)
+        # Con el circuit breaker activo solo reanudan tendencia fuerte + RSI extremo
+        release = np.isin(trend, (BULLISH, BEARISH)) & ((self.rsi < 35) | (self.rsi > 70))
+        release_candidates = np.flatnonzero(signal_mask & release)
+
+        count = len(closes)
+        start = min(self.warmup, count) - 1 if count else 0
+        wait = int(config.max_swing_wait)
+        gap_ms = config.min_time_between_signals * 1000
+        breaker_ms = config.circuit_breaker_hours * 3600 * 1000
+        buy_slip = 1 + self.slippage_pct / 100
+        sell_slip = 1 - self.slippage_pct / 100
+
+        cash = float(self.initial_balance)
+        equity = np.empty(max(count - start, 0))
+        trades = []
+        last_entry_ts = None
+        consecutive_losses = 0
+        last_loss_ts = 0
+        cursor = start
+        filled_to = start
+
+        while cursor < count:
+            # Sin posición ni señal pendiente: siguiente vela con señal permitida
+            low = cursor
+            if last_entry_ts is not None:
+                low = max(low, int(np.searchsorted(timestamps, last_entry_ts + gap_ms)))
+            pool = candidates
+            if consecutive_losses >= config.circuit_breaker_losses:
+                low = max(low, int(np.searchsorted(timestamps, last_loss_ts + breaker_ms)))
+                pool = release_candidates
+            position = int(np.searchsorted(pool, low))
+            if position == len(pool):
+                break
+            signal = int(pool[position])
+            side = LONG if long_mask[signal] else SHORT
+            offset = int((confirm_long if side == LONG else confirm_short)[signal])
+
+            if offset == 0:
+                # Expira tras max_swing_wait velas; en esa misma vela se puede detectar otra
+                cursor = signal + wait
+                continue
+
+            entry_index = signal + offset
+            price = closes[entry_index]
+            quantity = self._position_size(cash, price)
+            if quantity <= 0:
+                cursor = entry_index + 1
+                continue
+
+            if side == LONG:
+                stop_loss = price * (1 - config.stop_loss_pct / 100)
+                take_profit = price * (1 + config.take_profit_pct / 100)
+            else:
+                stop_loss = price * (1 + config.stop_loss_pct / 100)
+                take_profit = price * (1 - config.take_profit_pct / 100)
+            last_entry_ts = int(timestamps[entry_index])
+
+            exit_index, reason = self._exit(entry_index, side, stop_loss, take_profit, close_at_end)
+
+            equity[filled_to - start:entry_index - start] = cash
+            if side == LONG:
+                fill = price * buy_slip
+                cash_open = cash - quantity * fill * (1 + self.fee_rate)
+            else:
+                fill = price * sell_slip
+                cash_open = cash + quantity * fill * (1 - self.fee_rate)
+            hold_end = count if exit_index is None else exit_index
+            equity[entry_index - start:hold_end - start] = cash_open + side * quantity * closes[entry_index:hold_end]
+            if exit_index is None:
+                filled_to = count
+                break
+
+            exit_price = closes[exit_index]
+            if side == LONG:
+                cash = cash_open + quantity * exit_price * sell_slip * (1 - self.fee_rate)
+            else:
+                cash = cash_open - quantity * exit_price * buy_slip * (1 + self.fee_rate)
+            pnl_pct = side * (exit_price - price) / price * 100 * config.leverage
+            trades.append({
+                'timestamp': int(timestamps[exit_index]),
+                'entry_timestamp': last_entry_ts,
+                'side': 'long' if side == LONG else 'short',
+                'entry_price': price,
+                'price': exit_price,
+                'quantity': quantity,
+                'reason': reason,
+                'pnl_pct': pnl_pct,
+                'trade_duration_hours': (timestamps[exit_index] - last_entry_ts) / 3600000
+            })
+            if pnl_pct > 0:
+                consecutive_losses = 0
+            else:
+                consecutive_losses += 1
+                last_loss_ts = int(timestamps[exit_index])
+            filled_to = exit_index
+            cursor = exit_index
+
+        equity[filled_to - start:] = cash
+        elapsed = time.perf_counter() - started
+        evaluated = len(equity)
+        return {
+            'trades': trades,
+            'equity': equity,
+            'timestamps': timestamps[start:],
+            'summary': summarize(equity, trades, self.initial_balance),
+            'candles_per_second': evaluated / elapsed if elapsed > 0 else float('inf')
+        }
+
+
+def compare_engines(candles, config=None, params=None, repeat=3, **kwargs):
+    """
+    Mide la divergencia del backtest vectorizado frente al exacto.
+
+    Args:
+        candles: Velas a comparar
+        config: BotConfig base
+        params: Sobrescrituras de parámetros
+        repeat: Ejecuciones por motor para medir la velocidad (se toma la
+            mejor: la primera incluye el arranque en frío de NumPy)
+        **kwargs: initial_balance, fee_rate, slippage_pct, warmup
+
+    Returns:
+        dict con los resúmenes de ambos motores, trades coincidentes (misma
+        entrada, lado y salida), tasas de coincidencia en %, diferencias de
+        retorno/win rate y la aceleración del vectorizado
+    """
+    config = copy.copy(config or BotConfig())
+    for name, value in (params or {}).items():
+        setattr(config, name, value)
+    arrays = candle_arrays(candles)
+    indicators = compute_indicator_arrays(arrays['close'], config)
+
+    exact_runs = [BacktestEngine(arrays, config, indicator_arrays=indicators, **kwargs).run()
+                  for _ in range(max(repeat, 1))]
+    approx_runs = [VectorBacktester(arrays, config, indicator_arrays=indicators, **kwargs).run()
+                   for _ in range(max(repeat, 1))]
+    exact, approx = exact_runs[0], approx_runs[0]
+
+    # Un trade coincide si cierra con el mismo lado, precio de salida y PnL (implica la misma entrada)
+    exact_keys = [(trade['side'], round(float(trade['price']), 6), round(float(trade['pnl_pct']), 6))
+                  for trade in exact['trades']]
+    approx_keys = [(trade['side'], round(float(trade['price']), 6), round(float(trade['pnl_pct']), 6))
+                   for trade in approx['trades']]
+    remaining = list(exact_keys)
+    matched = 0
+    for key in approx_keys:
+        if key in remaining:
+            remaining.remove(key)
+            matched += 1
+    total = max(len(exact_keys), len(approx_keys))
+
+    exact_summary, approx_summary = exact['summary'], approx['summary']
+    return {
+        'exact': exact_summary,
+        'approx': approx_summary,
+        'matched_trades': matched,
+        'trade_match_pct': matched / total * 100 if total else 100.0,
+        'trade_count_diff': approx_summary['total_trades'] - exact_summary['total_trades'],
+        'return_diff_pct': approx_summary['return_pct'] - exact_summary['return_pct'],
+        'win_rate_diff': approx_summary['win_rate'] - exact_summary['win_rate'],
+        'max_drawdown_diff': approx_summary['max_drawdown_pct'] - exact_summary['max_drawdown_pct'],
+        'exact_candles_per_second': max(run['candles_per_second'] for run in exact_runs),
+        'approx_candles_per_second': max(run['candles_per_second'] for run in approx_runs),
+        'speedup': (max(run['candles_per_second'] for run in approx_runs)
+                    / max(run['candles_per_second'] for run in exact_runs))
+    }
+
+
+def main():
+    from fake_exchange import synthetic_candles
+    from market_stream import read_candles_csv
+
+    parser = argparse.ArgumentParser(description="Divergencia del backtest vectorizado frente al exacto")
+    parser.add_argument('--csv', help="CSV timestamp,open,high,low,close,volume (por defecto dataset sintético fijo)")
+    parser.add_argument('--candles', type=int, default=DIVERGENCE_CANDLES)
+    parser.add_argument('--seed', type=int, default=DIVERGENCE_SEED)
+    parser.add_argument('--param', action='append', type=_parse_param, default=[],
+                        help="Sobrescribe un parámetro de config (nombre=valor), repetible")
+    args = parser.parse_args()
+
+    if args.csv:
+        candles = read_candles_csv(args.csv)
+    else:
+        candles = synthetic_candles(args.candles, seed=args.seed, start=0)
+    report = compare_engines(candles, params=dict(args.param))
+    exact, approx = report['exact'], report['approx']
+
+    print(f"\n📐 Divergencia vectorizado vs exacto ({len(candles)} velas)")
+    print(f"{'':<16}{'exacto':>12}{'vectorizado':>14}")
+    for key, label in (('total_trades', 'Trades'), ('win_rate', 'Win rate %'),
+                       ('return_pct', 'Retorno %'), ('max_drawdown_pct', 'Max DD %')):
+        print(f"{label:<16}{exact[key]:>12.2f}{approx[key]:>14.2f}")
+    print(f"🎯 Trades coincidentes: {report['matched_trades']} ({report['trade_match_pct']:.1f}%)")
+    print(f"📉 Diferencia de retorno: {report['return_diff_pct']:+.3f} pp | "
+          f"win rate: {report['win_rate_diff']:+.2f} pp")
+    print(f"⚡ Aceleración: x{report['speedup']:.1f} ({report['approx_candles_per_second']:,.0f} vs "
+          f"{report['exact_candles_per_second']:,.0f} velas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Optimización walk-forward con ventanas deslizantes de entrenamiento y prueba.
+
+Desliza una ventana de entrenamiento y otra de prueba sobre el historial
+local de velas: en cada entrenamiento se barre _PARAM_BOUNDS (como
+param_sweep.py) y la mejor configuración se evalúa fuera de muestra en la
+ventana siguiente. Las curvas de capital fuera de muestra se encadenan en
+una sola.
+
+Los indicadores se calculan una vez sobre toda la serie y se comparten con
+los workers por memoria compartida; cada ventana es un slice de esos
+arrays, así que el estudio completo cuesta poco más que un barrido.
+
+Uso:
+    python walk_forward.py --start 2022-01-01
+    python walk_forward.py --csv historial.csv --train-days 180 --test-days 60 --configs 500
+"""
+import argparse
+import copy
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from backtest import _parse_date, summarize
+from config import BotConfig
+from param_sweep import (SUMMARY_KEYS, SharedCandles, _close_worker, _init_worker, _worker, evaluate_params,
+                         grid_params, prepare_arrays, random_params, rank_results)
+from resampler import timeframe_to_ms
+from rsi_bot import _PARAM_BOUNDS
+from vector_backtest import VectorBacktester
+
+
+def rolling_windows(count, train_size, test_size, start=0):
+    """
+    Ventanas deslizantes de entrenamiento/prueba sin solape entre pruebas.
+
+    Args:
+        count: Velas de la serie
+        train_size: Velas de cada entrenamiento
+        test_size: Velas de cada prueba (también el paso entre ventanas)
+        start: Primera vela utilizable (indicadores ya calentados)
+
+    Returns:
+        Lista de (inicio entrenamiento, inicio prueba, fin prueba) con fin exclusivo
+    """
+    windows = []
+    train_start = start
+    while train_start + train_size + test_size <= count:
+        test_start = train_start + train_size
+        windows.append((train_start, test_start, test_start + test_size))
+        train_start += test_size
+    return windows
+
+
+def _slice(start, end):
+    candles = {name: values[start:end] for name, values in _worker['candles'].items()}
+    indicators = {name: values[start:end] for name, values in _worker['indicators'].items()}
+    return candles, indicators
+
+
+def _run_window(window, param_sets, metric, min_trades):
+    """
+    Optimiza en el entrenamiento y evalúa la mejor configuración en la prueba (en el worker).
+
+    Si ninguna configuración es válida en el entrenamiento (todas con error o
+    con menos de min_trades trades) la ventana no opera: capital plano y
+    'valid' = False.
+    """
+    train_start, test_start, test_end = window
+    config = _worker['config']
+    # Los indicadores ya están calentados: cada ventana se evalúa desde su primera vela
+    kwargs = dict(_worker['kwargs'], warmup=1)
+
+    train_candles, train_indicators = _slice(train_start, test_start)
+    rows = [evaluate_params(train_candles, train_indicators, params, config, **kwargs) for params in param_sets]
+    best = rank_results(rows, metric, min_trades)[0]
+    valid = 'error' not in best and best.get('total_trades', 0) >= min_trades
+    test_candles, test_indicators = _slice(test_start, test_end)
+
+    if valid:
+        params = {name: best[name] for name in param_sets[0]}
+        result = VectorBacktester(test_candles, config, params=params, indicator_arrays=test_indicators,
+                                  **kwargs).run()
+    else:
+        params = {}
+        equity = np.full(len(test_candles['timestamp']), float(kwargs['initial_balance']))
+        result = {'summary': summarize(equity, [], kwargs['initial_balance']), 'equity': equity,
+                  'timestamps': test_candles['timestamp'], 'trades': []}
+    return {
+        'window': window,
+        'valid': valid,
+        'params': params,
+        'train': {key: best.get(key) for key in SUMMARY_KEYS},
+        'test': result['summary'],
+        'equity': result['equity'],
+        'timestamps': result['timestamps'],
+        'trades': result['trades']
+    }
+
+
+def stitch_equity(results, initial_balance):
+    """
+    Encadena las curvas fuera de muestra: cada ventana arranca con el capital final de la anterior.
+
+    Returns:
+        (timestamps, capital) como np.ndarray
+    """
+    capital = float(initial_balance)
+    timestamps, equity = [], []
+    for result in results:
+        curve = result['equity'] / initial_balance * capital
+        timestamps.append(result['timestamps'])
+        equity.append(curve)
+        if len(curve):
+            capital = float(curve[-1])
+    if not equity:
+        return np.array([], dtype=np.int64), np.array([])
+    return np.concatenate(timestamps), np.concatenate(equity)
+
+
+def walk_forward(candles, train_size, test_size, param_sets=None, config=None, workers=None,
+                 metric='return_pct', min_trades=5, initial_balance=10000.0, **backtest_kwargs):
+    """
+    Ejecuta el estudio walk-forward.
+
+    Args:
+        candles: Velas (lista de filas o dict de columnas)
+        train_size: Velas por ventana de entrenamiento
+        test_size: Velas por ventana de prueba (y paso)
+        param_sets: Configuraciones a barrer en cada entrenamiento (por defecto 500 aleatorias)
+        config: BotConfig base
+        workers: Procesos (por defecto os.cpu_count(); 1 = en el proceso actual)
+        metric: Métrica a maximizar en el entrenamiento
+        min_trades: Trades mínimos en el entrenamiento para elegir una configuración
+        initial_balance: Capital inicial
+        **backtest_kwargs: fee_rate, slippage_pct
+
+    Returns:
+        dict con 'windows' (resultado por ventana, 'valid' = False si no
+        hubo configuración válida y no operó), 'timestamps' y 'equity'
+        (fuera de muestra encadenado), 'summary' (summarize() del tramo
+        fuera de muestra), 'skipped_windows', 'train_return' y
+        'test_return' (retornos medios de las ventanas válidas) y
+        'efficiency' (test_return / train_return; None si train_return <= 0,
+        donde el cociente no tiene sentido)
+    """
+    config = copy.copy(config or BotConfig())
+    param_sets = param_sets or random_params(500, config=config, seed=42)
+    arrays, indicators = prepare_arrays(candles, config)
+    warmup = max(config.ema_trend_period + 50, 100)
+    windows = rolling_windows(len(arrays['close']), train_size, test_size, start=warmup - 1)
+    backtest_kwargs['initial_balance'] = initial_balance
+    workers = workers or os.cpu_count() or 1
+
+    results = []
+    with SharedCandles(arrays, indicators) as shared:
+        init_args = (shared.name, shared.shape, config, 'vector', backtest_kwargs)
+        task_args = (param_sets, metric, min_trades)
+        if workers == 1 or len(windows) <= 1:
+            _init_worker(*init_args)
+            try:
+                results = [_run_window(window, *task_args) for window in windows]
+            finally:
+                _close_worker()
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(windows)), initializer=_init_worker,
+                                     initargs=init_args) as pool:
+                futures = [pool.submit(_run_window, window, *task_args) for window in windows]
+                results = [future.result() for future in futures]
+
+    timestamps, equity = stitch_equity(results, initial_balance)
+    trades = [trade for result in results for trade in result['trades']]
+    valid = [result for result in results if result['valid']]
+    train_return = float(np.mean([result['train']['return_pct'] for result in valid])) if valid else 0.0
+    test_return = float(np.mean([result['test']['return_pct'] for result in valid])) if valid else 0.0
+    return {
+        'windows': results,
+        'timestamps': timestamps,
+        'equity': equity,
+        'summary': summarize(equity, trades, initial_balance),
+        'skipped_windows': len(results) - len(valid),
+        'train_return': train_return,
+        'test_return': test_return,
+        'efficiency': test_return / train_return if train_return > 0 else None
+    }
+
+
+def _date(timestamp_ms):
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def write_windows(study, path):
+    """Guarda por ventana las fechas, los parámetros elegidos y los resultados dentro/fuera de muestra"""
+    fields = (['test_start', 'test_end', 'valid'] + list(_PARAM_BOUNDS)
+              + [f'train_{key}' for key in SUMMARY_KEYS] + [f'test_{key}' for key in SUMMARY_KEYS])
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for result in study['windows']:
+            row = {'test_start': _date(result['timestamps'][0]), 'test_end': _date(result['timestamps'][-1]),
+                   'valid': result['valid']}
+            row.update(result['params'])
+            row.update((f'train_{key}', value) for key, value in result['train'].items())
+            row.update((f'test_{key}', value) for key, value in result['test'].items())
+            writer.writerow(row)
+
+
+def main():
+    from candle_store import CandleStore
+    from market_stream import read_candles_csv
+
+    parser = argparse.ArgumentParser(description="Optimización walk-forward dentro de _PARAM_BOUNDS")
+    parser.add_argument('--csv', help="CSV timestamp,open,high,low,close,volume (por defecto el almacén de velas)")
+    parser.add_argument('--symbol', default=None, help="Por defecto config.symbol")
+    parser.add_argument('--timeframe', default=None, help="Por defecto config.timeframe")
+    parser.add_argument('--start', default=None, help="Fecha inicial YYYY-MM-DD (UTC)")
+    parser.add_argument('--end', default=None, help="Fecha final YYYY-MM-DD (UTC)")
+    parser.add_argument('--train-days', type=float, default=180)
+    parser.add_argument('--test-days', type=float, default=60)
+    parser.add_argument('--mode', choices=('random', 'grid'), default='random')
+    parser.add_argument('--configs', type=int, default=500, help="Configuraciones aleatorias (modo random)")
+    parser.add_argument('--steps', type=int, default=3, help="Valores por parámetro (modo grid)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=None, help="Procesos (por defecto todos los núcleos)")
+    parser.add_argument('--metric', default='return_pct', choices=SUMMARY_KEYS)
+    parser.add_argument('--min-trades', type=int, default=5)
+    parser.add_argument('--out', default=None, help="CSV por ventana (por defecto logs/walk_forward_*.csv)")
+    args = parser.parse_args()
+
+    config = BotConfig()
+    config.symbol = args.symbol or config.symbol
+    config.timeframe = args.timeframe or config.timeframe
+
+    if args.csv:
+        candles = read_candles_csv(args.csv)
+    else:
+        store = CandleStore(config.candle_store_file)
+        candles = store.load_arrays(config.symbol, config.timeframe,
+                                    _parse_date(args.start) if args.start else None,
+                                    _parse_date(args.end) if args.end else None)
+        store.close()
+
+    candles_per_day = 86400000 / timeframe_to_ms(config.timeframe)
+    train_size = int(args.train_days * candles_per_day)
+    test_size = int(args.test_days * candles_per_day)
+    if args.mode == 'grid':
+        param_sets = grid_params(args.steps, config=config)
+    else:
+        param_sets = random_params(args.configs, config=config, seed=args.seed)
+
+    started = time.perf_counter()
+    study = walk_forward(candles, train_size, test_size, param_sets, config, workers=args.workers,
+                         metric=args.metric, min_trades=args.min_trades)
+    elapsed = time.perf_counter() - started
+    if not study['windows']:
+        print("❌ Historial insuficiente para una ventana de entrenamiento + prueba")
+        return
+
+    print(f"\n🚶 Walk-forward: {len(study['windows'])} ventanas × {len(param_sets)} configuraciones "
+          f"en {elapsed:.1f}s")
+    print(f"{'prueba':<24}{'ret IS %':>10}{'ret OOS %':>11}{'trades':>8}  parámetros")
+    for result in study['windows']:
+        period = f"{_date(result['timestamps'][0])} → {_date(result['timestamps'][-1])}"
+        params = ', '.join(f"{name}={value:g}" for name, value in result['params'].items())
+        if not result['valid']:
+            params = f"⏭️ sin configuración válida (< {args.min_trades} trades): no opera"
+        print(f"{period:<24}{result['train']['return_pct'] or 0:>10.2f}{result['test']['return_pct']:>11.2f}"
+              f"{result['test']['total_trades']:>8}  {params}")
+
+    summary = study['summary']
+    print(f"📈 Fuera de muestra: retorno {summary['return_pct']:.2f}% | max drawdown "
+          f"{summary['max_drawdown_pct']:.2f}% | {summary['total_trades']} trades | "
+          f"win rate {summary['win_rate']:.1f}%")
+    print(f"⚖️ Retorno medio por ventana: IS {study['train_return']:.2f}% | OOS {study['test_return']:.2f}%"
+          + (f" | eficiencia (OOS/IS) {study['efficiency']:.2f}" if study['efficiency'] is not None
+             else " | eficiencia n/d (IS medio <= 0)"))
+    if study['skipped_windows']:
+        print(f"⏭️ {study['skipped_windows']} ventanas sin configuración válida (capital plano)")
+
+    out = args.out or os.path.join(config.logs_dir, f'walk_forward_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
+    write_windows(study, out)
+    print(f"🧾 Ventanas guardadas en {out}")
+
+
+if __name__ == "__main__":
+    main()